@@ -0,0 +1,67 @@
+"""
+Authentication dependencies for the async routers.
+
+Token handling, the resolved-user cache and the bcrypt pool are shared with
+app.auth; only the user lookups go through an AsyncSession.
+"""
+from typing import Optional
+
+from fastapi import Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .async_database import get_async_db
+from .auth import (
+    credentials_exception,
+    ensure_active,
+    hash_password_async,
+    needs_rehash,
+    oauth2_scheme,
+    token_cache,
+    token_claims,
+    verify_password_async,
+)
+
+
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[models.User]:
+    """Get a user by email"""
+    return await db.scalar(select(models.User).where(models.User.email == email))
+
+
+async def authenticate_user(
+    db: AsyncSession, email: str, password: str
+) -> Optional[models.User]:
+    """Authenticate a user, re-hashing the password if its cost is outdated"""
+    user = await get_user_by_email(db, email)
+    if not user:
+        return None
+    if not await verify_password_async(password, user.hashed_password):
+        return None
+    if needs_rehash(user.hashed_password):
+        user.hashed_password = await hash_password_async(password)
+        await db.commit()
+    return user
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)
+) -> models.User:
+    """Get the current authenticated user from JWT token"""
+    cached_user = token_cache.get(token)
+    if cached_user is not None:
+        return cached_user
+
+    payload = token_claims(token)
+    user = await get_user_by_email(db, email=payload["sub"])
+    if user is None:
+        raise credentials_exception()
+    token_cache.put(token, user, payload.get("exp"))
+    return user
+
+
+async def get_current_active_user(
+    current_user: models.User = Depends(get_current_user),
+) -> models.User:
+    """Get the current active user"""
+    return ensure_active(current_user)
@@ -0,0 +1,99 @@
+"""
+Async counterpart of database.py, used by the routers in app/async_routers
+when DATABASE_ASYNC=true.
+
+The same DATABASE_URL / DATABASE_READ_URL are used with their async drivers
+(aiosqlite for SQLite, asyncpg for PostgreSQL) and the same DB_* pool
+settings. Schema management stays on the sync engine.
+"""
+from typing import AsyncIterator, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from .database import (
+    DATABASE_READ_URL,
+    DATABASE_URL,
+    DB_STATEMENT_TIMEOUT_MS,
+    engine_pool_stats,
+    is_memory_sqlite,
+    pool_options,
+    set_sqlite_pragmas,
+)
+from .metrics import instrument_engine
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url: str) -> URL:
+    """Swap the driver of a sync database URL for its async equivalent"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend!r} databases")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend])
+
+
+def create_async_db_engine(url: str) -> AsyncEngine:
+    """Create an async engine with the same pool settings as create_db_engine()"""
+    backend = make_url(url).get_backend_name()
+    connect_args = {}
+    if backend == "postgresql" and DB_STATEMENT_TIMEOUT_MS:
+        connect_args["server_settings"] = {
+            "statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)
+        }
+
+    engine = create_async_engine(
+        to_async_url(url), connect_args=connect_args, **pool_options(url)
+    )
+    if backend == "sqlite" and not is_memory_sqlite(url):
+        event.listen(engine.sync_engine, "connect", set_sqlite_pragmas)
+    instrument_engine(engine.sync_engine)
+    return engine
+
+
+async_engine = create_async_db_engine(DATABASE_URL)
+# Objects stay usable after commit, since attribute refreshes cannot lazy-load
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+
+if DATABASE_READ_URL:
+    async_read_engine: Optional[AsyncEngine] = create_async_db_engine(
+        DATABASE_READ_URL
+    )
+    AsyncReadSessionLocal = async_sessionmaker(
+        async_read_engine, autoflush=False, expire_on_commit=False
+    )
+else:
+    async_read_engine = None
+    AsyncReadSessionLocal = AsyncSessionLocal
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Dependency for getting an async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db() -> AsyncIterator[AsyncSession]:
+    """Async session for read-only routes; uses the replica when configured"""
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
+def async_pool_status() -> Dict:
+    """Connection pool statistics of the async engines"""
+    status = {"async_primary": engine_pool_stats(async_engine.sync_engine)}
+    if async_read_engine is not None:
+        status["async_replica"] = engine_pool_stats(async_read_engine.sync_engine)
+    return status
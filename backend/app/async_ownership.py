@@ -0,0 +1,68 @@
+"""
+get_owned_group() for the async routers; the group cache is shared with
+app.ownership.
+"""
+from fastapi import Depends, Request
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .async_database import get_async_db
+from .auth import (
+    credentials_exception,
+    ensure_active,
+    oauth2_scheme,
+    token_cache,
+    token_claims,
+)
+from .ownership import CACHEABLE_METHODS, group_cache, group_not_found
+
+
+async def get_owned_group(
+    group_id: int,
+    request: Request,
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+) -> models.Group:
+    """
+    The current user's group ``group_id`` (404 for anyone else's). May be a
+    cached, detached copy for reads: load the group from ``db`` before
+    changing it. Other methods always confirm the group in the database.
+    """
+    user = token_cache.get(token)
+    if user is not None:
+        ensure_active(user)
+        if request.method in CACHEABLE_METHODS:
+            group = group_cache.get(user.id, group_id)
+            if group is not None:
+                return group
+        group = await db.scalar(
+            select(models.Group).where(
+                models.Group.id == group_id, models.Group.owner_id == user.id
+            )
+        )
+    else:
+        payload = token_claims(token)
+        row = (
+            await db.execute(
+                select(models.User, models.Group)
+                .outerjoin(
+                    models.Group,
+                    and_(
+                        models.Group.owner_id == models.User.id,
+                        models.Group.id == group_id,
+                    ),
+                )
+                .where(models.User.email == payload["sub"])
+            )
+        ).first()
+        if row is None:
+            raise credentials_exception()
+        user, group = row
+        token_cache.put(token, user, payload.get("exp"))
+        ensure_active(user)
+
+    if group is None:
+        raise group_not_found()
+    group_cache.put(group)
+    return group
@@ -0,0 +1 @@
+# Async routers package (DATABASE_ASYNC=true)
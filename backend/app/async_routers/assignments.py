@@ -0,0 +1,246 @@
+import asyncio
+import json
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import models, schemas
+from ..async_database import get_async_db, get_async_read_db
+from ..async_ownership import get_owned_group
+from ..ownership import missing_group
+from ..services.assignment import (
+    assign_secret_santas_async,
+    new_seed,
+    preview_secret_santas_async,
+    repair_secret_santas_async,
+)
+from ..services.dispatch import get_dispatch_status
+from ..services.email import send_assignments_via_email
+from ..services.feasibility import get_feasibility
+from ..services.history import decode_cursor, encode_cursor, history_query
+
+router = APIRouter(
+    prefix="/api/groups/{group_id}/assignments",
+    tags=["assignments"],
+    dependencies=[Depends(get_owned_group)],
+)
+
+
+@router.post("", response_model=schemas.AssignmentResult)
+async def create_assignment(
+    group_id: int,
+    assignment_data: schemas.AssignmentCreate,
+    send_emails: bool = Query(False, description="Send emails to participants"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Create Secret Santa assignments for a group"""
+    seed = assignment_data.seed if assignment_data.seed is not None else new_seed()
+
+    try:
+        records = await assign_secret_santas_async(
+            db,
+            group_id,
+            assignment_data.year,
+            assignment_data.mode,
+            replace=assignment_data.replace_year,
+            min_cycle_length=assignment_data.min_cycle_length,
+            seed=seed,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    assignments = [schemas.AssignmentResponse(**record) for record in records]
+
+    # Queue emails if requested; delivery is tracked by the dispatch
+    if send_emails:
+        try:
+            # Storing the dispatch is a blocking write
+            dispatch = await asyncio.to_thread(
+                send_assignments_via_email, records, group_id=group_id
+            )
+        except Exception as e:
+            return schemas.AssignmentResult(
+                assignments=assignments,
+                success=True,
+                seed=seed,
+                message=f"Assignments created but email sending failed: {str(e)}",
+            )
+        return schemas.AssignmentResult(
+            assignments=assignments,
+            success=True,
+            seed=seed,
+            message="Assignments created, emails are being sent",
+            dispatch_id=dispatch.id,
+        )
+
+    return schemas.AssignmentResult(
+        assignments=assignments,
+        success=True,
+        seed=seed,
+        message="Assignments created successfully",
+    )
+
+
+@router.post("/preview", response_model=schemas.AssignmentPreviewResult)
+async def preview_assignment(
+    group_id: int,
+    settings: schemas.AssignmentSettings,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Run the solver without saving anything, e.g. to check a seed first"""
+    try:
+        return await preview_secret_santas_async(
+            db,
+            group_id,
+            settings.year,
+            settings.mode,
+            settings.min_cycle_length,
+            settings.seed,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.post("/repair", response_model=schemas.AssignmentRepairResult)
+async def repair_assignment(
+    group_id: int,
+    repair_data: schemas.AssignmentRepair,
+    send_emails: bool = Query(
+        False, description="Email the givers whose receiver changed"
+    ),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Patch a year's assignment after participants joined or left"""
+    seed = repair_data.seed if repair_data.seed is not None else new_seed()
+
+    try:
+        records, changed = await repair_secret_santas_async(
+            db, group_id, repair_data.year, repair_data.mode, seed
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return await _repair_result(records, changed, send_emails, group_id, seed)
+
+
+async def _repair_result(
+    records: List[dict],
+    changed: List[dict],
+    send_emails: bool,
+    group_id: int,
+    seed: int,
+) -> schemas.AssignmentRepairResult:
+    result = schemas.AssignmentRepairResult(
+        assignments=[schemas.AssignmentResponse(**record) for record in records],
+        changed=[schemas.AssignmentResponse(**record) for record in changed],
+        success=True,
+        message=f"Assignments repaired, {len(changed)} pairing(s) changed",
+        seed=seed,
+    )
+    if send_emails and changed:
+        try:
+            dispatch = await asyncio.to_thread(
+                send_assignments_via_email, changed, group_id=group_id
+            )
+            result.dispatch_id = dispatch.id
+        except Exception as e:
+            result.message += f", but email sending failed: {str(e)}"
+        else:
+            result.message += ", emails are being sent"
+    return result
+
+
+@router.get("/feasibility", response_model=schemas.FeasibilityReport)
+async def get_assignment_feasibility(
+    group_id: int,
+    year: Optional[int] = Query(None, description="Defaults to the current year"),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Explain whether (and why not) the group can be assigned for a year"""
+    report = await db.run_sync(get_feasibility, group_id, year)
+    if report is None:
+        raise missing_group(group_id)
+    return report
+
+
+@router.get("/runs", response_model=List[schemas.AssignmentRunResponse])
+async def get_assignment_runs(
+    group_id: int,
+    year: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """List the mode and seed behind each assignment run, oldest first"""
+    query = select(models.AssignmentRun).where(
+        models.AssignmentRun.group_id == group_id
+    )
+    if year is not None:
+        query = query.where(models.AssignmentRun.year == year)
+    return (await db.scalars(query.order_by(models.AssignmentRun.id))).all()
+
+
+@router.get("/history", response_model=List[dict])
+async def get_history(
+    group_id: int,
+    response: Response,
+    year: Optional[int] = None,
+    year_from: Optional[int] = Query(None, description="First year to include"),
+    year_to: Optional[int] = Query(None, description="Last year to include"),
+    cursor: Optional[str] = Query(
+        None, description="X-Next-Cursor header value from the previous page"
+    ),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size"),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Get assignment history for a group, optionally one page at a time"""
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    query = history_query(group_id, year, year_from, year_to, after)
+    if limit is not None:
+        query = query.limit(limit)
+    history = [dict(row) for row in (await db.execute(query)).mappings()]
+    if limit is not None and len(history) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(history[-1])
+    return history
+
+
+@router.get("/history/export")
+async def export_history(
+    group_id: int,
+    year_from: Optional[int] = Query(None, description="First year to include"),
+    year_to: Optional[int] = Query(None, description="Last year to include"),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Stream a group's full assignment history as a JSON array"""
+    async def generate():
+        yield "["
+        query = history_query(group_id, year_from=year_from, year_to=year_to)
+        result = await db.stream(query.execution_options(yield_per=1000))
+        i = 0
+        async for row in result.mappings():
+            yield ("," if i else "") + json.dumps(dict(row))
+            i += 1
+        yield "]"
+
+    return StreamingResponse(
+        generate(),
+        media_type="application/json",
+        headers={
+            "Content-Disposition": f'attachment; filename="group-{group_id}-history.json"'
+        },
+    )
+
+
+@router.get("/dispatches/{dispatch_id}", response_model=schemas.DispatchStatus)
+async def get_email_dispatch(
+    group_id: int,
+    dispatch_id: str,
+):
+    """Poll the delivery status of the emails sent for an assignment"""
+    dispatch = await asyncio.to_thread(get_dispatch_status, dispatch_id)
+    if dispatch is None or dispatch["group_id"] != group_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Dispatch not found"
+        )
+    return dispatch
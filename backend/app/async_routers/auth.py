@@ -0,0 +1,123 @@
+from datetime import timedelta
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import models, schemas
+from ..async_database import get_async_db
+from ..async_auth import authenticate_user, get_current_active_user, get_user_by_email
+from ..auth import (
+    create_access_token,
+    hash_password_async,
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    create_password_reset_token,
+    verify_password_reset_token,
+    invalidate_user_cache,
+)
+from ..services.email import send_password_reset_email
+import os
+
+router = APIRouter(prefix="/api/auth", tags=["auth"])
+
+
+@router.post(
+    "/register",
+    response_model=schemas.UserResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def register(
+    user_data: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)
+):
+    """Register a new user"""
+    if await get_user_by_email(db, user_data.email):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered"
+        )
+
+    hashed_password = await hash_password_async(user_data.password)
+    db_user = models.User(email=user_data.email, hashed_password=hashed_password)
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+
+    return db_user
+
+
+@router.post("/login", response_model=schemas.Token)
+async def login(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Login and get access token"""
+    user = await authenticate_user(db, form_data.username, form_data.password)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": user.email}, expires_delta=access_token_expires
+    )
+    return {"access_token": access_token, "token_type": "bearer"}
+
+
+@router.get("/me", response_model=schemas.UserResponse)
+async def read_users_me(current_user: models.User = Depends(get_current_active_user)):
+    """Get current user information"""
+    return current_user
+
+
+@router.get("/check-email/{email}")
+async def check_email_exists(email: str, db: AsyncSession = Depends(get_async_db)):
+    """Check if an email is already registered"""
+    return {"exists": await get_user_by_email(db, email) is not None}
+
+
+@router.post("/forgot-password")
+async def forgot_password(
+    payload: schemas.PasswordResetRequest,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Request a password reset. Always returns 200 to avoid leaking which emails exist.
+    """
+    user = await get_user_by_email(db, payload.email)
+    if user:
+        token = create_password_reset_token(user.email)
+        frontend_base = os.getenv(
+            "FRONTEND_RESET_URL", "http://localhost:5173/reset-password?token="
+        )
+        reset_link = f"{frontend_base}{token}"
+        background_tasks.add_task(
+            send_password_reset_email,
+            to_email=user.email,
+            reset_link=reset_link,
+        )
+    return {"message": "If an account exists for this email, a reset link has been sent."}
+
+
+@router.post("/reset-password")
+async def reset_password(
+    payload: schemas.PasswordResetConfirm,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Reset password using a password reset token."""
+    email = verify_password_reset_token(payload.token)
+    if not email:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired token"
+        )
+
+    user = await get_user_by_email(db, email)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="User not found"
+        )
+
+    user.hashed_password = await hash_password_async(payload.new_password)
+    await db.commit()
+    invalidate_user_cache(user.email)
+
+    return {"message": "Password has been reset successfully."}
@@ -0,0 +1,110 @@
+from typing import List
+from fastapi import APIRouter, Depends, Request, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import models, schemas
+from ..async_database import get_async_db, get_async_read_db
+from ..async_auth import get_current_active_user
+from ..async_ownership import get_owned_group
+from ..ownership import missing_group
+from ..services.response_cache import cached_response, make_etag, store
+
+router = APIRouter(prefix="/api/groups", tags=["groups"])
+
+
+@router.post(
+    "", response_model=schemas.GroupResponse, status_code=status.HTTP_201_CREATED
+)
+async def create_group(
+    group: schemas.GroupCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    """Create a new Secret Santa group"""
+    db_group = models.Group(name=group.name, owner_id=current_user.id)
+    db.add(db_group)
+    await db.commit()
+    await db.refresh(db_group)
+    return db_group
+
+
+@router.get("", response_model=List[schemas.GroupResponse])
+async def get_groups(
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    """Get all groups owned by the current user"""
+    versions = await db.execute(
+        select(models.Group.id, models.Group.version)
+        .where(models.Group.owner_id == current_user.id)
+        .order_by(models.Group.id)
+    )
+    key = ("user", current_user.id, "groups")
+    etag = make_etag("groups", [tuple(row) for row in versions])
+    response = cached_response(request, key, etag)
+    if response is None:
+        groups = await db.scalars(
+            select(models.Group)
+            .where(models.Group.owner_id == current_user.id)
+            .order_by(models.Group.id)
+        )
+        response = store(key, etag, List[schemas.GroupResponse], groups.all())
+    return response
+
+
+@router.get("/{group_id}", response_model=schemas.GroupResponse)
+async def get_group(
+    group_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    group: models.Group = Depends(get_owned_group),
+):
+    """Get a specific group"""
+    # The owned group may be a cached copy; the version is always read fresh
+    version = await db.scalar(
+        select(models.Group.version).where(models.Group.id == group_id)
+    )
+    if version is None:
+        raise missing_group(group_id)
+    key = (group_id, "group")
+    etag = make_etag("group", group_id, version)
+    response = cached_response(request, key, etag)
+    if response is None:
+        response = store(
+            key, etag, schemas.GroupResponse, await db.get(models.Group, group_id)
+        )
+    return response
+
+
+@router.put("/{group_id}", response_model=schemas.GroupResponse)
+async def update_group(
+    group_id: int,
+    group: schemas.GroupCreate,
+    db: AsyncSession = Depends(get_async_db),
+    owned_group: models.Group = Depends(get_owned_group),
+):
+    """Update a group"""
+    db_group = await db.get(models.Group, group_id)
+    if db_group is None:
+        raise missing_group(group_id)
+    db_group.name = group.name
+    await db.commit()
+    await db.refresh(db_group)
+    return db_group
+
+
+@router.delete("/{group_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_group(
+    group_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    owned_group: models.Group = Depends(get_owned_group),
+):
+    """Delete a group"""
+    db_group = await db.get(models.Group, group_id)
+    if db_group is None:
+        raise missing_group(group_id)
+    # Participants and their restriction/history rows are deleted by cascade
+    await db.delete(db_group)
+    await db.commit()
+    return None
@@ -0,0 +1,374 @@
+import io
+from collections import Counter
+from typing import List, Literal, Optional
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+    status,
+)
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from .. import models, schemas
+from ..async_database import get_async_db, get_async_read_db
+from ..async_ownership import get_owned_group
+from ..ownership import missing_group
+from ..services import restrictions
+from ..services.participant_import import import_format, import_participants_async
+from ..services.response_cache import cached_response, make_etag, store
+
+router = APIRouter(
+    prefix="/api/groups/{group_id}/participants",
+    tags=["participants"],
+    dependencies=[Depends(get_owned_group)],
+)
+
+
+async def get_group_participant(
+    group_id: int, participant_id: int, db: AsyncSession, restrictions: bool = False
+) -> Optional[models.Participant]:
+    query = select(models.Participant).where(
+        models.Participant.id == participant_id,
+        models.Participant.group_id == group_id,
+    )
+    if restrictions:
+        # Relationships cannot lazy-load on an AsyncSession
+        query = query.options(selectinload(models.Participant.allowed_receivers))
+    return await db.scalar(query)
+
+
+def duplicate_emails_error(emails) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Already a participant in this group: {', '.join(sorted(emails))}",
+    )
+
+
+def with_restrictions(
+    participant: models.Participant,
+) -> schemas.ParticipantWithRestrictions:
+    return schemas.ParticipantWithRestrictions(
+        id=participant.id,
+        name=participant.name,
+        email=participant.email,
+        group_id=participant.group_id,
+        created_at=participant.created_at,
+        allowed_receivers=[r.name for r in participant.allowed_receivers],
+    )
+
+
+@router.post(
+    "", response_model=schemas.ParticipantResponse, status_code=status.HTTP_201_CREATED
+)
+async def create_participant(
+    group_id: int,
+    participant: schemas.ParticipantCreate,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Add a participant to a group"""
+    db_participant = models.Participant(
+        name=participant.name, email=participant.email, group_id=group_id
+    )
+    db.add(db_participant)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise duplicate_emails_error([participant.email])
+    await db.refresh(db_participant)
+    return db_participant
+
+
+@router.post(
+    "/bulk",
+    response_model=List[schemas.ParticipantResponse],
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_participants_bulk(
+    group_id: int,
+    bulk_data: schemas.BulkParticipantCreate,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Add multiple participants to a group at once"""
+    emails = Counter(participant.email for participant in bulk_data.participants)
+    taken = {email for email, count in emails.items() if count > 1}
+    taken.update(
+        await db.scalars(
+            select(models.Participant.email).where(
+                models.Participant.group_id == group_id,
+                models.Participant.email.in_(emails),
+            )
+        )
+    )
+    if taken:
+        raise duplicate_emails_error(taken)
+
+    db_participants = [
+        models.Participant(
+            name=participant.name, email=participant.email, group_id=group_id
+        )
+        for participant in bulk_data.participants
+    ]
+    db.add_all(db_participants)
+    try:
+        # The INSERT returns ids and created_at, so no refresh per participant
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise duplicate_emails_error(emails)
+    return db_participants
+
+
+@router.post(
+    "/import",
+    response_model=schemas.ParticipantImportResult,
+    status_code=status.HTTP_201_CREATED,
+)
+async def import_participants_file(
+    group_id: int,
+    file: UploadFile = File(..., description="CSV or NDJSON roster"),
+    format: Optional[Literal["csv", "ndjson"]] = Query(
+        None, description="Guessed from the file name when omitted"
+    ),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Import participants and their allowed receivers from a CSV/NDJSON file"""
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        report = await import_participants_async(
+            db,
+            group_id,
+            stream,
+            format or import_format(file.filename, file.content_type),
+        )
+        await db.commit()
+    except ValueError as e:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The group changed during the import, please try again",
+        )
+    finally:
+        stream.detach()
+    return report
+
+
+@router.get("", response_model=List[schemas.ParticipantWithRestrictions])
+async def get_participants(
+    group_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Get all participants in a group"""
+    version = await db.scalar(
+        select(models.Group.version).where(models.Group.id == group_id)
+    )
+    if version is None:
+        raise missing_group(group_id)
+    key = (group_id, "participants")
+    etag = make_etag("participants", group_id, version)
+    response = cached_response(request, key, etag)
+    if response is not None:
+        return response
+
+    participants = await db.scalars(
+        select(models.Participant)
+        .where(models.Participant.group_id == group_id)
+        .options(selectinload(models.Participant.allowed_receivers))
+    )
+    return store(
+        key,
+        etag,
+        List[schemas.ParticipantWithRestrictions],
+        [with_restrictions(p) for p in participants],
+    )
+
+
+@router.get("/restrictions", response_model=schemas.RestrictionMatrix)
+async def get_restriction_matrix(
+    group_id: int,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Get the allowed receivers of every restricted participant"""
+    return {
+        "restrictions": await db.run_sync(restrictions.get_restriction_matrix, group_id)
+    }
+
+
+@router.put("/restrictions", response_model=schemas.RestrictionMatrix)
+async def replace_restriction_matrix(
+    group_id: int,
+    matrix: schemas.RestrictionMatrix,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Replace all of the group's restrictions in one transaction"""
+    try:
+        await db.run_sync(
+            restrictions.replace_restriction_matrix, group_id, matrix.restrictions
+        )
+    except ValueError as e:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    await db.commit()
+    return {
+        "restrictions": await db.run_sync(restrictions.get_restriction_matrix, group_id)
+    }
+
+
+@router.get("/compact", response_model=schemas.CompactRoster)
+async def get_compact_roster(
+    group_id: int,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Get all participants with their restrictions as a compact bit matrix"""
+    return await db.run_sync(restrictions.get_compact_roster, group_id)
+
+
+@router.put("/restrictions/compact", response_model=schemas.RestrictionGraph)
+async def replace_restriction_graph(
+    group_id: int,
+    graph: schemas.RestrictionGraph,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Replace all of the group's restrictions from the compact form"""
+    try:
+        matrix = restrictions.decode_restriction_graph(
+            graph.participant_ids, graph.rows
+        )
+        await db.run_sync(restrictions.replace_restriction_matrix, group_id, matrix)
+    except ValueError as e:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    await db.commit()
+    roster = await db.run_sync(restrictions.get_compact_roster, group_id)
+    return roster["restrictions"]
+
+
+@router.get("/{participant_id}", response_model=schemas.ParticipantWithRestrictions)
+async def get_participant(
+    group_id: int,
+    participant_id: int,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Get a specific participant"""
+    participant = await get_group_participant(
+        group_id, participant_id, db, restrictions=True
+    )
+    if not participant:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Participant not found"
+        )
+    return with_restrictions(participant)
+
+
+@router.put("/{participant_id}", response_model=schemas.ParticipantResponse)
+async def update_participant(
+    group_id: int,
+    participant_id: int,
+    participant: schemas.ParticipantUpdate,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Update a participant"""
+    db_participant = await get_group_participant(group_id, participant_id, db)
+    if not db_participant:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Participant not found"
+        )
+
+    if participant.name is not None:
+        db_participant.name = participant.name
+    if participant.email is not None:
+        db_participant.email = participant.email
+
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise duplicate_emails_error([participant.email])
+    await db.refresh(db_participant)
+    return db_participant
+
+
+@router.delete("/{participant_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_participant(
+    group_id: int,
+    participant_id: int,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Delete a participant"""
+    db_participant = await get_group_participant(group_id, participant_id, db)
+    if not db_participant:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Participant not found"
+        )
+
+    await db.delete(db_participant)
+    await db.commit()
+    return None
+
+
+@router.put(
+    "/{participant_id}/restrictions", response_model=schemas.ParticipantWithRestrictions
+)
+async def update_restrictions(
+    group_id: int,
+    participant_id: int,
+    restriction_data: schemas.RestrictionUpdate,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Update who a participant can be assigned to"""
+    return await _edit_restrictions(
+        group_id,
+        participant_id,
+        db,
+        add=restriction_data.allowed_receiver_ids,
+        replace=True,
+    )
+
+
+@router.patch(
+    "/{participant_id}/restrictions", response_model=schemas.ParticipantWithRestrictions
+)
+async def patch_restrictions(
+    group_id: int,
+    participant_id: int,
+    diff: schemas.RestrictionDiff,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Allow or disallow some receivers, leaving the others as they are"""
+    return await _edit_restrictions(
+        group_id, participant_id, db, add=diff.add, remove=diff.remove
+    )
+
+
+async def _edit_restrictions(
+    group_id: int, participant_id: int, db: AsyncSession, **changes
+) -> schemas.ParticipantWithRestrictions:
+    participant = await get_group_participant(group_id, participant_id, db)
+    if not participant:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Participant not found"
+        )
+
+    try:
+        await db.run_sync(
+            lambda session: restrictions.update_restrictions(
+                session, group_id, participant_id, **changes
+            )
+        )
+    except ValueError as e:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    await db.commit()
+
+    await db.refresh(participant, ["allowed_receivers"])
+    return with_restrictions(participant)
@@ -1,22 +1,140 @@
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
+from typing import Dict, Optional, Set, Tuple
 import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event, inspect
 from sqlalchemy.orm import Session
 from . import models, schemas
 from .database import get_db
+from .metrics import BCRYPT_SECONDS
 import os
+import threading
+import time
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 PASSWORD_RESET_TOKEN_EXPIRE_MINUTES = 30
+# Resolved users are cached per token for at most this long (and never past exp)
+TOKEN_CACHE_TTL_SECONDS = int(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300"))
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("TOKEN_CACHE_MAX_SIZE", "10000"))
+# bcrypt cost for new hashes; existing hashes are upgraded on the next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Threads hashing at once, and how many more calls may wait for one
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(min(4, os.cpu_count() or 1))))
+BCRYPT_QUEUE_SIZE = int(os.getenv("BCRYPT_QUEUE_SIZE", "32"))
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
 
+class TokenCache:
+    """
+    Thread-safe LRU cache of authenticated users keyed by access token.
+
+    Entries expire after ``ttl`` seconds or when the token itself expires,
+    whichever comes first, and every entry of a user can be dropped at once
+    with ``invalidate_user`` (password reset, deactivation).
+    """
+
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, models.User]]" = OrderedDict()
+        self._tokens_by_email: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, token: str) -> Optional[models.User]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, user = entry
+            if expires_at <= time.time():
+                self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return user
+
+    def put(self, token: str, user: models.User, token_exp: Optional[float]) -> None:
+        expires_at = time.time() + self.ttl
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        # A detached copy, so no request ever touches another request's session
+        snapshot = models.User(
+            id=user.id,
+            email=user.email,
+            is_active=user.is_active,
+            created_at=user.created_at,
+        )
+        with self._lock:
+            self._entries[token] = (expires_at, snapshot)
+            self._entries.move_to_end(token)
+            self._tokens_by_email.setdefault(user.email, set()).add(token)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, token: str) -> None:
+        _, user = self._entries.pop(token)
+        tokens = self._tokens_by_email.get(user.email)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_email[user.email]
+
+    def invalidate_user(self, email: str) -> None:
+        with self._lock:
+            for token in list(self._tokens_by_email.get(email, ())):
+                self._remove(token)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_email.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+token_cache = TokenCache(TOKEN_CACHE_MAX_SIZE, TOKEN_CACHE_TTL_SECONDS)
+
+
+def invalidate_user_cache(email: str) -> None:
+    """Drop cached sessions of a user; call after a password reset or deactivation"""
+    token_cache.invalidate_user(email)
+
+
+@event.listens_for(models.User, "after_update")
+def _invalidate_changed_user(mapper, connection, target: models.User) -> None:
+    """Catch deactivations and password changes made anywhere through the ORM"""
+    state = inspect(target)
+    for attr in ("is_active", "hashed_password", "email"):
+        if state.attrs[attr].history.has_changes():
+            invalidate_user_cache(target.email)
+            deleted = state.attrs["email"].history.deleted
+            if deleted:
+                invalidate_user_cache(deleted[0])
+            return
+
+
 def _truncate_password(password: str) -> bytes:
     """Truncate password to 72 bytes (bcrypt limit)"""
     password_bytes = password.encode('utf-8')
@@ -32,7 +150,11 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         # bcrypt expects bytes for both password and hash
         if isinstance(hashed_password, str):
             hashed_password = hashed_password.encode('utf-8')
-        return bcrypt.checkpw(password_bytes, hashed_password)
+        started = time.perf_counter()
+        try:
+            return bcrypt.checkpw(password_bytes, hashed_password)
+        finally:
+            BCRYPT_SECONDS.observe(time.perf_counter() - started, "verify")
     except Exception:
         return False
 
@@ -41,12 +163,107 @@ def get_password_hash(password: str) -> str:
     """Hash a password"""
     password_bytes = _truncate_password(password)
     # Generate salt and hash password
-    salt = bcrypt.gensalt(rounds=12)
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+    started = time.perf_counter()
     hashed = bcrypt.hashpw(password_bytes, salt)
+    BCRYPT_SECONDS.observe(time.perf_counter() - started, "hash")
     # Return as string for storage
     return hashed.decode('utf-8')
 
 
+def needs_rehash(hashed_password: str) -> bool:
+    """True when a hash was made with a different cost than BCRYPT_ROUNDS"""
+    try:
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+# bcrypt releases the GIL while hashing, so threads run it in parallel
+_bcrypt_executor: Optional[ThreadPoolExecutor] = None
+_bcrypt_slots = threading.BoundedSemaphore(BCRYPT_WORKERS + BCRYPT_QUEUE_SIZE)
+_bcrypt_lock = threading.Lock()
+
+
+def _get_bcrypt_executor() -> ThreadPoolExecutor:
+    global _bcrypt_executor
+    with _bcrypt_lock:
+        if _bcrypt_executor is None:
+            _bcrypt_executor = ThreadPoolExecutor(
+                max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt"
+            )
+        return _bcrypt_executor
+
+
+def _acquire_bcrypt_slot() -> None:
+    """
+    Reserve a place on the bcrypt pool. When every worker is busy and the
+    queue is full the request is rejected with 429 instead of waiting.
+    """
+    if not _bcrypt_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many authentication requests, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+
+
+async def _run_bcrypt(func, *args):
+    """Run a bcrypt call on the worker pool without blocking the event loop"""
+    _acquire_bcrypt_slot()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_bcrypt_executor(), func, *args)
+    finally:
+        _bcrypt_slots.release()
+
+
+def _run_bcrypt_blocking(func, *args):
+    """_run_bcrypt() for sync routes, which already run in a worker thread"""
+    _acquire_bcrypt_slot()
+    try:
+        return _get_bcrypt_executor().submit(func, *args).result()
+    finally:
+        _bcrypt_slots.release()
+
+
+async def hash_password_async(password: str) -> str:
+    """get_password_hash() on the bcrypt pool"""
+    return await _run_bcrypt(get_password_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password() on the bcrypt pool"""
+    return await _run_bcrypt(verify_password, plain_password, hashed_password)
+
+
+def hash_password_pooled(password: str) -> str:
+    """get_password_hash() on the bcrypt pool, waiting for the result"""
+    return _run_bcrypt_blocking(get_password_hash, password)
+
+
+def verify_password_pooled(plain_password: str, hashed_password: str) -> bool:
+    """verify_password() on the bcrypt pool, waiting for the result"""
+    return _run_bcrypt_blocking(verify_password, plain_password, hashed_password)
+
+
+def encode_token(claims: dict) -> str:
+    """Sign a JWT; jose (and cryptography) are only imported on first use"""
+    from jose import jwt
+
+    return jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def decode_token(token: str) -> Optional[dict]:
+    """Return the claims of a valid, unexpired JWT, otherwise None"""
+    from jose import JWTError, jwt
+
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -55,8 +272,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    return encode_token(to_encode)
 
 
 def create_password_reset_token(email: str) -> str:
@@ -69,14 +285,11 @@ def create_password_reset_token(email: str) -> str:
 
 def verify_password_reset_token(token: str) -> Optional[str]:
     """Verify a password reset token and return the email if valid."""
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        if payload.get("scope") != "password_reset":
-            return None
-        email: str = payload.get("sub")
-        return email
-    except JWTError:
+    payload = decode_token(token)
+    if payload is None or payload.get("scope") != "password_reset":
         return None
+    email: str = payload.get("sub")
+    return email
 
 
 def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
@@ -94,25 +307,61 @@ def authenticate_user(db: Session, email: str, password: str) -> Optional[models
     return user
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-) -> models.User:
-    """Get the current authenticated user from JWT token"""
-    credentials_exception = HTTPException(
+def authenticate_user_pooled(
+    db: Session, email: str, password: str
+) -> Optional[models.User]:
+    """
+    Authenticate a user with bcrypt on the worker pool, re-hashing the
+    password when its stored cost differs from BCRYPT_ROUNDS. For sync
+    routes: the database work stays on the calling worker thread.
+    """
+    user = get_user_by_email(db, email)
+    if not user:
+        return None
+    if not verify_password_pooled(password, user.hashed_password):
+        return None
+    if needs_rehash(user.hashed_password):
+        user.hashed_password = hash_password_pooled(password)
+        db.commit()
+    return user
+
+
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    user = get_user_by_email(db, email=email)
+
+
+def token_claims(token: str) -> dict:
+    """Claims of an access token with a subject, otherwise a 401"""
+    payload = decode_token(token)
+    if payload is None or payload.get("sub") is None:
+        raise credentials_exception()
+    return payload
+
+
+def ensure_active(user: models.User) -> models.User:
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return user
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+) -> models.User:
+    """Get the current authenticated user from JWT token"""
+    # Tokens already verified and resolved skip both the decode and the query
+    cached_user = token_cache.get(token)
+    if cached_user is not None:
+        return cached_user
+
+    payload = token_claims(token)
+    user = get_user_by_email(db, email=payload["sub"])
     if user is None:
-        raise credentials_exception
+        raise credentials_exception()
+    token_cache.put(token, user, payload.get("exp"))
     return user
 
 
@@ -120,6 +369,4 @@ async def get_current_active_user(
     current_user: models.User = Depends(get_current_user),
 ) -> models.User:
     """Get the current active user"""
-    if not current_user.is_active:
-        raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user
+    return ensure_active(current_user)
@@ -1,22 +1,90 @@
-from sqlalchemy import create_engine
+from typing import Dict, Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
 
+from .metrics import instrument_engine
+
 load_dotenv()
 
 # Database URL - defaults to SQLite for development, PostgreSQL for production
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./santa.db")
+# Optional read replica for read-only routes; falls back to DATABASE_URL
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+
+# Connection pool settings (ignored for in-memory SQLite)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Seconds before a connection is replaced; -1 keeps connections forever
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Per-statement limit in milliseconds (PostgreSQL only), 0 disables it
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+# Serve the API from the async routers (aiosqlite/asyncpg) instead of the sync ones
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "false").lower() == "true"
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers run while a write is in progress
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def is_memory_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (
+        None,
+        "",
+        ":memory:",
+    )
+
+
+def pool_options(url: str) -> Dict:
+    """create_engine() pool arguments for ``url`` from the DB_* variables"""
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if not is_memory_sqlite(url):
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    return options
+
+
+def create_db_engine(url: str) -> Engine:
+    """Create an engine configured from the DB_* environment variables"""
+    backend = make_url(url).get_backend_name()
+    connect_args = {}
+    if backend == "sqlite":
+        connect_args["check_same_thread"] = False
+    elif backend == "postgresql" and DB_STATEMENT_TIMEOUT_MS:
+        connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+
+    engine = create_engine(url, connect_args=connect_args, **pool_options(url))
+    if backend == "sqlite" and not is_memory_sqlite(url):
+        event.listen(engine, "connect", set_sqlite_pragmas)
+    instrument_engine(engine)
+    return engine
 
-# For SQLite, we need to handle foreign keys
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-else:
-    engine = create_engine(DATABASE_URL)
 
+engine = create_db_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+if DATABASE_READ_URL:
+    read_engine: Optional[Engine] = create_db_engine(DATABASE_READ_URL)
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+else:
+    read_engine = None
+    ReadSessionLocal = SessionLocal
+
 Base = declarative_base()
 
 
@@ -27,3 +95,30 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    """Dependency for read-only routes; uses the replica when one is configured"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def engine_pool_stats(engine: Engine) -> Dict:
+    pool = engine.pool
+    stats = {"class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    return stats
+
+
+def pool_status() -> Dict:
+    """Connection pool statistics for the primary and (if any) replica engine"""
+    status = {"primary": engine_pool_stats(engine)}
+    if read_engine is not None:
+        status["replica"] = engine_pool_stats(read_engine)
+    return status
@@ -1,17 +1,39 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from .database import engine, Base
-from .routers import auth, groups, participants, assignments
+from fastapi.responses import PlainTextResponse
+from . import metrics
+from .auth import token_cache
+from .database import DATABASE_ASYNC, pool_status
+from .ownership import group_cache
+from .services.assignment import solution_cache_stats
+from .services.response_cache import response_cache_stats
 import os
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+if DATABASE_ASYNC:
+    from .async_routers import auth, groups, participants, assignments
+else:
+    from .routers import auth, groups, participants, assignments
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Bring the schema up to date on startup, not at import. With
+    # AUTO_MIGRATE=false workers skip it (and never import alembic); run
+    # "python -m app.migrations" as a deployment step instead.
+    if os.getenv("AUTO_MIGRATE", "true").lower() == "true":
+        from .migrations import run_migrations
+
+        run_migrations()
+    yield
+
 
 app = FastAPI(
     title="Secret Santa API",
     description="A web application for managing Secret Santa gift exchanges",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS middleware - configure allowed origins for production
@@ -33,6 +55,9 @@ if os.getenv("TRUSTED_HOSTS"):
         TrustedHostMiddleware, allowed_hosts=os.getenv("TRUSTED_HOSTS").split(",")
     )
 
+# Outermost, so the latency includes the other middleware
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(groups.router)
@@ -45,6 +70,56 @@ def root():
     return {"message": "Secret Santa API", "docs": "/docs", "version": "1.0.0"}
 
 
+def _all_pool_status():
+    pools = pool_status()
+    if DATABASE_ASYNC:
+        from .async_database import async_pool_status
+
+        pools.update(async_pool_status())
+    return pools
+
+
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
+    return {"status": "healthy", "database_pools": _all_pool_status()}
+
+
+@metrics.collector
+def _pool_metrics():
+    samples = [
+        ({"pool": pool, "state": state}, value)
+        for pool, stats in _all_pool_status().items()
+        for state, value in stats.items()
+        if state != "class"
+    ]
+    yield "db_pool_connections", "gauge", "Pool connections by state", samples
+
+
+@metrics.collector
+def _cache_metrics():
+    caches = {
+        "token": token_cache.stats(),
+        "group": group_cache.stats(),
+        "solution": solution_cache_stats(),
+        "response": response_cache_stats(),
+    }
+    for key, name, type, help in (
+        ("size", "cache_entries", "gauge", "Entries held"),
+        ("hits", "cache_hits_total", "counter", "Lookups answered from the cache"),
+        ("misses", "cache_misses_total", "counter", "Lookups that missed"),
+    ):
+        samples = [({"cache": cache}, stats[key]) for cache, stats in caches.items()]
+        yield name, type, help, samples
+    yield (
+        "http_not_modified_total",
+        "counter",
+        "Conditional reads answered with 304",
+        [({}, caches["response"]["not_modified"])],
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,328 @@
+"""
+In-process metrics in the Prometheus text format, served at ``/metrics``.
+
+Histograms and counters live in this module and are updated in place by the
+code they measure: request latency per route (MetricsMiddleware), statement
+count and time per request (cursor events on every engine, see
+instrument_engine), solver runs, bcrypt calls and email sends. Values that
+already exist elsewhere, such as pool checkouts and cache hit counts, are
+read when ``/metrics`` is scraped by the functions registered with
+@collector.
+
+With SLOW_REQUEST_MS set, requests slower than that are logged together with
+every SQL statement they issued and its duration. Statement parameters are
+never logged.
+"""
+import bisect
+import contextvars
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Log requests slower than this many milliseconds with their SQL; 0 disables it
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+# Statements kept per request for the slow-request log
+SLOW_REQUEST_MAX_STATEMENTS = 200
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+NODE_BUCKETS = (10, 100, 1_000, 10_000, 100_000, 1_000_000)
+
+# (labels, value) pairs of one metric family
+Samples = Iterable[Tuple[Dict[str, str], float]]
+
+_registry: List["_Metric"] = []
+_collectors: List[Callable[[], Iterable[Tuple[str, str, str, Samples]]]] = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _sample_lines(samples) -> List[str]:
+    return [
+        f"{name}{_format_labels(labels)} {_format_value(value)}"
+        for name, labels, value in samples
+    ]
+
+
+class _Metric(ABC):
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _labels(self, values: Tuple) -> Dict[str, str]:
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return dict(zip(self.labelnames, values))
+
+    @abstractmethod
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        """(sample name, labels, value) for every series of this metric"""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(_sample_lines(self.samples()))
+        return lines
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [(self.name, self._labels(key), value) for key, value in items]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [count per bucket (+Inf last), sum]
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def samples(self):
+        with self._lock:
+            items = sorted(
+                (key, (list(counts), total))
+                for key, (counts, total) in self._values.items()
+            )
+        samples = []
+        for key, (counts, total) in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                bucket = {**labels, "le": _format_value(bound)}
+                samples.append((f"{self.name}_bucket", bucket, cumulative))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+def collector(func: Callable[[], Iterable[Tuple[str, str, str, Samples]]]):
+    """
+    Register a function that returns ``(name, type, help, samples)`` families
+    read at scrape time, for gauges of state owned by other modules.
+    """
+    _collectors.append(func)
+    return func
+
+
+def render() -> str:
+    """Every metric in the Prometheus text exposition format"""
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    for func in _collectors:
+        try:
+            families = list(func())
+        except Exception:
+            logger.exception("Metrics collector %s failed", func.__name__)
+            continue
+        for name, type, help, samples in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {type}")
+            lines.extend(
+                _sample_lines((name, labels, value) for labels, value in samples)
+            )
+    return "\n".join(lines) + "\n"
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time to serve a request, by route template",
+    ("method", "route", "status"),
+)
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds", "Time per SQL statement", buckets=QUERY_BUCKETS
+)
+DB_REQUEST_QUERIES = Histogram(
+    "db_request_queries",
+    "SQL statements issued per request",
+    ("route",),
+    buckets=COUNT_BUCKETS,
+)
+DB_REQUEST_SECONDS = Histogram(
+    "db_request_query_seconds", "Time spent in SQL per request", ("route",)
+)
+SOLVER_SECONDS = Histogram(
+    "solver_duration_seconds",
+    "Time per uncached assignment solve",
+    ("mode", "outcome"),
+)
+SOLVER_NODES = Histogram(
+    "solver_nodes", "Search nodes per uncached solve", ("mode",), buckets=NODE_BUCKETS
+)
+SOLVER_BACKTRACKS = Counter(
+    "solver_backtracks_total", "Backtracks across all solves", ("mode",)
+)
+BCRYPT_SECONDS = Histogram(
+    "bcrypt_duration_seconds", "Time per bcrypt hash or check", ("operation",)
+)
+EMAIL_SEND_SECONDS = Histogram(
+    "email_send_duration_seconds",
+    "Time per transport call (one message or one batch)",
+    ("transport",),
+)
+EMAIL_MESSAGES = Counter(
+    "email_messages_total", "Email send attempts by outcome", ("transport", "result")
+)
+
+
+class RequestStats:
+    """SQL issued while serving one request"""
+
+    __slots__ = ("queries", "query_time", "statements")
+
+    def __init__(self, capture: bool = False):
+        self.queries = 0
+        self.query_time = 0.0
+        # (statement, seconds) for the slow-request log
+        self.statements: Optional[List[Tuple[str, float]]] = [] if capture else None
+
+
+_request_stats: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar(
+    "request_stats", default=None
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    elapsed = time.perf_counter() - started
+    DB_QUERY_SECONDS.observe(elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_time += elapsed
+        if (
+            stats.statements is not None
+            and len(stats.statements) < SLOW_REQUEST_MAX_STATEMENTS
+        ):
+            stats.statements.append((statement, elapsed))
+
+
+def _handle_error(exception_context) -> None:
+    # after_cursor_execute never fires for a failed statement
+    started = exception_context.connection and exception_context.connection.info.get(
+        "query_started"
+    )
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine) -> None:
+    """Time every statement run on ``engine`` (the sync_engine of an async one)"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing each HTTP request. Requests are labelled with the
+    route template (``/api/groups/{group_id}``), or "unmatched" for 404s, so
+    the number of series stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats(capture=SLOW_REQUEST_MS > 0)
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_stats.reset(token)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.observe(
+                elapsed, scope["method"], route, str(status_code)
+            )
+            DB_REQUEST_QUERIES.observe(stats.queries, route)
+            DB_REQUEST_SECONDS.observe(stats.query_time, route)
+            if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+                _log_slow_request(scope, status_code, elapsed, stats)
+
+
+def _log_slow_request(scope, status_code: int, elapsed: float, stats: RequestStats):
+    lines = [
+        f"Slow request: {scope['method']} {scope['path']} -> {status_code} "
+        f"in {elapsed * 1000:.1f} ms, {stats.queries} queries "
+        f"({stats.query_time * 1000:.1f} ms)"
+    ]
+    for statement, seconds in stats.statements or ():
+        lines.append(f"  [{seconds * 1000:.2f} ms] {' '.join(statement.split())}")
+    if stats.queries > len(stats.statements or ()):
+        lines.append(f"  ... {stats.queries - len(stats.statements or ())} more")
+    logger.warning("\n".join(lines))
@@ -0,0 +1,65 @@
+"""
+Schema management with Alembic (migrations live in backend/migrations).
+
+run_migrations() brings the database to the latest revision. Databases that
+were created by ``Base.metadata.create_all`` before migrations existed are
+stamped with the baseline revision first, so only the newer changes run.
+From the backend directory:
+
+    python -m app.migrations            # upgrade to the latest revision
+    python -m app.migrations current    # show the database's revision
+    alembic revision -m "describe the change"
+"""
+import argparse
+import os
+import sys
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+from .database import engine as default_engine
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(__file__)), "alembic.ini")
+# Revision matching the schema create_all used to produce
+BASELINE_REVISION = "0001"
+
+
+def alembic_config(connection=None) -> Config:
+    config = Config(ALEMBIC_INI)
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+
+def run_migrations(engine: Engine = default_engine) -> None:
+    """Upgrade the database to the latest revision"""
+    with engine.begin() as connection:
+        config = alembic_config(connection)
+        current = MigrationContext.configure(connection).get_current_revision()
+        if current is None and inspect(connection).has_table("users"):
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, "head")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Apply database migrations")
+    parser.add_argument(
+        "action", nargs="?", default="upgrade", choices=["upgrade", "current"]
+    )
+    args = parser.parse_args(argv)
+
+    if args.action == "current":
+        with default_engine.connect() as connection:
+            revision = MigrationContext.configure(connection).get_current_revision()
+        print(revision or "not migrated")
+        return 0
+
+    run_migrations()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
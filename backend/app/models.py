@@ -1,4 +1,6 @@
 from sqlalchemy import (
+    event,
+    or_,
     Column,
     Integer,
     String,
@@ -6,9 +8,10 @@ from sqlalchemy import (
     Table,
     Boolean,
     DateTime,
+    Index,
     Text,
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import backref, relationship
 from sqlalchemy.sql import func
 from .database import Base
 
@@ -28,8 +31,18 @@ assignment_history = Table(
     Column("giver_id", Integer, ForeignKey("participants.id"), primary_key=True),
     Column("receiver_id", Integer, ForeignKey("participants.id"), primary_key=True),
     Column("group_id", Integer, ForeignKey("groups.id"), primary_key=True),
-    Column("year", Integer, nullable=False),
+    # Part of the key: the weighted mode may repeat a pairing in a later year
+    Column("year", Integer, primary_key=True),
     Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    # Every history read filters by group (and usually year) and pages in
+    # (year, giver_id, receiver_id) order
+    Index(
+        "ix_assignment_history_group_year",
+        "group_id",
+        "year",
+        "giver_id",
+        "receiver_id",
+    ),
 )
 
 
@@ -54,20 +67,32 @@ class Group(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
-    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Bumped by every commit that changes the group, its participants,
+    # restrictions or history (see services/group_events); drives the ETags
+    version = Column(Integer, nullable=False, server_default="1")
 
     owner = relationship("User", back_populates="groups")
     participants = relationship(
         "Participant", back_populates="group", cascade="all, delete-orphan"
     )
+    runs = relationship(
+        "AssignmentRun", back_populates="group", cascade="all, delete-orphan"
+    )
 
 
 class Participant(Base):
     """Participants in a Secret Santa group"""
 
     __tablename__ = "participants"
+    # One entry per email in a group; also serves every group_id lookup
+    __table_args__ = (
+        Index("uq_participants_group_email", "group_id", "email", unique=True),
+    )
+    # Fetch created_at in the INSERT itself, so new rows need no refresh
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
@@ -86,11 +111,80 @@ class Participant(Base):
         backref="allowed_givers",
     )
 
-    # History of past assignments (who this participant has been assigned to)
+    # History of past assignments (who this participant has been assigned to).
+    # Read-only: a pairing may repeat across years, which the ORM's one row per
+    # pair bookkeeping cannot delete; see _delete_participant_history
     past_assignments = relationship(
         "Participant",
         secondary=assignment_history,
         primaryjoin=id == assignment_history.c.giver_id,
         secondaryjoin=id == assignment_history.c.receiver_id,
-        backref="past_givers",
+        backref=backref("past_givers", viewonly=True),
+        viewonly=True,
     )
+
+
+@event.listens_for(Participant, "before_delete")
+def _delete_participant_history(mapper, connection, target: Participant) -> None:
+    """Drop every history row the participant gave or received in"""
+    connection.execute(
+        assignment_history.delete().where(
+            or_(
+                assignment_history.c.giver_id == target.id,
+                assignment_history.c.receiver_id == target.id,
+            )
+        )
+    )
+
+
+class AssignmentRun(Base):
+    """Solver settings behind a year's assignment, enough to reproduce it"""
+
+    __tablename__ = "assignment_runs"
+    __table_args__ = (Index("ix_assignment_runs_group_year", "group_id", "year"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    group_id = Column(Integer, ForeignKey("groups.id"), nullable=False)
+    year = Column(Integer, nullable=False)
+    mode = Column(String, nullable=False)  # An assignment mode, or "repair"
+    seed = Column(Integer, nullable=False)
+    min_cycle_length = Column(Integer)  # Only for the min_cycle mode
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    group = relationship("Group", back_populates="runs")
+
+
+class EmailDispatch(Base):
+    """A batch of notification emails; stored so any worker can report progress"""
+
+    __tablename__ = "email_dispatches"
+
+    id = Column(String(32), primary_key=True)
+    # Not a foreign key: delivery may still be running when the group goes
+    group_id = Column(Integer, index=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    finished_at = Column(DateTime(timezone=True))
+
+    jobs = relationship(
+        "EmailDispatchJob",
+        back_populates="dispatch",
+        order_by="EmailDispatchJob.position",
+        cascade="all, delete-orphan",
+    )
+
+
+class EmailDispatchJob(Base):
+    """Delivery status of one message in a dispatch"""
+
+    __tablename__ = "email_dispatch_jobs"
+
+    dispatch_id = Column(
+        String(32), ForeignKey("email_dispatches.id"), primary_key=True
+    )
+    position = Column(Integer, primary_key=True)
+    recipient = Column(String, nullable=False)
+    status = Column(String, nullable=False)  # pending, sending, sent or failed
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text)
+
+    dispatch = relationship("EmailDispatch", back_populates="jobs")
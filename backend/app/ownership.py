@@ -0,0 +1,165 @@
+"""
+Group ownership dependency shared by the group-scoped routers.
+
+``get_owned_group`` resolves the current user and checks that they own the
+``group_id`` in the path. FastAPI caches dependencies per request, so it runs
+once however many routes and sub-dependencies ask for it. When the token is
+not in the token cache yet, the user and the group come from one joined
+query. Confirmed (user, group) pairs are also kept for a short TTL across
+requests and dropped as soon as the group changes or is deleted (see
+group_events), so a polling dashboard skips the query entirely. That only
+happens in this process: reads must cope with a group another worker deleted
+within the TTL (see missing_group), and writes never use the cache.
+"""
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import os
+import threading
+import time
+
+from fastapi import Depends, HTTPException, Request, status
+from sqlalchemy import and_
+from sqlalchemy.orm import Session
+
+from . import models
+from .auth import (
+    credentials_exception,
+    ensure_active,
+    oauth2_scheme,
+    token_cache,
+    token_claims,
+)
+from .database import get_db
+from .services.group_events import on_group_change
+
+GROUP_CACHE_TTL_SECONDS = int(os.getenv("GROUP_CACHE_TTL_SECONDS", "30"))
+GROUP_CACHE_MAX_SIZE = int(os.getenv("GROUP_CACHE_MAX_SIZE", "10000"))
+# Requests allowed to trust a cached ownership check
+CACHEABLE_METHODS = ("GET", "HEAD")
+
+
+class GroupCache:
+    """Thread-safe LRU of groups confirmed as owned, keyed by (user_id, group_id)"""
+
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[int, int], Tuple[float, models.Group]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int, group_id: int) -> Optional[models.Group]:
+        key = (user_id, group_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, group: models.Group) -> None:
+        if self.ttl <= 0:
+            return
+        # A detached copy, so no request ever touches another request's session
+        snapshot = models.Group(
+            id=group.id,
+            name=group.name,
+            owner_id=group.owner_id,
+            created_at=group.created_at,
+            updated_at=group.updated_at,
+            version=group.version,
+        )
+        with self._lock:
+            self._entries[(group.owner_id, group.id)] = (
+                time.time() + self.ttl,
+                snapshot,
+            )
+            self._entries.move_to_end((group.owner_id, group.id))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_group(self, group_id: int) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key[1] == group_id]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+group_cache = GroupCache(GROUP_CACHE_MAX_SIZE, GROUP_CACHE_TTL_SECONDS)
+
+
+@on_group_change
+def _forget_group(group_id: int) -> None:
+    group_cache.invalidate_group(group_id)
+
+
+def group_not_found() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Group not found")
+
+
+def missing_group(group_id: int) -> HTTPException:
+    """404 for a group that passed a cached check but is gone from the database"""
+    group_cache.invalidate_group(group_id)
+    return group_not_found()
+
+
+def get_owned_group(
+    group_id: int,
+    request: Request,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+) -> models.Group:
+    """
+    The current user's group ``group_id`` (404 for anyone else's). May be a
+    cached, detached copy for reads: load the group from ``db`` before
+    changing it. Other methods always confirm the group in the database.
+    """
+    user = token_cache.get(token)
+    if user is not None:
+        ensure_active(user)
+        if request.method in CACHEABLE_METHODS:
+            group = group_cache.get(user.id, group_id)
+            if group is not None:
+                return group
+        group = (
+            db.query(models.Group)
+            .filter(models.Group.id == group_id, models.Group.owner_id == user.id)
+            .first()
+        )
+    else:
+        payload = token_claims(token)
+        row = (
+            db.query(models.User, models.Group)
+            .outerjoin(
+                models.Group,
+                and_(
+                    models.Group.owner_id == models.User.id,
+                    models.Group.id == group_id,
+                ),
+            )
+            .filter(models.User.email == payload["sub"])
+            .first()
+        )
+        if row is None:
+            raise credentials_exception()
+        user, group = row
+        token_cache.put(token, user, payload.get("exp"))
+        ensure_active(user)
+
+    if group is None:
+        raise group_not_found()
+    group_cache.put(group)
+    return group
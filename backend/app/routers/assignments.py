@@ -1,27 +1,32 @@
+import json
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from .. import models, schemas
-from ..database import get_db
-from ..auth import get_current_active_user
-from ..services.assignment import assign_secret_santas, get_assignment_history
+from ..database import get_db, get_read_db
+from ..ownership import get_owned_group, missing_group
+from ..services.assignment import (
+    assign_secret_santas,
+    new_seed,
+    preview_secret_santas,
+    repair_secret_santas,
+)
+from ..services.dispatch import get_dispatch_status
 from ..services.email import send_assignments_via_email
+from ..services.feasibility import get_feasibility
+from ..services.history import (
+    decode_cursor,
+    encode_cursor,
+    get_assignment_history,
+    iter_assignment_history,
+)
 
-router = APIRouter(prefix="/api/groups/{group_id}/assignments", tags=["assignments"])
-
-
-def verify_group_ownership(group_id: int, user_id: int, db: Session) -> models.Group:
-    """Verify that the user owns the group"""
-    group = (
-        db.query(models.Group)
-        .filter(models.Group.id == group_id, models.Group.owner_id == user_id)
-        .first()
-    )
-    if not group:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Group not found"
-        )
-    return group
+router = APIRouter(
+    prefix="/api/groups/{group_id}/assignments",
+    tags=["assignments"],
+    dependencies=[Depends(get_owned_group)],
+)
 
 
 @router.post("", response_model=schemas.AssignmentResult)
@@ -30,60 +35,46 @@ def create_assignment(
     assignment_data: schemas.AssignmentCreate,
     send_emails: bool = Query(False, description="Send emails to participants"),
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
 ):
     """Create Secret Santa assignments for a group"""
-    verify_group_ownership(group_id, current_user.id, db)
+    seed = assignment_data.seed if assignment_data.seed is not None else new_seed()
 
     try:
         # Generate assignments
-        assignments_dict = assign_secret_santas(db, group_id, assignment_data.year)
-
-        # Convert to response format
-        assignments = []
-        for giver_email, receiver_name in assignments_dict.items():
-            # Get participant details
-            giver = (
-                db.query(models.Participant)
-                .filter(
-                    models.Participant.email == giver_email,
-                    models.Participant.group_id == group_id,
-                )
-                .first()
-            )
-            receiver = (
-                db.query(models.Participant)
-                .filter(
-                    models.Participant.name == receiver_name,
-                    models.Participant.group_id == group_id,
-                )
-                .first()
-            )
-
-            if giver and receiver:
-                assignments.append(
-                    schemas.AssignmentResponse(
-                        giver_name=giver.name,
-                        giver_email=giver.email,
-                        receiver_name=receiver.name,
-                        receiver_email=receiver.email,
-                    )
-                )
+        records = assign_secret_santas(
+            db,
+            group_id,
+            assignment_data.year,
+            assignment_data.mode,
+            replace=assignment_data.replace_year,
+            min_cycle_length=assignment_data.min_cycle_length,
+            seed=seed,
+        )
+        assignments = [schemas.AssignmentResponse(**record) for record in records]
 
-        # Send emails if requested
+        # Queue emails if requested; delivery is tracked by the dispatch
         if send_emails:
             try:
-                send_assignments_via_email(assignments_dict)
+                dispatch = send_assignments_via_email(records, group_id=group_id)
             except Exception as e:
                 return schemas.AssignmentResult(
                     assignments=assignments,
                     success=True,
+                    seed=seed,
                     message=f"Assignments created but email sending failed: {str(e)}",
                 )
+            return schemas.AssignmentResult(
+                assignments=assignments,
+                success=True,
+                seed=seed,
+                message="Assignments created, emails are being sent",
+                dispatch_id=dispatch.id,
+            )
 
         return schemas.AssignmentResult(
             assignments=assignments,
             success=True,
+            seed=seed,
             message="Assignments created successfully",
         )
 
@@ -91,13 +82,162 @@ def create_assignment(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
+@router.post("/preview", response_model=schemas.AssignmentPreviewResult)
+def preview_assignment(
+    group_id: int,
+    settings: schemas.AssignmentSettings,
+    db: Session = Depends(get_read_db),
+):
+    """Run the solver without saving anything, e.g. to check a seed first"""
+    try:
+        return preview_secret_santas(
+            db,
+            group_id,
+            settings.year,
+            settings.mode,
+            settings.min_cycle_length,
+            settings.seed,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.post("/repair", response_model=schemas.AssignmentRepairResult)
+def repair_assignment(
+    group_id: int,
+    repair_data: schemas.AssignmentRepair,
+    send_emails: bool = Query(
+        False, description="Email the givers whose receiver changed"
+    ),
+    db: Session = Depends(get_db),
+):
+    """Patch a year's assignment after participants joined or left"""
+    seed = repair_data.seed if repair_data.seed is not None else new_seed()
+
+    try:
+        records, changed = repair_secret_santas(
+            db, group_id, repair_data.year, repair_data.mode, seed
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return _repair_result(records, changed, send_emails, group_id, seed)
+
+
+def _repair_result(
+    records: List[dict],
+    changed: List[dict],
+    send_emails: bool,
+    group_id: int,
+    seed: int,
+) -> schemas.AssignmentRepairResult:
+    result = schemas.AssignmentRepairResult(
+        assignments=[schemas.AssignmentResponse(**record) for record in records],
+        changed=[schemas.AssignmentResponse(**record) for record in changed],
+        success=True,
+        message=f"Assignments repaired, {len(changed)} pairing(s) changed",
+        seed=seed,
+    )
+    if send_emails and changed:
+        try:
+            result.dispatch_id = send_assignments_via_email(
+                changed, group_id=group_id
+            ).id
+        except Exception as e:
+            result.message += f", but email sending failed: {str(e)}"
+        else:
+            result.message += ", emails are being sent"
+    return result
+
+
+@router.get("/feasibility", response_model=schemas.FeasibilityReport)
+def get_assignment_feasibility(
+    group_id: int,
+    year: Optional[int] = Query(None, description="Defaults to the current year"),
+    db: Session = Depends(get_read_db),
+):
+    """Explain whether (and why not) the group can be assigned for a year"""
+    report = get_feasibility(db, group_id, year)
+    if report is None:
+        raise missing_group(group_id)
+    return report
+
+
+@router.get("/runs", response_model=List[schemas.AssignmentRunResponse])
+def get_assignment_runs(
+    group_id: int,
+    year: Optional[int] = None,
+    db: Session = Depends(get_read_db),
+):
+    """List the mode and seed behind each assignment run, oldest first"""
+    query = db.query(models.AssignmentRun).filter(
+        models.AssignmentRun.group_id == group_id
+    )
+    if year is not None:
+        query = query.filter(models.AssignmentRun.year == year)
+    return query.order_by(models.AssignmentRun.id).all()
+
+
 @router.get("/history", response_model=List[dict])
 def get_history(
     group_id: int,
+    response: Response,
     year: Optional[int] = None,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+    year_from: Optional[int] = Query(None, description="First year to include"),
+    year_to: Optional[int] = Query(None, description="Last year to include"),
+    cursor: Optional[str] = Query(
+        None, description="X-Next-Cursor header value from the previous page"
+    ),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size"),
+    db: Session = Depends(get_read_db),
 ):
-    """Get assignment history for a group"""
-    verify_group_ownership(group_id, current_user.id, db)
-    return get_assignment_history(db, group_id, year)
+    """Get assignment history for a group, optionally one page at a time"""
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    history = get_assignment_history(
+        db, group_id, year, year_from, year_to, after=after, limit=limit
+    )
+    if limit is not None and len(history) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(history[-1])
+    return history
+
+
+@router.get("/history/export")
+def export_history(
+    group_id: int,
+    year_from: Optional[int] = Query(None, description="First year to include"),
+    year_to: Optional[int] = Query(None, description="Last year to include"),
+    db: Session = Depends(get_read_db),
+):
+    """Stream a group's full assignment history as a JSON array"""
+    def generate():
+        yield "["
+        for i, row in enumerate(
+            iter_assignment_history(db, group_id, year_from, year_to)
+        ):
+            yield ("," if i else "") + json.dumps(row)
+        yield "]"
+
+    return StreamingResponse(
+        generate(),
+        media_type="application/json",
+        headers={
+            "Content-Disposition": f'attachment; filename="group-{group_id}-history.json"'
+        },
+    )
+
+
+@router.get("/dispatches/{dispatch_id}", response_model=schemas.DispatchStatus)
+def get_email_dispatch(
+    group_id: int,
+    dispatch_id: str,
+):
+    """Poll the delivery status of the emails sent for an assignment"""
+    dispatch = get_dispatch_status(dispatch_id)
+    if dispatch is None or dispatch["group_id"] != group_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Dispatch not found"
+        )
+    return dispatch
@@ -5,13 +5,14 @@ from sqlalchemy.orm import Session
 from .. import models, schemas
 from ..database import get_db
 from ..auth import (
-    authenticate_user,
+    authenticate_user_pooled,
     create_access_token,
-    get_password_hash,
+    hash_password_pooled,
     get_current_active_user,
     ACCESS_TOKEN_EXPIRE_MINUTES,
     create_password_reset_token,
     verify_password_reset_token,
+    invalidate_user_cache,
 )
 from ..services.email import send_password_reset_email
 import os
@@ -36,7 +37,7 @@ def register(user_data: schemas.UserCreate, db: Session = Depends(get_db)):
         )
 
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = hash_password_pooled(user_data.password)
     db_user = models.User(email=user_data.email, hashed_password=hashed_password)
     db.add(db_user)
     db.commit()
@@ -50,7 +51,7 @@ def login(
     form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
 ):
     """Login and get access token"""
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = authenticate_user_pooled(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -119,8 +120,9 @@ def reset_password(
             status_code=status.HTTP_400_BAD_REQUEST, detail="User not found"
         )
 
-    user.hashed_password = get_password_hash(payload.new_password)
+    user.hashed_password = hash_password_pooled(payload.new_password)
     db.add(user)
     db.commit()
+    invalidate_user_cache(user.email)
 
     return {"message": "Password has been reset successfully."}
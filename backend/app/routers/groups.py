@@ -1,9 +1,11 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Request, status
 from sqlalchemy.orm import Session
 from .. import models, schemas
-from ..database import get_db
+from ..database import get_db, get_read_db
 from ..auth import get_current_active_user
+from ..ownership import get_owned_group, missing_group
+from ..services.response_cache import cached_response, make_etag, store
 
 router = APIRouter(prefix="/api/groups", tags=["groups"])
 
@@ -26,33 +28,53 @@ def create_group(
 
 @router.get("", response_model=List[schemas.GroupResponse])
 def get_groups(
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(get_current_active_user),
 ):
     """Get all groups owned by the current user"""
-    groups = (
-        db.query(models.Group).filter(models.Group.owner_id == current_user.id).all()
+    versions = (
+        db.query(models.Group.id, models.Group.version)
+        .filter(models.Group.owner_id == current_user.id)
+        .order_by(models.Group.id)
+        .all()
     )
-    return groups
+    key = ("user", current_user.id, "groups")
+    etag = make_etag("groups", [tuple(row) for row in versions])
+    response = cached_response(request, key, etag)
+    if response is None:
+        groups = (
+            db.query(models.Group)
+            .filter(models.Group.owner_id == current_user.id)
+            .order_by(models.Group.id)
+            .all()
+        )
+        response = store(key, etag, List[schemas.GroupResponse], groups)
+    return response
 
 
 @router.get("/{group_id}", response_model=schemas.GroupResponse)
 def get_group(
     group_id: int,
+    request: Request,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+    group: models.Group = Depends(get_owned_group),
 ):
     """Get a specific group"""
-    group = (
-        db.query(models.Group)
-        .filter(models.Group.id == group_id, models.Group.owner_id == current_user.id)
-        .first()
+    # The owned group may be a cached copy; the version is always read fresh
+    version = (
+        db.query(models.Group.version).filter(models.Group.id == group_id).scalar()
     )
-    if not group:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Group not found"
+    if version is None:
+        raise missing_group(group_id)
+    key = (group_id, "group")
+    etag = make_etag("group", group_id, version)
+    response = cached_response(request, key, etag)
+    if response is None:
+        response = store(
+            key, etag, schemas.GroupResponse, db.get(models.Group, group_id)
         )
-    return group
+    return response
 
 
 @router.put("/{group_id}", response_model=schemas.GroupResponse)
@@ -60,18 +82,12 @@ def update_group(
     group_id: int,
     group: schemas.GroupCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+    owned_group: models.Group = Depends(get_owned_group),
 ):
     """Update a group"""
-    db_group = (
-        db.query(models.Group)
-        .filter(models.Group.id == group_id, models.Group.owner_id == current_user.id)
-        .first()
-    )
-    if not db_group:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Group not found"
-        )
+    db_group = db.get(models.Group, group_id)
+    if db_group is None:
+        raise missing_group(group_id)
     db_group.name = group.name
     db.commit()
     db.refresh(db_group)
@@ -82,18 +98,12 @@ def update_group(
 def delete_group(
     group_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+    owned_group: models.Group = Depends(get_owned_group),
 ):
     """Delete a group"""
-    db_group = (
-        db.query(models.Group)
-        .filter(models.Group.id == group_id, models.Group.owner_id == current_user.id)
-        .first()
-    )
-    if not db_group:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Group not found"
-        )
+    db_group = db.get(models.Group, group_id)
+    if db_group is None:
+        raise missing_group(group_id)
     db.delete(db_group)
     db.commit()
     return None
@@ -1,25 +1,37 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+import io
+from collections import Counter
+from typing import List, Literal, Optional
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+    status,
+)
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from .. import models, schemas
-from ..database import get_db
-from ..auth import get_current_active_user
-
-router = APIRouter(prefix="/api/groups/{group_id}/participants", tags=["participants"])
+from ..database import get_db, get_read_db
+from ..ownership import get_owned_group, missing_group
+from ..services import restrictions
+from ..services.participant_import import import_format, import_participants
+from ..services.response_cache import cached_response, make_etag, store
+
+router = APIRouter(
+    prefix="/api/groups/{group_id}/participants",
+    tags=["participants"],
+    dependencies=[Depends(get_owned_group)],
+)
 
 
-def verify_group_ownership(group_id: int, user_id: int, db: Session) -> models.Group:
-    """Verify that the user owns the group"""
-    group = (
-        db.query(models.Group)
-        .filter(models.Group.id == group_id, models.Group.owner_id == user_id)
-        .first()
+def duplicate_emails_error(emails) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Already a participant in this group: {', '.join(sorted(emails))}",
     )
-    if not group:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Group not found"
-        )
-    return group
 
 
 @router.post(
@@ -29,16 +41,17 @@ def create_participant(
     group_id: int,
     participant: schemas.ParticipantCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
 ):
     """Add a participant to a group"""
-    verify_group_ownership(group_id, current_user.id, db)
-
     db_participant = models.Participant(
         name=participant.name, email=participant.email, group_id=group_id
     )
     db.add(db_participant)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise duplicate_emails_error([participant.email])
     db.refresh(db_participant)
     return db_participant
 
@@ -52,10 +65,19 @@ def create_participants_bulk(
     group_id: int,
     bulk_data: schemas.BulkParticipantCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
 ):
     """Add multiple participants to a group at once"""
-    verify_group_ownership(group_id, current_user.id, db)
+    emails = Counter(participant.email for participant in bulk_data.participants)
+    taken = {email for email, count in emails.items() if count > 1}
+    taken.update(
+        email
+        for (email,) in db.query(models.Participant.email).filter(
+            models.Participant.group_id == group_id,
+            models.Participant.email.in_(emails),
+        )
+    )
+    if taken:
+        raise duplicate_emails_error(taken)
 
     db_participants = []
     for participant in bulk_data.participants:
@@ -65,20 +87,74 @@ def create_participants_bulk(
         db.add(db_participant)
         db_participants.append(db_participant)
 
-    db.commit()
-    for p in db_participants:
-        db.refresh(p)
-    return db_participants
+    try:
+        # The INSERT returns ids and created_at; read them before the commit
+        # expires the objects, instead of one refresh per participant
+        db.flush()
+        created = [
+            schemas.ParticipantResponse.model_validate(p) for p in db_participants
+        ]
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise duplicate_emails_error(emails)
+    return created
+
+
+@router.post(
+    "/import",
+    response_model=schemas.ParticipantImportResult,
+    status_code=status.HTTP_201_CREATED,
+)
+def import_participants_file(
+    group_id: int,
+    file: UploadFile = File(..., description="CSV or NDJSON roster"),
+    format: Optional[Literal["csv", "ndjson"]] = Query(
+        None, description="Guessed from the file name when omitted"
+    ),
+    db: Session = Depends(get_db),
+):
+    """Import participants and their allowed receivers from a CSV/NDJSON file"""
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        report = import_participants(
+            db,
+            group_id,
+            stream,
+            format or import_format(file.filename, file.content_type),
+        )
+        db.commit()
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The group changed during the import, please try again",
+        )
+    finally:
+        stream.detach()
+    return report
 
 
 @router.get("", response_model=List[schemas.ParticipantWithRestrictions])
 def get_participants(
     group_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+    request: Request,
+    db: Session = Depends(get_read_db),
 ):
     """Get all participants in a group"""
-    verify_group_ownership(group_id, current_user.id, db)
+    version = (
+        db.query(models.Group.version).filter(models.Group.id == group_id).scalar()
+    )
+    if version is None:
+        raise missing_group(group_id)
+    key = (group_id, "participants")
+    etag = make_etag("participants", group_id, version)
+    response = cached_response(request, key, etag)
+    if response is not None:
+        return response
 
     participants = (
         db.query(models.Participant)
@@ -98,7 +174,60 @@ def get_participants(
         )
         result.append(participant_data)
 
-    return result
+    return store(key, etag, List[schemas.ParticipantWithRestrictions], result)
+
+
+@router.get("/restrictions", response_model=schemas.RestrictionMatrix)
+def get_restriction_matrix(
+    group_id: int,
+    db: Session = Depends(get_read_db),
+):
+    """Get the allowed receivers of every restricted participant"""
+    return {"restrictions": restrictions.get_restriction_matrix(db, group_id)}
+
+
+@router.put("/restrictions", response_model=schemas.RestrictionMatrix)
+def replace_restriction_matrix(
+    group_id: int,
+    matrix: schemas.RestrictionMatrix,
+    db: Session = Depends(get_db),
+):
+    """Replace all of the group's restrictions in one transaction"""
+    try:
+        restrictions.replace_restriction_matrix(db, group_id, matrix.restrictions)
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    db.commit()
+    return {"restrictions": restrictions.get_restriction_matrix(db, group_id)}
+
+
+@router.get("/compact", response_model=schemas.CompactRoster)
+def get_compact_roster(
+    group_id: int,
+    db: Session = Depends(get_read_db),
+):
+    """Get all participants with their restrictions as a compact bit matrix"""
+    return restrictions.get_compact_roster(db, group_id)
+
+
+@router.put("/restrictions/compact", response_model=schemas.RestrictionGraph)
+def replace_restriction_graph(
+    group_id: int,
+    graph: schemas.RestrictionGraph,
+    db: Session = Depends(get_db),
+):
+    """Replace all of the group's restrictions from the compact form"""
+    try:
+        matrix = restrictions.decode_restriction_graph(
+            graph.participant_ids, graph.rows
+        )
+        restrictions.replace_restriction_matrix(db, group_id, matrix)
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    db.commit()
+    return restrictions.get_compact_roster(db, group_id)["restrictions"]
 
 
 @router.get("/{participant_id}", response_model=schemas.ParticipantWithRestrictions)
@@ -106,11 +235,8 @@ def get_participant(
     group_id: int,
     participant_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
 ):
     """Get a specific participant"""
-    verify_group_ownership(group_id, current_user.id, db)
-
     participant = (
         db.query(models.Participant)
         .filter(
@@ -141,11 +267,8 @@ def update_participant(
     participant_id: int,
     participant: schemas.ParticipantUpdate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
 ):
     """Update a participant"""
-    verify_group_ownership(group_id, current_user.id, db)
-
     db_participant = (
         db.query(models.Participant)
         .filter(
@@ -165,7 +288,11 @@ def update_participant(
     if participant.email is not None:
         db_participant.email = participant.email
 
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise duplicate_emails_error([participant.email])
     db.refresh(db_participant)
     return db_participant
 
@@ -175,11 +302,8 @@ def delete_participant(
     group_id: int,
     participant_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
 ):
     """Delete a participant"""
-    verify_group_ownership(group_id, current_user.id, db)
-
     db_participant = (
         db.query(models.Participant)
         .filter(
@@ -207,12 +331,35 @@ def update_restrictions(
     participant_id: int,
     restriction_data: schemas.RestrictionUpdate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
 ):
     """Update who a participant can be assigned to"""
-    verify_group_ownership(group_id, current_user.id, db)
+    return _edit_restrictions(
+        group_id,
+        participant_id,
+        db,
+        add=restriction_data.allowed_receiver_ids,
+        replace=True,
+    )
+
+
+@router.patch(
+    "/{participant_id}/restrictions", response_model=schemas.ParticipantWithRestrictions
+)
+def patch_restrictions(
+    group_id: int,
+    participant_id: int,
+    diff: schemas.RestrictionDiff,
+    db: Session = Depends(get_db),
+):
+    """Allow or disallow some receivers, leaving the others as they are"""
+    return _edit_restrictions(
+        group_id, participant_id, db, add=diff.add, remove=diff.remove
+    )
 
-    # Verify participant belongs to this group
+
+def _edit_restrictions(
+    group_id: int, participant_id: int, db: Session, **changes
+) -> schemas.ParticipantWithRestrictions:
     participant = (
         db.query(models.Participant)
         .filter(
@@ -221,47 +368,17 @@ def update_restrictions(
         )
         .first()
     )
-
     if not participant:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Participant not found"
         )
 
-    # Verify all receiver IDs belong to the same group
-    receiver_ids = set(restriction_data.allowed_receiver_ids)
-    all_participants = (
-        db.query(models.Participant)
-        .filter(models.Participant.group_id == group_id)
-        .all()
-    )
-    valid_ids = {p.id for p in all_participants}
-
-    if not receiver_ids.issubset(valid_ids):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Some receiver IDs do not belong to this group",
-        )
-
-    # Can't assign to self
-    if participant_id in receiver_ids:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="A participant cannot be assigned to themselves",
-        )
-
-    # Clear existing restrictions
-    participant.allowed_receivers.clear()
-
-    # Add new restrictions
-    receivers = (
-        db.query(models.Participant)
-        .filter(models.Participant.id.in_(restriction_data.allowed_receiver_ids))
-        .all()
-    )
-    participant.allowed_receivers = receivers
-
+    try:
+        restrictions.update_restrictions(db, group_id, participant_id, **changes)
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     db.commit()
-    db.refresh(participant)
 
     return schemas.ParticipantWithRestrictions(
         id=participant.id,
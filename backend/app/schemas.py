@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, field_validator
-from typing import List, Optional
+from pydantic import BaseModel, EmailStr, Field, field_validator
+from typing import Dict, List, Literal, Optional
 from datetime import datetime
 
 
@@ -113,14 +113,28 @@ class ParticipantWithRestrictions(ParticipantResponse):
 
 
 # Assignment schemas
-class AssignmentCreate(BaseModel):
-    group_id: int
+class AssignmentSettings(BaseModel):
     year: Optional[int] = None  # If None, uses current year
+    # "cycle" = one gift circle through everyone, "derangement" = smaller circles
+    # allowed, "min_cycle" = circles of at least min_cycle_length people,
+    # "weighted" = past pairings allowed but penalised, most recent the most
+    mode: Literal["cycle", "derangement", "min_cycle", "weighted"] = "cycle"
+    min_cycle_length: int = Field(3, ge=2)
+    # Same seed and same group state = same assignment; random when omitted
+    seed: Optional[int] = Field(None, ge=0, le=2**31 - 1)
+
+
+class AssignmentCreate(AssignmentSettings):
+    group_id: int
+    # Replace an assignment already saved for this year instead of adding to it
+    replace_year: bool = False
 
 
 class AssignmentResponse(BaseModel):
+    giver_id: int
     giver_name: str
     giver_email: str
+    receiver_id: int
     receiver_name: str
     receiver_email: str
 
@@ -129,6 +143,111 @@ class AssignmentResult(BaseModel):
     assignments: List[AssignmentResponse]
     success: bool
     message: Optional[str] = None
+    dispatch_id: Optional[str] = None  # Poll for email delivery when emails are sent
+    seed: Optional[int] = None  # Pass back to reproduce this assignment
+
+
+class SolverStatsResponse(BaseModel):
+    elapsed_ms: float
+    nodes: int  # Search states expanded
+    backtracks: int
+    cached: bool  # Served from the solution cache; the rest is the original solve
+    cost: Optional[float] = None  # Weighted mode: total repeat-pairing penalty
+
+
+class AssignmentPreviewResult(BaseModel):
+    assignments: List[AssignmentResponse]
+    year: int
+    seed: int  # Create with this seed to save exactly this assignment
+    stats: SolverStatsResponse
+
+
+class AssignmentRepair(BaseModel):
+    year: Optional[int] = None  # If None, uses current year
+    mode: Literal["cycle", "derangement"] = "cycle"
+    seed: Optional[int] = Field(None, ge=0, le=2**31 - 1)
+
+
+class AssignmentRepairResult(AssignmentResult):
+    # Givers whose receiver changed; only they are emailed
+    changed: List[AssignmentResponse]
+
+
+class AssignmentRunResponse(BaseModel):
+    id: int
+    year: int
+    mode: str
+    seed: int
+    min_cycle_length: Optional[int] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+# Email dispatch schemas
+class EmailJobStatus(BaseModel):
+    recipient: str
+    status: str  # pending, sending, sent or failed
+    attempts: int
+    error: Optional[str] = None
+
+
+class DispatchStatus(BaseModel):
+    id: str
+    status: str  # running, completed, partial or failed
+    total: int
+    sent: int
+    failed: int
+    pending: int
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    jobs: List[EmailJobStatus]
+
+
+# Feasibility analysis schemas
+class ParticipantRef(BaseModel):
+    id: int
+    name: str
+
+
+class ParticipantDegree(BaseModel):
+    participant_id: int
+    name: str
+    out_degree: int  # Participants they may give to this year
+    in_degree: int  # Participants who may give to them this year
+    component: int  # Index into FeasibilityReport.components
+
+
+class HallViolation(BaseModel):
+    # side="givers": every possible receiver of ``givers`` is in ``receivers``
+    # and there are fewer receivers than givers; side="receivers": the reverse
+    side: Literal["givers", "receivers"]
+    givers: List[ParticipantRef]
+    receivers: List[ParticipantRef]
+
+
+class BlockingConstraint(BaseModel):
+    giver_id: int
+    giver_name: str
+    receiver_id: int
+    receiver_name: str
+    restricted: bool  # Excluded by the giver's allowed receivers
+    history_years: List[int]  # Excluded because of these past assignments
+    modes: List[str]  # Assignment modes that need this pair lifted
+
+
+class FeasibilityReport(BaseModel):
+    year: int
+    participant_count: int
+    derangement_feasible: bool  # Exact: an assignment with small circles exists
+    # Also needed for one gift circle through everyone
+    strongly_connected: bool
+    participants: List[ParticipantDegree]
+    # Strongly connected components, edges between them only point forward
+    components: List[List[ParticipantRef]]
+    hall_violations: List[HallViolation]
+    blocking_constraints: List[BlockingConstraint]
 
 
 # Bulk operations
@@ -139,3 +258,39 @@ class BulkParticipantCreate(BaseModel):
 class RestrictionUpdate(BaseModel):
     giver_id: int
     allowed_receiver_ids: List[int]
+
+
+class RestrictionDiff(BaseModel):
+    add: List[int] = []  # Receiver ids to allow
+    remove: List[int] = []  # Receiver ids to stop allowing
+
+
+class RestrictionMatrix(BaseModel):
+    # Allowed receiver ids per giver id; givers left out may give to anyone
+    restrictions: Dict[int, List[int]]
+
+
+class RestrictionGraph(BaseModel):
+    # Row i holds the allowed receivers of participant_ids[i] as positions in
+    # participant_ids, base64 encoded (see services/restrictions.py); null
+    # means the participant may give to anyone
+    participant_ids: List[int]
+    rows: List[Optional[str]]
+
+
+class CompactRoster(BaseModel):
+    participants: List[ParticipantResponse]
+    restrictions: RestrictionGraph
+
+
+class ImportRowError(BaseModel):
+    row: int  # Line number in the uploaded file
+    email: Optional[str] = None
+    detail: str
+
+
+class ParticipantImportResult(BaseModel):
+    created: int
+    restrictions: int
+    errors: List[ImportRowError]  # The first 1000
+    error_count: int
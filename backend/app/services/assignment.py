@@ -1,170 +1,511 @@
-from typing import List, Dict, Optional
-from sqlalchemy.orm import Session
+import asyncio
+import hashlib
 import random
-from .. import models
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, List, Dict, Optional, Sequence, Tuple
+from sqlalchemy.orm import Session
+from ..metrics import SOLVER_BACKTRACKS, SOLVER_NODES, SOLVER_SECONDS
+from .graph import ParticipantGraph, load_participant_graph
+from .history import (
+    record_assignment_run,
+    save_assignment_history,
+    update_assignment_history,
+)
+from .min_cost import assignment_cost, find_weighted
+from .solver import (
+    DEFAULT_MIN_CYCLE_LENGTH,
+    InfeasibleError,
+    SearchBudgetExceeded,
+    SolverResult,
+    find_cycle,
+    find_derangement,
+    find_min_cycle,
+    repair_successors,
+)
 from datetime import datetime
 
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+# Assignment modes understood by assign_secret_santas
+SOLVER_MODES = {
+    "cycle": find_cycle,
+    "derangement": find_derangement,
+    "min_cycle": find_min_cycle,
+    "weighted": find_weighted,
+}
+
+# Weighted mode: a pairing from last year costs 1, from the year before this
+# much, and so on
+HISTORY_DECAY = 0.5
+
+# Solutions kept by input hash; a solve is a pure function of its inputs and
+# seed, so entries never go stale and only need evicting for size
+SOLUTION_CACHE_SIZE = 256
+
+_solutions: "OrderedDict[str, SolverResult]" = OrderedDict()
+_solutions_lock = threading.Lock()
+_solution_stats = {"hits": 0, "misses": 0}
+
+
+def new_seed() -> int:
+    """A random seed that fits the assignment_runs.seed column"""
+    return secrets.randbits(31)
+
+
+def solution_key(
+    graph: ParticipantGraph,
+    adjacency: Sequence[int],
+    options: Dict,
+    mode: str,
+    seed: int,
+) -> str:
+    """Hash of everything a solve depends on"""
+    digest = hashlib.sha256()
+    digest.update(f"{mode}:{seed}:{options.get('min_length')}".encode())
+    digest.update(",".join(str(row.id) for row in graph.participants).encode())
+    digest.update(",".join(format(mask, "x") for mask in adjacency).encode())
+    for penalties in options.get("costs") or ():
+        digest.update(repr(sorted(penalties.items())).encode())
+    return digest.hexdigest()
+
+
+def solution_cache_stats() -> Dict:
+    with _solutions_lock:
+        return {"size": len(_solutions), **_solution_stats}
+
+
+def clear_solution_cache() -> None:
+    with _solutions_lock:
+        _solutions.clear()
+
+
+def _solve(
+    graph: ParticipantGraph,
+    adjacency: List[int],
+    options: Dict,
+    mode: str,
+    seed: int,
+) -> Tuple[SolverResult, bool]:
+    """Run (or look up) one solve; returns the result and whether it was cached"""
+    key = solution_key(graph, adjacency, options, mode, seed)
+    with _solutions_lock:
+        result = _solutions.get(key)
+        if result is not None:
+            _solutions.move_to_end(key)
+            _solution_stats["hits"] += 1
+            return result, True
+        _solution_stats["misses"] += 1
+
+    started = time.perf_counter()
+    outcome = "failed"
+    try:
+        with _solver_errors(graph.participants):
+            result = SOLVER_MODES[mode](adjacency, random.Random(seed), **options)
+        outcome = "solved"
+    finally:
+        SOLVER_SECONDS.observe(time.perf_counter() - started, mode, outcome)
+    SOLVER_NODES.observe(result.stats.nodes, mode)
+    SOLVER_BACKTRACKS.inc(mode, amount=result.stats.backtracks)
+    result.successors = tuple(result.successors)
+    with _solutions_lock:
+        _solutions[key] = result
+        while len(_solutions) > SOLUTION_CACHE_SIZE:
+            _solutions.popitem(last=False)
+    return result, False
+
+
+def _describe_infeasible(error: InfeasibleError, participants: Sequence) -> str:
+    """Turn a solver infeasibility witness into a message for the organiser"""
+    givers = [participants[i].name for i in error.givers]
+    receivers = [participants[i].name for i in error.receivers]
+    if len(givers) == 1 and not receivers:
+        return (
+            f"No valid assignment options for {givers[0]}. "
+            "They may have already been assigned to all available participants "
+            "or have too many restrictions."
+        )
+    if receivers and not givers:
+        return (
+            f"Nobody can be assigned to {receivers[0]}. "
+            "Check the restrictions and past assignments pointing at them."
+        )
+    if receivers:
+        return (
+            f"{', '.join(givers)} can only be assigned to {len(receivers)} "
+            f"participant(s) between them ({', '.join(receivers)}). "
+            "Try adjusting restrictions or clearing some past assignments."
+        )
+    if not givers:
+        # An exhaustive search came up empty without a small witness to point at
+        return (
+            "No valid Secret Santa assignment could be created. The restrictions "
+            "and past assignments leave no way to arrange everyone into the gift "
+            "circles this mode needs. Try adjusting restrictions or clearing some "
+            "past assignments."
+        )
+    return (
+        "No valid Secret Santa assignment could be created. "
+        f"{', '.join(givers)} cannot be connected into a single gift circle "
+        "with everyone else. Try adjusting restrictions or clearing some past "
+        "assignments."
+    )
+
+
+def _solver_input(
+    graph: ParticipantGraph, year: int, mode: str, min_cycle_length: int
+) -> Tuple[List[int], Dict]:
+    """The adjacency and extra solver arguments for ``mode``"""
+    if mode not in SOLVER_MODES:
+        raise ValueError(f"Unknown assignment mode: {mode}")
+    if len(graph.participants) < 2:
+        raise ValueError("Need at least 2 participants for Secret Santa")
+
+    # A participant can give to someone if:
+    # 1. They are in their allowed_receivers list (when one is set), AND
+    # 2. They haven't been assigned to them in another year in this group
+    #    (in weighted mode that only makes the pairing more expensive)
+    options = {}
+    if mode == "weighted":
+        adjacency = graph.adjacency(year, history=False)
+        options["costs"] = graph.penalties(year, HISTORY_DECAY)
+    else:
+        adjacency = graph.adjacency(year)
+    if mode == "min_cycle":
+        options["min_length"] = min_cycle_length
+    return adjacency, options
+
+
+def plan_assignments(
+    graph: ParticipantGraph,
+    year: int,
+    mode: str,
+    min_cycle_length: int = DEFAULT_MIN_CYCLE_LENGTH,
+    seed: Optional[int] = None,
+    on_result: Optional[Callable[[SolverResult], None]] = None,
+) -> List[Dict]:
+    """
+    Solve a loaded group graph without touching the database. Returns one
+    record per giver with the giver's and receiver's id, name and email.
+    The same graph, mode and ``seed`` always give the same assignment, and
+    repeats are answered from the solution cache. ``on_result`` is called
+    with the raw SolverResult, e.g. for the benchmarks to read its stats.
+    """
+    adjacency, options = _solver_input(graph, year, mode, min_cycle_length)
+    if seed is None:
+        seed = new_seed()
+    result, _ = _solve(graph, adjacency, options, mode, seed)
+    if on_result is not None:
+        on_result(result)
+    return _records(graph.participants, result.successors)
+
+
+def preview_assignments(
+    graph: ParticipantGraph,
+    year: int,
+    mode: str,
+    min_cycle_length: int = DEFAULT_MIN_CYCLE_LENGTH,
+    seed: Optional[int] = None,
+) -> Dict:
+    """
+    plan_assignments() plus the solver statistics, for dry runs. Creating the
+    assignment with the returned seed afterwards saves exactly this preview
+    (straight from the solution cache while the group is unchanged).
+    """
+    adjacency, options = _solver_input(graph, year, mode, min_cycle_length)
+    if seed is None:
+        seed = new_seed()
+    result, cached = _solve(graph, adjacency, options, mode, seed)
+    return {
+        "assignments": _records(graph.participants, result.successors),
+        "year": year,
+        "seed": seed,
+        "stats": {
+            "elapsed_ms": result.stats.elapsed * 1000,
+            "nodes": result.stats.nodes,
+            "backtracks": result.stats.backtracks,
+            "cached": cached,
+            "cost": (
+                assignment_cost(result.successors, options["costs"])
+                if mode == "weighted"
+                else None
+            ),
+        },
+    }
+
+
+def plan_repair(
+    graph: ParticipantGraph, year: int, mode: str, seed: Optional[int] = None
+) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Repair the assignment recorded for ``year`` after the roster or the
+    restrictions changed, without touching the database. Returns the records
+    for every giver and the records of the givers whose receiver changed.
+    """
+    if mode not in ("cycle", "derangement"):
+        raise ValueError(f"Assignments cannot be repaired in {mode} mode")
+
+    participants = graph.participants
+    previous = graph.year_successors(year)
+    if not previous:
+        raise ValueError(f"No assignment recorded for {year} to repair")
+    if len(participants) < 2:
+        raise ValueError("Need at least 2 participants for Secret Santa")
+
+    earlier = [previous.get(i, -1) for i in range(len(participants))]
+    with _solver_errors(participants):
+        successors = repair_successors(
+            graph.adjacency(year),
+            earlier,
+            require_cycle=mode == "cycle",
+            rng=random.Random(seed),
+        )
+
+    assignments = _records(participants, successors)
+    changed = [
+        record
+        for record, before, after in zip(assignments, earlier, successors)
+        if before != after
+    ]
+    return assignments, changed
+
+
+@contextmanager
+def _solver_errors(participants: Sequence):
+    """Turn solver failures into ValueErrors the routers report as 400"""
+    try:
+        yield
+    except InfeasibleError as e:
+        raise ValueError(_describe_infeasible(e, participants)) from e
+    except SearchBudgetExceeded as e:
+        raise ValueError(
+            "No valid Secret Santa assignment could be found in time. "
+            "Try adjusting restrictions or clearing some past assignments."
+        ) from e
+
+
+def _records(participants: Sequence, successors: Sequence[int]) -> List[Dict]:
+    assignments = []
+    for i, j in enumerate(successors):
+        giver = participants[i]
+        receiver = participants[j]
+        assignments.append(
+            {
+                "giver_id": giver.id,
+                "giver_name": giver.name,
+                "giver_email": giver.email,
+                "receiver_id": receiver.id,
+                "receiver_name": receiver.name,
+                "receiver_email": receiver.email,
+            }
+        )
+    return assignments
+
 
 def assign_secret_santas(
-    db: Session, group_id: int, year: Optional[int] = None
-) -> Dict[str, str]:
+    db: Session,
+    group_id: int,
+    year: Optional[int] = None,
+    mode: str = "cycle",
+    replace: bool = False,
+    min_cycle_length: int = DEFAULT_MIN_CYCLE_LENGTH,
+    seed: Optional[int] = None,
+    on_result: Optional[Callable[[SolverResult], None]] = None,
+) -> List[Dict]:
     """
-    Assign Secret Santas using DFS algorithm to create a circular assignment.
-    Returns a dict mapping giver_email -> receiver_name
+    Assign Secret Santas for a group and record them in the history.
+
+    ``mode`` is one of "cycle" (one gift-giving circle through everyone),
+    "derangement" (everyone gives and receives once, smaller circles allowed),
+    "min_cycle" (circles of at least ``min_cycle_length`` people) or
+    "weighted" (past pairings are allowed again but cost more the more recent
+    they are; the cheapest assignment wins).
+    With ``replace`` any assignment already recorded for ``year`` is replaced.
+    ``seed`` (random when omitted) is stored with the year so the assignment
+    can be reproduced. ``on_result`` is passed on to plan_assignments().
+    Returns one record per giver with the giver's and receiver's id, name
+    and email, so callers never need to look participants up again.
     """
     if year is None:
         year = datetime.now().year
+    if mode not in SOLVER_MODES:
+        raise ValueError(f"Unknown assignment mode: {mode}")
 
-    # Get all participants for this group
-    participants = (
-        db.query(models.Participant)
-        .filter(models.Participant.group_id == group_id)
-        .all()
+    if seed is None:
+        seed = new_seed()
+
+    graph = load_participant_graph(db, group_id)
+    assignments = plan_assignments(
+        graph, year, mode, min_cycle_length, seed, on_result
     )
 
-    if len(participants) < 2:
-        raise ValueError("Need at least 2 participants for Secret Santa")
+    _save_assignment(
+        db, group_id, year, assignments, mode, seed, min_cycle_length, replace
+    )
+    db.commit()
+    return assignments
 
-    # Build options map: who can give to whom
-    # A participant can give to someone if:
-    # 1. They are in their allowed_receivers list, OR
-    # 2. They haven't been assigned to them in previous years
-    options = {}
-    email_map = {}
-    name_to_participant = {}
-
-    for participant in participants:
-        email_map[participant.name] = participant.email
-        name_to_participant[participant.name] = participant
-
-        # Start with all other participants as potential receivers
-        potential_receivers = [p for p in participants if p.id != participant.id]
-
-        # Filter by allowed_receivers (restrictions)
-        if participant.allowed_receivers:
-            # Only include participants in allowed_receivers
-            allowed_ids = {p.id for p in participant.allowed_receivers}
-            potential_receivers = [
-                p for p in potential_receivers if p.id in allowed_ids
-            ]
-
-        # Filter out past assignments (from previous years)
-        if participant.past_assignments:
-            past_ids = {p.id for p in participant.past_assignments}
-            potential_receivers = [
-                p for p in potential_receivers if p.id not in past_ids
-            ]
-
-        options[participant.name] = [p.name for p in potential_receivers]
-
-        # Check if this participant has any valid options
-        if not options[participant.name]:
-            raise ValueError(
-                f"No valid assignment options for {participant.name}. "
-                "They may have already been assigned to all available participants "
-                "or have too many restrictions."
-            )
-
-    # DFS to find a valid circular assignment
-    names = [p.name for p in participants]
-    random.shuffle(names)
-
-    found_path = None
-
-    def dfs(path: List[str]) -> Optional[Dict[str, str]]:
-        """Depth-first search to find a valid circular path"""
-        nonlocal found_path
-        if len(path) == len(names):
-            # Check if we can close the circle
-            if path[0] in options[path[-1]]:
-                # Create assignments dict
-                assignments = {}
-                for i in range(len(path)):
-                    giver_name = path[i]
-                    receiver_name = path[(i + 1) % len(path)]
-                    assignments[email_map[giver_name]] = receiver_name
-                found_path = path  # Store the actual path found
-                return assignments
-            return None
-
-        current = path[-1]
-        # Try all valid options
-        for next_person in options[current]:
-            if next_person not in path:
-                result = dfs(path + [next_person])
-                if result:
-                    return result
-        return None
-
-    # Try starting from each participant
-    for start_person in names:
-        result = dfs([start_person])
-        if result and found_path:
-            # Save assignments to history using the actual path found
-            from sqlalchemy import select
-
-            for i, giver_name in enumerate(found_path):
-                receiver_name = found_path[(i + 1) % len(found_path)]
-                giver = name_to_participant[giver_name]
-                receiver = name_to_participant[receiver_name]
-
-                # Check if this assignment already exists
-                stmt = select(models.assignment_history).where(
-                    models.assignment_history.c.giver_id == giver.id,
-                    models.assignment_history.c.receiver_id == receiver.id,
-                    models.assignment_history.c.group_id == group_id,
-                    models.assignment_history.c.year == year,
-                )
-                existing = db.execute(stmt).first()
-
-                if not existing:
-                    # Add to history
-                    insert_stmt = models.assignment_history.insert().values(
-                        giver_id=giver.id,
-                        receiver_id=receiver.id,
-                        group_id=group_id,
-                        year=year,
-                    )
-                    db.execute(insert_stmt)
-
-            db.commit()
-            return result
-
-    raise ValueError(
-        "No valid Secret Santa assignment could be created. "
-        "Try adjusting restrictions or clearing some past assignments."
+
+def _save_assignment(
+    db: Session,
+    group_id: int,
+    year: int,
+    assignments: List[Dict],
+    mode: str,
+    seed: int,
+    min_cycle_length: int,
+    replace: bool,
+) -> None:
+    save_assignment_history(
+        db,
+        group_id,
+        year,
+        [(a["giver_id"], a["receiver_id"]) for a in assignments],
+        replace=replace,
+    )
+    record_assignment_run(
+        db,
+        group_id,
+        year,
+        mode,
+        seed,
+        min_cycle_length if mode == "min_cycle" else None,
+        replace=replace,
     )
 
 
-def get_assignment_history(
-    db: Session, group_id: int, year: Optional[int] = None
+async def assign_secret_santas_async(
+    db: "AsyncSession",
+    group_id: int,
+    year: Optional[int] = None,
+    mode: str = "cycle",
+    replace: bool = False,
+    min_cycle_length: int = DEFAULT_MIN_CYCLE_LENGTH,
+    seed: Optional[int] = None,
 ) -> List[Dict]:
-    """Get assignment history for a group"""
-    from sqlalchemy import select
-
-    query = select(
-        models.assignment_history.c.giver_id,
-        models.assignment_history.c.receiver_id,
-        models.assignment_history.c.year,
-    ).where(models.assignment_history.c.group_id == group_id)
-
-    if year:
-        query = query.where(models.assignment_history.c.year == year)
-
-    results = db.execute(query).fetchall()
-
-    # Get participant names
-    history = []
-    for row in results:
-        giver = db.query(models.Participant).filter_by(id=row.giver_id).first()
-        receiver = db.query(models.Participant).filter_by(id=row.receiver_id).first()
-        if giver and receiver:
-            history.append(
-                {
-                    "giver_name": giver.name,
-                    "receiver_name": receiver.name,
-                    "year": row.year,
-                }
-            )
-
-    return history
+    """
+    assign_secret_santas() for an AsyncSession. The solver runs in a worker
+    thread so a large group does not stall the event loop.
+    """
+    if year is None:
+        year = datetime.now().year
+    if mode not in SOLVER_MODES:
+        raise ValueError(f"Unknown assignment mode: {mode}")
+
+    if seed is None:
+        seed = new_seed()
+
+    graph = await db.run_sync(load_participant_graph, group_id)
+    assignments = await asyncio.to_thread(
+        plan_assignments, graph, year, mode, min_cycle_length, seed
+    )
+
+    await db.run_sync(
+        _save_assignment,
+        group_id,
+        year,
+        assignments,
+        mode,
+        seed,
+        min_cycle_length,
+        replace,
+    )
+    await db.commit()
+    return assignments
+
+
+def preview_secret_santas(
+    db: Session,
+    group_id: int,
+    year: Optional[int] = None,
+    mode: str = "cycle",
+    min_cycle_length: int = DEFAULT_MIN_CYCLE_LENGTH,
+    seed: Optional[int] = None,
+) -> Dict:
+    """
+    Dry run of assign_secret_santas(): only reads the group, so nothing is
+    written and no write transaction is opened.
+    """
+    if year is None:
+        year = datetime.now().year
+    graph = load_participant_graph(db, group_id)
+    return preview_assignments(graph, year, mode, min_cycle_length, seed)
+
+
+async def preview_secret_santas_async(
+    db: "AsyncSession",
+    group_id: int,
+    year: Optional[int] = None,
+    mode: str = "cycle",
+    min_cycle_length: int = DEFAULT_MIN_CYCLE_LENGTH,
+    seed: Optional[int] = None,
+) -> Dict:
+    """preview_secret_santas() for an AsyncSession"""
+    if year is None:
+        year = datetime.now().year
+    graph = await db.run_sync(load_participant_graph, group_id)
+    return await asyncio.to_thread(
+        preview_assignments, graph, year, mode, min_cycle_length, seed
+    )
+
+
+def repair_secret_santas(
+    db: Session,
+    group_id: int,
+    year: Optional[int] = None,
+    mode: str = "cycle",
+    seed: Optional[int] = None,
+) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Incrementally repair a year's assignment after participants were added or
+    removed (or restrictions changed) instead of reshuffling everyone. Only
+    the history rows of givers whose receiver changed are rewritten. Returns
+    ``(assignments, changed)`` as in plan_repair().
+    """
+    if year is None:
+        year = datetime.now().year
+    if seed is None:
+        seed = new_seed()
+
+    graph = load_participant_graph(db, group_id)
+    assignments, changed = plan_repair(graph, year, mode, seed)
+
+    _save_repair(db, group_id, year, changed, seed)
+    db.commit()
+    return assignments, changed
+
+
+async def repair_secret_santas_async(
+    db: "AsyncSession",
+    group_id: int,
+    year: Optional[int] = None,
+    mode: str = "cycle",
+    seed: Optional[int] = None,
+) -> Tuple[List[Dict], List[Dict]]:
+    """repair_secret_santas() for an AsyncSession"""
+    if year is None:
+        year = datetime.now().year
+    if seed is None:
+        seed = new_seed()
+
+    graph = await db.run_sync(load_participant_graph, group_id)
+    assignments, changed = await asyncio.to_thread(
+        plan_repair, graph, year, mode, seed
+    )
+
+    await db.run_sync(_save_repair, group_id, year, changed, seed)
+    await db.commit()
+    return assignments, changed
+
+
+def _save_repair(
+    db: Session, group_id: int, year: int, changed: List[Dict], seed: int
+) -> None:
+    update_assignment_history(
+        db, group_id, year, [(a["giver_id"], a["receiver_id"]) for a in changed]
+    )
+    record_assignment_run(db, group_id, year, "repair", seed)
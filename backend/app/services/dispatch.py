@@ -0,0 +1,305 @@
+"""
+Background dispatch of notification emails.
+
+A dispatch is a batch of messages, one job per recipient. Jobs run on a shared
+thread pool with bounded concurrency, grouped into chunks when the transport
+can send several messages per request, and failed jobs are retried with
+exponential backoff. Their status is written to the email_dispatches tables,
+so the API can return a dispatch id right away and any worker can answer a
+poll for progress, including after a restart.
+"""
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, select, update
+
+from .. import models
+from ..database import SessionLocal
+from ..metrics import EMAIL_MESSAGES, EMAIL_SEND_SECONDS
+from .transport import MailTransport, OutgoingEmail, get_transport
+
+logger = logging.getLogger(__name__)
+
+EMAIL_CONCURRENCY = int(os.getenv("EMAIL_CONCURRENCY", "8"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "4"))
+EMAIL_RETRY_BASE_DELAY = float(os.getenv("EMAIL_RETRY_BASE_DELAY", "1.0"))
+# Days a finished dispatch stays available for polling
+DISPATCH_RETENTION_DAYS = int(os.getenv("DISPATCH_RETENTION_DAYS", "30"))
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+
+def _overall_status(total: int, failed: int, pending: int) -> str:
+    if pending:
+        return "running"
+    if not failed:
+        return "completed"
+    return "failed" if failed == total else "partial"
+
+
+@dataclass
+class EmailJob:
+    message: OutgoingEmail
+    position: int
+    status: str = PENDING
+    attempts: int = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class Dispatch:
+    id: str
+    group_id: Optional[int]
+    jobs: List[EmailJob]
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    finished_at: Optional[datetime] = None
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def count(self, status: str) -> int:
+        return sum(1 for job in self.jobs if job.status == status)
+
+    @property
+    def done(self) -> bool:
+        return all(job.status in (SENT, FAILED) for job in self.jobs)
+
+    @property
+    def status(self) -> str:
+        failed = self.count(FAILED)
+        pending = len(self.jobs) - self.count(SENT) - failed
+        return _overall_status(len(self.jobs), failed, pending)
+
+    def summary(self) -> Dict:
+        with self.lock:
+            return {
+                "id": self.id,
+                "status": self.status,
+                "total": len(self.jobs),
+                "sent": self.count(SENT),
+                "failed": self.count(FAILED),
+                "pending": len(self.jobs) - self.count(SENT) - self.count(FAILED),
+                "created_at": self.created_at,
+                "finished_at": self.finished_at,
+                "jobs": [
+                    {
+                        "recipient": job.message.to,
+                        "status": job.status,
+                        "attempts": job.attempts,
+                        "error": job.error,
+                    }
+                    for job in self.jobs
+                ],
+            }
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=EMAIL_CONCURRENCY, thread_name_prefix="email"
+            )
+        return _executor
+
+
+def _store_dispatch(dispatch: Dispatch) -> None:
+    """Insert a new dispatch and its jobs, dropping expired finished ones"""
+    cutoff = dispatch.created_at - timedelta(days=DISPATCH_RETENTION_DAYS)
+    with SessionLocal() as db:
+        expired = select(models.EmailDispatch.id).where(
+            models.EmailDispatch.finished_at < cutoff
+        )
+        db.execute(
+            delete(models.EmailDispatchJob)
+            .where(models.EmailDispatchJob.dispatch_id.in_(expired))
+            .execution_options(synchronize_session=False)
+        )
+        db.execute(
+            delete(models.EmailDispatch)
+            .where(models.EmailDispatch.finished_at < cutoff)
+            .execution_options(synchronize_session=False)
+        )
+        db.add(
+            models.EmailDispatch(
+                id=dispatch.id,
+                group_id=dispatch.group_id,
+                created_at=dispatch.created_at,
+                finished_at=dispatch.finished_at,
+            )
+        )
+        db.flush()
+        if dispatch.jobs:
+            db.execute(
+                models.EmailDispatchJob.__table__.insert(),
+                [
+                    {
+                        "dispatch_id": dispatch.id,
+                        "position": job.position,
+                        "recipient": job.message.to,
+                        "status": job.status,
+                        "attempts": job.attempts,
+                    }
+                    for job in dispatch.jobs
+                ],
+            )
+        db.commit()
+
+
+def _store_progress(dispatch: Dispatch, jobs: List[EmailJob]) -> None:
+    """Write the latest status of ``jobs`` (and the finish time, once done)"""
+    with dispatch.lock:
+        rows = [
+            {
+                "dispatch_id": dispatch.id,
+                "position": job.position,
+                "status": job.status,
+                "attempts": job.attempts,
+                "error": job.error,
+            }
+            for job in jobs
+        ]
+        finished_at = dispatch.finished_at
+    try:
+        with SessionLocal() as db:
+            db.execute(update(models.EmailDispatchJob), rows)
+            if finished_at is not None:
+                db.execute(
+                    update(models.EmailDispatch)
+                    .where(models.EmailDispatch.id == dispatch.id)
+                    .values(finished_at=finished_at)
+                )
+            db.commit()
+    except Exception:
+        # Delivery carries on; only the polled status falls behind
+        logger.exception("Could not store the progress of dispatch %s", dispatch.id)
+
+
+def _run_chunk(
+    dispatch: Dispatch, jobs: List[EmailJob], transport: MailTransport
+) -> None:
+    """Send a chunk of jobs in one transport call, retrying only the failures"""
+    pending = jobs
+    while pending:
+        with dispatch.lock:
+            for job in pending:
+                job.status = SENDING
+                job.attempts += 1
+        started = time.perf_counter()
+        try:
+            errors = transport.send_batch([job.message for job in pending])
+        except Exception as e:
+            errors = [e] * len(pending)
+        EMAIL_SEND_SECONDS.observe(time.perf_counter() - started, transport.name)
+        failures = sum(error is not None for error in errors)
+        EMAIL_MESSAGES.inc(transport.name, "sent", amount=len(pending) - failures)
+        EMAIL_MESSAGES.inc(transport.name, "error", amount=failures)
+
+        retry = []
+        with dispatch.lock:
+            for job, error in zip(pending, errors):
+                if error is None:
+                    job.status = SENT
+                    job.error = None
+                    continue
+                logger.warning(
+                    "Sending email to %s failed (attempt %d): %s",
+                    job.message.to,
+                    job.attempts,
+                    error,
+                )
+                if job.attempts >= EMAIL_MAX_ATTEMPTS:
+                    job.status = FAILED
+                    job.error = str(error)
+                else:
+                    job.status = PENDING
+                    retry.append(job)
+        if retry:
+            # Exponential backoff with jitter
+            delay = EMAIL_RETRY_BASE_DELAY * 2 ** (retry[0].attempts - 1)
+            _store_progress(dispatch, pending)
+            time.sleep(delay * random.uniform(0.5, 1.5))
+        pending = retry
+
+    with dispatch.lock:
+        if dispatch.done and dispatch.finished_at is None:
+            dispatch.finished_at = datetime.now(timezone.utc)
+    _store_progress(dispatch, jobs)
+
+
+def start_dispatch(
+    messages: Iterable[OutgoingEmail],
+    group_id: Optional[int] = None,
+    transport: Optional[MailTransport] = None,
+) -> Dispatch:
+    """
+    Queue one job per message and return without waiting for delivery. The
+    dispatch is stored before any job starts, so it can be polled right away.
+    """
+    transport = transport or get_transport()
+    dispatch = Dispatch(
+        id=uuid.uuid4().hex,
+        group_id=group_id,
+        jobs=[EmailJob(message, i) for i, message in enumerate(messages)],
+    )
+    if not dispatch.jobs:
+        dispatch.finished_at = dispatch.created_at
+    _store_dispatch(dispatch)
+
+    # One task per transport batch (a single message unless it batches)
+    executor = _get_executor()
+    size = max(1, transport.batch_size)
+    for start in range(0, len(dispatch.jobs), size):
+        executor.submit(
+            _run_chunk, dispatch, dispatch.jobs[start:start + size], transport
+        )
+    return dispatch
+
+
+def get_dispatch_status(dispatch_id: str) -> Optional[Dict]:
+    """
+    The stored status of a dispatch, shaped like Dispatch.summary() plus its
+    group_id, or None when it is unknown or has expired. A dispatch whose
+    worker stopped mid-delivery keeps reporting the jobs it had not finished.
+    """
+    with SessionLocal() as db:
+        row = db.get(models.EmailDispatch, dispatch_id)
+        if row is None:
+            return None
+        jobs = [
+            {
+                "recipient": job.recipient,
+                "status": job.status,
+                "attempts": job.attempts,
+                "error": job.error,
+            }
+            for job in row.jobs
+        ]
+        sent = sum(1 for job in jobs if job["status"] == SENT)
+        failed = sum(1 for job in jobs if job["status"] == FAILED)
+        pending = len(jobs) - sent - failed
+        return {
+            "id": row.id,
+            "group_id": row.group_id,
+            "status": _overall_status(len(jobs), failed, pending),
+            "total": len(jobs),
+            "sent": sent,
+            "failed": failed,
+            "pending": pending,
+            "created_at": row.created_at,
+            "finished_at": row.finished_at,
+            "jobs": jobs,
+        }
@@ -1,75 +1,10 @@
-import os
-from typing import Dict
+from typing import Dict, Iterable
 from email.mime.text import MIMEText
 import base64
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-
-SCOPES = ["https://www.googleapis.com/auth/gmail.send"]
-
-
-def get_gmail_service():
-    """Build and return an authorized Gmail API service."""
-    creds = None
-    token_file = os.getenv("GMAIL_TOKEN_FILE", "token.json")
-    credentials_file = os.getenv("GMAIL_CREDENTIALS_FILE", "credentials.json")
-
-    # Check both current directory and parent directory (for token.json in root)
-    token_paths = [
-        token_file,
-        os.path.join(
-            os.path.dirname(os.path.dirname(os.path.dirname(__file__))), token_file
-        ),
-        os.path.join(os.path.dirname(os.path.dirname(__file__)), token_file),
-    ]
-
-    token_path = None
-    for path in token_paths:
-        if os.path.exists(path):
-            token_path = path
-            break
-
-    if token_path:
-        creds = Credentials.from_authorized_user_file(token_path, SCOPES)
-
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            # Check multiple locations for credentials file
-            cred_paths = [
-                credentials_file,
-                os.path.join(
-                    os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
-                    credentials_file,
-                ),
-                os.path.join(
-                    os.path.dirname(os.path.dirname(__file__)), credentials_file
-                ),
-            ]
-            cred_path = None
-            for path in cred_paths:
-                if os.path.exists(path):
-                    cred_path = path
-                    break
-
-            if not cred_path:
-                raise FileNotFoundError(
-                    f"Gmail credentials file not found. Checked: {', '.join(cred_paths)}. "
-                    "Please set up Gmail API credentials."
-                )
-
-            flow = InstalledAppFlow.from_client_secrets_file(cred_path, SCOPES)
-            creds = flow.run_local_server(port=0)
-
-        # Save token to the first available location
-        save_path = token_paths[0] if token_path else token_file
-        with open(save_path, "w") as token:
-            token.write(creds.to_json())
-
-    return build("gmail", "v1", credentials=creds)
+import time
+from ..metrics import EMAIL_MESSAGES, EMAIL_SEND_SECONDS
+from .dispatch import Dispatch, start_dispatch
+from .transport import OutgoingEmail, get_transport
 
 
 def create_message(sender: str, to: str, subject: str, message_text: str) -> Dict:
@@ -83,66 +18,72 @@ def create_message(sender: str, to: str, subject: str, message_text: str) -> Dic
     return {"raw": raw}
 
 
-def send_assignments_via_email(assignments: Dict[str, str], sender_email: str = None):
+def _send_now(message: OutgoingEmail) -> None:
+    """Send one message synchronously, recording its latency"""
+    transport = get_transport()
+    started = time.perf_counter()
+    result = "error"
+    try:
+        transport.send(message)
+        result = "sent"
+    finally:
+        EMAIL_SEND_SECONDS.observe(time.perf_counter() - started, transport.name)
+        EMAIL_MESSAGES.inc(transport.name, result)
+
+
+def assignment_email(assignment: Dict, sender_email: str = None) -> OutgoingEmail:
+    """Build the notification telling a giver who they are Secret Santa for"""
+    body = (
+        "Hi!\n\n"
+        f"You are the Secret Santa for: {assignment['receiver_name']}\n\n"
+        "Please keep it a secret! 🎄🎅\n"
+    )
+    return OutgoingEmail(
+        to=assignment["giver_email"],
+        subject="Your Secret Santa Assignment 🎁",
+        body=body,
+        sender=sender_email or "me",
+    )
+
+
+def send_assignments_via_email(
+    assignments: Iterable[Dict], sender_email: str = None, group_id: int = None
+) -> Dispatch:
     """
-    Send Secret Santa assignments via Gmail API.
+    Queue Secret Santa assignment emails for background delivery.
 
     Args:
-        assignments: Dict mapping giver_email -> receiver_name
+        assignments: Assignment records with giver_email and receiver_name
         sender_email: Email address to send from (defaults to authenticated Gmail account)
-    """
-    sender_email = sender_email or "me"
-    service = get_gmail_service()
-
-    for recipient_email, receiver_name in assignments.items():
-        body = (
-            "Hi!\n\n"
-            f"You are the Secret Santa for: {receiver_name}\n\n"
-            "Please keep it a secret! 🎄🎅\n"
-        )
+        group_id: Group the dispatch belongs to, checked when it is polled
 
-        message = create_message(
-            sender=sender_email,
-            to=recipient_email,
-            subject="Your Secret Santa Assignment 🎁",
-            message_text=body,
-        )
-
-        try:
-            service.users().messages().send(userId="me", body=message).execute()
-        except Exception as e:
-            # Log error but continue with other emails
-            print(f"Failed to send email to {recipient_email}: {e}")
-            raise
+    Returns the dispatch, whose id can be used to poll delivery progress.
+    """
+    messages = [assignment_email(a, sender_email) for a in assignments]
+    return start_dispatch(messages, group_id=group_id)
 
 
 def send_test_email(test_email: str, sender_email: str = None):
-    """Send a test email to verify Gmail API setup"""
-    sender_email = sender_email or "me"
-    service = get_gmail_service()
-
+    """Send a test email to verify the email transport setup"""
     body = (
         "This is a test email to confirm your Gmail API settings are working.\n\n"
         "If you received this, you're ready to send Secret Santa assignments! 🎅🎄"
     )
 
-    message = create_message(
-        sender=sender_email,
-        to=test_email,
-        subject="Secret Santa Email Test ✔️",
-        message_text=body,
+    _send_now(
+        OutgoingEmail(
+            to=test_email,
+            subject="Secret Santa Email Test ✔️",
+            body=body,
+            sender=sender_email or "me",
+        )
     )
 
-    service.users().messages().send(userId="me", body=message).execute()
-
 
 def send_password_reset_email(
     to_email: str, reset_link: str, sender_email: str = None
 ) -> None:
     """Send a password reset email with a reset link."""
-    sender_email = sender_email or "me"
-    service = get_gmail_service()
-
     body = (
         "Hi,\n\n"
         "We received a request to reset your exchan.ge password.\n\n"
@@ -151,11 +92,11 @@ def send_password_reset_email(
         "Thanks,\nexchan.ge"
     )
 
-    message = create_message(
-        sender=sender_email,
-        to=to_email,
-        subject="Reset your exchan.ge password",
-        message_text=body,
+    _send_now(
+        OutgoingEmail(
+            to=to_email,
+            subject="Reset your exchan.ge password",
+            body=body,
+            sender=sender_email or "me",
+        )
     )
-
-    service.users().messages().send(userId="me", body=message).execute()
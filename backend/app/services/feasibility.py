@@ -0,0 +1,259 @@
+"""
+Feasibility analysis of a group's constraint graph.
+
+Answers "can this group be assigned, and if not, why" without running the
+search: per-participant degrees, strongly connected components (a single
+gift circle needs exactly one; with a derangement possible as well, the
+search almost always finds one), Hall-violating sets (groups of givers with
+fewer possible receivers than members, or the reverse) and a small set of
+restrictions / past pairings that, if lifted, would make an assignment
+possible. Everything is a matching or a linear graph traversal over the
+bitset graph, so this stays cheap even for large groups.
+
+Reports are cached per (group, year, group version). The version is read on
+every request, one indexed lookup, so a change committed by another worker
+is picked up like it is for the ETags (see response_cache); entries for a
+group are also dropped as soon as it changes in this process (see
+group_events).
+"""
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .. import models
+from .graph import ParticipantGraph, load_participant_graph
+from .group_events import on_group_change
+from .solver import (
+    hall_violation,
+    hopcroft_karp,
+    popcount,
+    reverse_adjacency,
+    strongly_connected_components,
+)
+
+FEASIBILITY_CACHE_SIZE = 256
+
+_cache: "OrderedDict[Tuple[int, int, int], Dict]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _hall_violations(
+    adjacency: List[int], match: List[int]
+) -> List[Tuple[List[int], List[int]]]:
+    """One Hall witness per unmatched vertex not already inside an earlier one"""
+    witnesses = []
+    covered = 0
+    for vertex, partner in enumerate(match):
+        if partner != -1 or covered >> vertex & 1:
+            continue
+        side, neighbours = hall_violation(adjacency, match, start=vertex)
+        for member in side:
+            covered |= 1 << member
+        witnesses.append((side, neighbours))
+    return witnesses
+
+
+def _relaxations_for_matching(
+    adjacency: List[int], match: List[int]
+) -> List[Tuple[int, int]]:
+    """
+    Fewest extra (giver, receiver) pairs that complete the maximum matching:
+    one per unmatched giver, which is optimal since each added pair can grow
+    a matching by at most one.
+    """
+    n = len(adjacency)
+    matched_receivers = {receiver for receiver in match if receiver != -1}
+    givers = [giver for giver in range(n) if match[giver] == -1]
+    receivers = [receiver for receiver in range(n) if receiver not in matched_receivers]
+    if not givers:
+        return []
+
+    if givers == receivers and len(givers) == 1:
+        # The only free giver is also the only free receiver: take over the
+        # receiver of a matched giver h, who in turn gives to ``lonely``
+        lonely = givers[0]
+        best = None
+        for h, r in enumerate(match):
+            if h == lonely or r == -1 or r == lonely:
+                continue
+            needed = [
+                (a, b)
+                for a, b in ((lonely, r), (h, lonely))
+                if not adjacency[a] >> b & 1
+            ]
+            if best is None or len(needed) < len(best):
+                best = needed
+                if len(best) == 1:
+                    break
+        return best or []
+
+    pairs = []
+    remaining = list(receivers)
+    for giver in givers:
+        choice = next((r for r in remaining if r != giver), None)
+        if choice is None:
+            # Only ``giver`` itself is left: swap with an earlier pair
+            previous_giver, previous_receiver = pairs[-1]
+            pairs[-1] = (previous_giver, giver)
+            pairs.append((giver, previous_receiver))
+            remaining.remove(giver)
+            continue
+        pairs.append((giver, choice))
+        remaining.remove(choice)
+    return pairs
+
+
+def _relaxations_for_cycle(adjacency: List[int]) -> List[Tuple[int, int]]:
+    """Pairs joining the components into a ring, so everyone reaches everyone"""
+    components = strongly_connected_components(adjacency)
+    if len(components) < 2:
+        return []
+    pairs = []
+    for current, following in zip(components, components[1:] + components[:1]):
+        targets = 0
+        for vertex in following:
+            targets |= 1 << vertex
+        if any(adjacency[vertex] & targets for vertex in current):
+            continue
+        pairs.append((current[0], following[0]))
+    return pairs
+
+
+def analyze_feasibility(graph: ParticipantGraph, year: int) -> Dict:
+    """Build the feasibility report for a loaded group graph"""
+    participants = graph.participants
+    n = len(participants)
+    adjacency = graph.adjacency(year)
+    reverse = reverse_adjacency(adjacency)
+    components = strongly_connected_components(adjacency)
+    component_of = {}
+    for number, component in enumerate(components):
+        for vertex in component:
+            component_of[vertex] = number
+
+    def describe(vertices) -> List[Dict]:
+        return [
+            {"id": participants[v].id, "name": participants[v].name}
+            for v in vertices
+        ]
+
+    report = {
+        "year": year,
+        "participant_count": n,
+        "participants": [
+            {
+                "participant_id": participants[i].id,
+                "name": participants[i].name,
+                "out_degree": popcount(adjacency[i]),
+                "in_degree": popcount(reverse[i]),
+                "component": component_of[i],
+            }
+            for i in range(n)
+        ],
+        "components": [describe(component) for component in components],
+        "hall_violations": [],
+        "blocking_constraints": [],
+        "derangement_feasible": False,
+        "strongly_connected": len(components) == 1,
+    }
+    if n < 2:
+        return report
+
+    match = hopcroft_karp(adjacency)
+    if -1 in match:
+        for givers, receivers in _hall_violations(adjacency, match):
+            report["hall_violations"].append(
+                {
+                    "side": "givers",
+                    "givers": describe(givers),
+                    "receivers": describe(receivers),
+                }
+            )
+        # The same deficiency seen from the receivers' side
+        match_reverse = [-1] * n
+        for giver, receiver in enumerate(match):
+            if receiver != -1:
+                match_reverse[receiver] = giver
+        for receivers, givers in _hall_violations(reverse, match_reverse):
+            report["hall_violations"].append(
+                {
+                    "side": "receivers",
+                    "givers": describe(givers),
+                    "receivers": describe(receivers),
+                }
+            )
+
+    matching_pairs = _relaxations_for_matching(adjacency, match)
+    relaxed = list(adjacency)
+    for giver, receiver in matching_pairs:
+        relaxed[giver] |= 1 << receiver
+    cycle_pairs = _relaxations_for_cycle(relaxed)
+
+    report["derangement_feasible"] = not matching_pairs
+    report["blocking_constraints"] = [
+        _explain(graph, year, giver, receiver, ["cycle", "derangement"])
+        for giver, receiver in matching_pairs
+    ] + [
+        _explain(graph, year, giver, receiver, ["cycle"])
+        for giver, receiver in cycle_pairs
+    ]
+    return report
+
+
+def _explain(
+    graph: ParticipantGraph, year: int, giver: int, receiver: int, modes: List[str]
+) -> Dict:
+    """Why ``giver`` may not give to ``receiver`` this year"""
+    allowed = graph.allowed[giver]
+    history_years = sorted(
+        {
+            row_year
+            for row_giver, row_receiver, row_year in graph.history
+            if row_giver == giver and row_receiver == receiver and row_year != year
+        }
+    )
+    return {
+        "giver_id": graph.participants[giver].id,
+        "giver_name": graph.participants[giver].name,
+        "receiver_id": graph.participants[receiver].id,
+        "receiver_name": graph.participants[receiver].name,
+        "restricted": allowed is not None and not allowed >> receiver & 1,
+        "history_years": history_years,
+        "modes": modes,
+    }
+
+
+def get_feasibility(
+    db: Session, group_id: int, year: Optional[int] = None
+) -> Optional[Dict]:
+    """Cached feasibility report for a group, None if the group is gone"""
+    if year is None:
+        year = datetime.now().year
+    version = (
+        db.query(models.Group.version).filter(models.Group.id == group_id).scalar()
+    )
+    if version is None:
+        return None
+    key = (group_id, year, version)
+    with _cache_lock:
+        report = _cache.get(key)
+        if report is not None:
+            _cache.move_to_end(key)
+            return report
+
+    report = analyze_feasibility(load_participant_graph(db, group_id), year)
+    with _cache_lock:
+        _cache[key] = report
+        while len(_cache) > FEASIBILITY_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return report
+
+
+@on_group_change
+def invalidate_feasibility(group_id: int) -> None:
+    with _cache_lock:
+        for key in [key for key in _cache if key[0] == group_id]:
+            del _cache[key]
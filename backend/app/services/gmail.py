@@ -0,0 +1,200 @@
+"""
+Process-wide Gmail API client.
+
+Credentials are loaded once per process and refreshed shortly before they
+expire, the service is built from the discovery document bundled with
+google-api-python-client (no discovery request), and each thread gets its own
+authorised HTTP connection because httplib2 is not thread-safe. Messages can be
+sent one by one or through Gmail's batch endpoint, many per HTTP request.
+
+Set GMAIL_API_ENDPOINT (e.g. ``http://localhost:8025/``) to talk to a local
+stand-in instead of gmail.googleapis.com.
+"""
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+import google_auth_httplib2
+import httplib2
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+from googleapiclient.discovery import build
+from googleapiclient.http import BatchHttpRequest
+
+SCOPES = ["https://www.googleapis.com/auth/gmail.send"]
+DEFAULT_API_ENDPOINT = "https://gmail.googleapis.com/"
+# Gmail recommends at most 50 requests per batch
+GMAIL_BATCH_SIZE = int(os.getenv("GMAIL_BATCH_SIZE", "50"))
+# Refresh access tokens this long before they expire
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+HTTP_TIMEOUT = 30
+
+
+def _candidate_paths(filename: str) -> List[str]:
+    """Check the current directory, the repo root and backend/ (in that order)"""
+    return [
+        filename,
+        os.path.join(
+            os.path.dirname(os.path.dirname(os.path.dirname(__file__))), filename
+        ),
+        os.path.join(os.path.dirname(os.path.dirname(__file__)), filename),
+    ]
+
+
+def _first_existing(paths: Sequence[str]) -> Optional[str]:
+    for path in paths:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+class GmailClient:
+    """Thread-safe Gmail sender; use get_gmail_client() for the shared instance"""
+
+    def __init__(
+        self,
+        credentials: Optional[Credentials] = None,
+        api_endpoint: Optional[str] = None,
+    ):
+        self._credentials = credentials
+        self._token_path: Optional[str] = None
+        self.api_endpoint = (
+            api_endpoint or os.getenv("GMAIL_API_ENDPOINT") or DEFAULT_API_ENDPOINT
+        )
+        if not self.api_endpoint.endswith("/"):
+            self.api_endpoint += "/"
+        self._service = None
+        self._lock = threading.RLock()
+        self._local = threading.local()
+
+    def _load_credentials(self) -> Credentials:
+        """Read token.json, running the OAuth consent flow if there is none"""
+        token_file = os.getenv("GMAIL_TOKEN_FILE", "token.json")
+        credentials_file = os.getenv("GMAIL_CREDENTIALS_FILE", "credentials.json")
+
+        token_paths = _candidate_paths(token_file)
+        token_path = _first_existing(token_paths)
+        creds = None
+        if token_path:
+            creds = Credentials.from_authorized_user_file(token_path, SCOPES)
+
+        if not creds or not (creds.valid or creds.refresh_token):
+            cred_paths = _candidate_paths(credentials_file)
+            cred_path = _first_existing(cred_paths)
+            if not cred_path:
+                raise FileNotFoundError(
+                    f"Gmail credentials file not found. Checked: {', '.join(cred_paths)}. "
+                    "Please set up Gmail API credentials."
+                )
+            flow = InstalledAppFlow.from_client_secrets_file(cred_path, SCOPES)
+            creds = flow.run_local_server(port=0)
+            token_path = token_path or token_paths[0]
+            self._save_token(creds, token_path)
+
+        self._token_path = token_path
+        return creds
+
+    def _save_token(self, creds: Credentials, path: str) -> None:
+        with open(path, "w") as token:
+            token.write(creds.to_json())
+
+    @property
+    def credentials(self) -> Credentials:
+        """Loaded once; refreshed under the lock when close to expiry"""
+        with self._lock:
+            if self._credentials is None:
+                self._credentials = self._load_credentials()
+            creds = self._credentials
+            expiring = creds.expiry is not None and (
+                creds.expiry - datetime.utcnow() < TOKEN_REFRESH_MARGIN
+            )
+            if creds.refresh_token and (not creds.valid or expiring):
+                creds.refresh(Request())
+                if self._token_path:
+                    self._save_token(creds, self._token_path)
+            return creds
+
+    @property
+    def service(self):
+        with self._lock:
+            if self._service is None:
+                self._service = build(
+                    "gmail",
+                    "v1",
+                    credentials=self.credentials,
+                    static_discovery=True,
+                    cache_discovery=False,
+                    client_options={"api_endpoint": self.api_endpoint},
+                )
+            return self._service
+
+    def _http(self) -> google_auth_httplib2.AuthorizedHttp:
+        """A per-thread authorised connection carrying the current credentials"""
+        creds = self.credentials
+        http = getattr(self._local, "http", None)
+        if http is None or http.credentials is not creds:
+            http = google_auth_httplib2.AuthorizedHttp(
+                creds, http=httplib2.Http(timeout=HTTP_TIMEOUT)
+            )
+            self._local.http = http
+        return http
+
+    def send(self, raw_message: Dict) -> Dict:
+        """Send one message built by create_message()"""
+        request = self.service.users().messages().send(userId="me", body=raw_message)
+        return request.execute(http=self._http())
+
+    def send_batch(self, raw_messages: Sequence[Dict]) -> List[Optional[Exception]]:
+        """
+        Send messages through the batch endpoint, GMAIL_BATCH_SIZE per HTTP
+        request. Returns one entry per message: None on success, otherwise
+        the exception for that message.
+        """
+        errors: List[Optional[Exception]] = [None] * len(raw_messages)
+        service = self.service
+        http = self._http()
+
+        for start in range(0, len(raw_messages), GMAIL_BATCH_SIZE):
+            chunk = range(start, min(start + GMAIL_BATCH_SIZE, len(raw_messages)))
+
+            def callback(request_id, response, exception):
+                if exception is not None:
+                    errors[int(request_id)] = exception
+
+            # Built by hand so the batch URI follows GMAIL_API_ENDPOINT too
+            batch = BatchHttpRequest(
+                callback=callback, batch_uri=f"{self.api_endpoint}batch/gmail/v1"
+            )
+            for index in chunk:
+                batch.add(
+                    service.users().messages().send(
+                        userId="me", body=raw_messages[index]
+                    ),
+                    request_id=str(index),
+                )
+            try:
+                batch.execute(http=http)
+            except Exception as e:
+                for index in chunk:
+                    errors[index] = e
+        return errors
+
+
+_client: Optional[GmailClient] = None
+_client_lock = threading.Lock()
+
+
+def get_gmail_client() -> GmailClient:
+    """Return the process-wide Gmail client"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GmailClient()
+        return _client
+
+
+def get_gmail_service():
+    """Return the shared, authorised Gmail API service."""
+    return get_gmail_client().service
@@ -0,0 +1,141 @@
+"""
+Set-based loading of a group's participants and constraints.
+
+The loader reads a group's participants, ``participant_restrictions`` rows and
+``assignment_history`` rows in one query each and turns them into an
+integer-indexed structure (participant id -> index, bitsets per giver) that the
+solver and the history endpoint work on, instead of walking ORM relationships
+participant by participant.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .. import models
+
+
+@dataclass
+class ParticipantGraph:
+    group_id: int
+    # Rows with id, name and email, ordered by id; position = index
+    participants: Sequence = field(default_factory=list)
+    index: Dict[int, int] = field(default_factory=dict)
+    # allowed[i] is the bitset of receivers i is restricted to, None if unrestricted
+    allowed: List[Optional[int]] = field(default_factory=list)
+    # (giver index, receiver index, year) for every history row inside the group
+    history: List[Tuple[int, int, int]] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.participants)
+
+    def past(self, exclude_year: Optional[int] = None) -> List[int]:
+        """Bitsets of receivers each giver had in years other than ``exclude_year``"""
+        past = [0] * len(self.participants)
+        for giver, receiver, year in self.history:
+            if year != exclude_year:
+                past[giver] |= 1 << receiver
+        return past
+
+    def year_successors(self, year: int) -> Dict[int, int]:
+        """Giver index -> receiver index for the pairings recorded in ``year``"""
+        return {
+            giver: receiver
+            for giver, receiver, row_year in self.history
+            if row_year == year
+        }
+
+    def penalties(self, year: int, decay: float) -> List[Dict[int, float]]:
+        """
+        Soft cost per giver and past receiver: 1 for a pairing one year away
+        from ``year``, ``decay`` for two years away, ``decay ** 2`` for three
+        and so on, summed over every year the pairing was made.
+        """
+        penalties: List[Dict[int, float]] = [{} for _ in self.participants]
+        for giver, receiver, row_year in self.history:
+            if row_year != year:
+                cost = decay ** (abs(year - row_year) - 1)
+                row = penalties[giver]
+                row[receiver] = row.get(receiver, 0.0) + cost
+        return penalties
+
+    def adjacency(self, year: Optional[int] = None, history: bool = True) -> List[int]:
+        """
+        Options per giver: everyone else, narrowed to allowed_receivers when
+        the giver has restrictions, minus pairings from other years than
+        ``year`` unless ``history`` is off.
+        """
+        everyone = (1 << len(self.participants)) - 1
+        excluded = self.past(year) if history else [0] * len(self.participants)
+        adjacency = []
+        for i, (allowed, past) in enumerate(zip(self.allowed, excluded)):
+            options = everyone & ~(1 << i) & ~past
+            if allowed is not None:
+                options &= allowed
+            adjacency.append(options)
+        return adjacency
+
+
+def load_participant_graph(
+    db: Session,
+    group_id: int,
+    restrictions: bool = True,
+    history: bool = True,
+) -> ParticipantGraph:
+    """Load a group's constraint graph with at most three set-based queries"""
+    graph = ParticipantGraph(group_id=group_id)
+
+    graph.participants = db.execute(
+        select(
+            models.Participant.id,
+            models.Participant.name,
+            models.Participant.email,
+        )
+        .where(models.Participant.group_id == group_id)
+        .order_by(models.Participant.id)
+    ).all()
+    graph.index = {row.id: i for i, row in enumerate(graph.participants)}
+    graph.allowed = [None] * len(graph.participants)
+
+    if restrictions and graph.participants:
+        restriction_rows = db.execute(
+            select(
+                models.participant_restrictions.c.giver_id,
+                models.participant_restrictions.c.receiver_id,
+            )
+            .join(
+                models.Participant,
+                models.Participant.id == models.participant_restrictions.c.giver_id,
+            )
+            .where(models.Participant.group_id == group_id)
+        )
+        for giver_id, receiver_id in restriction_rows:
+            giver = graph.index[giver_id]
+            receiver = graph.index.get(receiver_id)
+            if graph.allowed[giver] is None:
+                graph.allowed[giver] = 0
+            if receiver is not None:
+                graph.allowed[giver] |= 1 << receiver
+
+    if history and graph.participants:
+        history_rows = db.execute(
+            select(
+                models.assignment_history.c.giver_id,
+                models.assignment_history.c.receiver_id,
+                models.assignment_history.c.year,
+            )
+            .where(models.assignment_history.c.group_id == group_id)
+            .order_by(
+                models.assignment_history.c.year,
+                models.assignment_history.c.giver_id,
+            )
+        )
+        for giver_id, receiver_id, year in history_rows:
+            giver = graph.index.get(giver_id)
+            receiver = graph.index.get(receiver_id)
+            # Rows pointing at participants that left the group are ignored
+            if giver is not None and receiver is not None:
+                graph.history.append((giver, receiver, year))
+
+    return graph
@@ -0,0 +1,87 @@
+"""
+Change notifications for per-group caches.
+
+Writes that touch a group, its participants, restrictions or assignment
+history mark the group on the session. The commit bumps ``groups.version``
+for every marked group in the same transaction, and once it succeeds every
+registered listener is called with the group id. Group updates and deletes,
+participant inserts, updates (including restriction changes, which mark the
+giver dirty) and deletes are picked up from ORM events; Core statements such
+as the history bulk insert call ``mark_group_changed`` themselves.
+"""
+import threading
+from typing import Callable, List
+
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session, object_session
+
+from .. import models
+
+_listeners: List[Callable[[int], None]] = []
+_listeners_lock = threading.Lock()
+
+CHANGED_GROUPS_KEY = "changed_groups"
+
+
+def on_group_change(listener: Callable[[int], None]) -> Callable[[int], None]:
+    """Register ``listener(group_id)``; usable as a decorator"""
+    with _listeners_lock:
+        _listeners.append(listener)
+    return listener
+
+
+def mark_group_changed(db: Session, group_id: int) -> None:
+    """Notify listeners about ``group_id`` when ``db`` commits"""
+    db.info.setdefault(CHANGED_GROUPS_KEY, set()).add(group_id)
+
+
+def notify_group_changed(group_id: int) -> None:
+    with _listeners_lock:
+        listeners = list(_listeners)
+    for listener in listeners:
+        listener(group_id)
+
+
+def _mark_participant(mapper, connection, target: models.Participant) -> None:
+    db = object_session(target)
+    if db is not None and target.group_id is not None:
+        mark_group_changed(db, target.group_id)
+
+
+def _mark_group(mapper, connection, target: models.Group) -> None:
+    db = object_session(target)
+    if db is not None:
+        mark_group_changed(db, target.id)
+
+
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(models.Participant, _event, _mark_participant)
+for _event in ("after_update", "after_delete"):
+    event.listen(models.Group, _event, _mark_group)
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_versions(db: Session) -> None:
+    # Flush first so the pending changes mark their groups too
+    db.flush()
+    group_ids = db.info.get(CHANGED_GROUPS_KEY)
+    if group_ids:
+        groups = models.Group.__table__
+        db.execute(
+            update(groups)
+            .where(groups.c.id.in_(group_ids))
+            # Keep updated_at for the group's own fields
+            .values(version=groups.c.version + 1, updated_at=groups.c.updated_at)
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_after_commit(db: Session) -> None:
+    for group_id in db.info.pop(CHANGED_GROUPS_KEY, ()):
+        notify_group_changed(group_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_after_rollback(db: Session, previous_transaction) -> None:
+    if not db.in_transaction():
+        db.info.pop(CHANGED_GROUPS_KEY, None)
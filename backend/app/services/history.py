@@ -0,0 +1,245 @@
+"""
+Reading and writing assignment history.
+
+A year's assignment is written as multi-row INSERT statements instead of one
+existence check and one insert per giver. On PostgreSQL and SQLite duplicates
+are skipped by the database (``ON CONFLICT DO NOTHING``); other dialects fall
+back to filtering against a single SELECT of the group's rows.
+
+Reads join ``assignment_history`` to ``participants`` twice (giver and
+receiver) in one statement and page by the (year, giver_id, receiver_id) key.
+"""
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, insert, or_, select
+from sqlalchemy.orm import Session, aliased
+
+from .. import models
+from .group_events import mark_group_changed
+
+# Rows per INSERT statement; 4 bound parameters per row keeps every chunk
+# below SQLite's 32766 and PostgreSQL's 65535 parameter limits
+HISTORY_INSERT_CHUNK = 5000
+
+
+def _insert_ignoring_duplicates(db: Session):
+    """Return an INSERT construct that skips rows already in the table"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+        return pg_insert(models.assignment_history).on_conflict_do_nothing()
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+        return sqlite_insert(models.assignment_history).on_conflict_do_nothing()
+    return None
+
+
+def save_assignment_history(
+    db: Session,
+    group_id: int,
+    year: int,
+    pairs: Iterable[Tuple[int, int]],
+    replace: bool = False,
+) -> int:
+    """
+    Record ``(giver_id, receiver_id)`` pairs as the group's assignment for
+    ``year``. With ``replace`` the year's existing rows are deleted first, in
+    the same transaction. The caller commits.
+
+    Returns the number of rows submitted.
+    """
+    rows: List[dict] = [
+        {
+            "giver_id": giver_id,
+            "receiver_id": receiver_id,
+            "group_id": group_id,
+            "year": year,
+        }
+        for giver_id, receiver_id in pairs
+    ]
+
+    if replace:
+        db.execute(
+            delete(models.assignment_history).where(
+                models.assignment_history.c.group_id == group_id,
+                models.assignment_history.c.year == year,
+            )
+        )
+
+    stmt = _insert_ignoring_duplicates(db)
+    if stmt is None:
+        stmt = insert(models.assignment_history)
+        existing = set(
+            db.execute(
+                select(
+                    models.assignment_history.c.giver_id,
+                    models.assignment_history.c.receiver_id,
+                ).where(
+                    models.assignment_history.c.group_id == group_id,
+                    models.assignment_history.c.year == year,
+                )
+            ).all()
+        )
+        rows = [
+            row for row in rows
+            if (row["giver_id"], row["receiver_id"]) not in existing
+        ]
+
+    for start in range(0, len(rows), HISTORY_INSERT_CHUNK):
+        db.execute(stmt.values(rows[start:start + HISTORY_INSERT_CHUNK]))
+
+    mark_group_changed(db, group_id)
+    return len(rows)
+
+
+def update_assignment_history(
+    db: Session,
+    group_id: int,
+    year: int,
+    pairs: Iterable[Tuple[int, int]],
+) -> int:
+    """
+    Replace the ``year`` rows of just the givers in ``pairs``, leaving every
+    other giver's pairing untouched. The caller commits.
+    """
+    pairs = list(pairs)
+    giver_ids = [giver_id for giver_id, _ in pairs]
+    for start in range(0, len(giver_ids), HISTORY_INSERT_CHUNK):
+        db.execute(
+            delete(models.assignment_history).where(
+                models.assignment_history.c.group_id == group_id,
+                models.assignment_history.c.year == year,
+                models.assignment_history.c.giver_id.in_(
+                    giver_ids[start:start + HISTORY_INSERT_CHUNK]
+                ),
+            )
+        )
+    return save_assignment_history(db, group_id, year, pairs)
+
+
+def record_assignment_run(
+    db: Session,
+    group_id: int,
+    year: int,
+    mode: str,
+    seed: int,
+    min_cycle_length: Optional[int] = None,
+    replace: bool = False,
+) -> models.AssignmentRun:
+    """
+    Store the settings a year's assignment was solved with, next to its
+    history rows. With ``replace`` earlier runs for the year are dropped, as
+    their pairings were. The caller commits.
+    """
+    if replace:
+        db.execute(
+            delete(models.AssignmentRun).where(
+                models.AssignmentRun.group_id == group_id,
+                models.AssignmentRun.year == year,
+            )
+        )
+    run = models.AssignmentRun(
+        group_id=group_id,
+        year=year,
+        mode=mode,
+        seed=seed,
+        min_cycle_length=min_cycle_length,
+    )
+    db.add(run)
+    return run
+
+
+# (year, giver_id, receiver_id) of the last row of a page
+HistoryCursor = Tuple[int, int, int]
+
+
+def encode_cursor(row: Dict) -> str:
+    return f"{row['year']}:{row['giver_id']}:{row['receiver_id']}"
+
+
+def decode_cursor(cursor: str) -> HistoryCursor:
+    try:
+        year, giver_id, receiver_id = (int(part) for part in cursor.split(":"))
+    except ValueError:
+        raise ValueError("Invalid history cursor") from None
+    return year, giver_id, receiver_id
+
+
+def history_query(
+    group_id: int,
+    year: Optional[int] = None,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    after: Optional[HistoryCursor] = None,
+):
+    """Build the joined history SELECT, ordered by its keyset"""
+    history = models.assignment_history
+    giver = aliased(models.Participant)
+    receiver = aliased(models.Participant)
+
+    query = (
+        select(
+            history.c.year,
+            history.c.giver_id,
+            giver.name.label("giver_name"),
+            history.c.receiver_id,
+            receiver.name.label("receiver_name"),
+        )
+        .join(giver, giver.id == history.c.giver_id)
+        .join(receiver, receiver.id == history.c.receiver_id)
+        .where(history.c.group_id == group_id)
+        .order_by(history.c.year, history.c.giver_id, history.c.receiver_id)
+    )
+
+    if year:
+        query = query.where(history.c.year == year)
+    if year_from is not None:
+        query = query.where(history.c.year >= year_from)
+    if year_to is not None:
+        query = query.where(history.c.year <= year_to)
+    if after is not None:
+        after_year, after_giver, after_receiver = after
+        query = query.where(
+            or_(
+                history.c.year > after_year,
+                and_(history.c.year == after_year, history.c.giver_id > after_giver),
+                and_(
+                    history.c.year == after_year,
+                    history.c.giver_id == after_giver,
+                    history.c.receiver_id > after_receiver,
+                ),
+            )
+        )
+    return query
+
+
+def get_assignment_history(
+    db: Session,
+    group_id: int,
+    year: Optional[int] = None,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    after: Optional[HistoryCursor] = None,
+    limit: Optional[int] = None,
+) -> List[Dict]:
+    """Get one page of assignment history for a group"""
+    query = history_query(group_id, year, year_from, year_to, after)
+    if limit is not None:
+        query = query.limit(limit)
+    return [dict(row) for row in db.execute(query).mappings()]
+
+
+def iter_assignment_history(
+    db: Session,
+    group_id: int,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    batch_size: int = 1000,
+) -> Iterator[Dict]:
+    """Stream a group's whole history without materialising it in memory"""
+    query = history_query(group_id, year_from=year_from, year_to=year_to)
+    result = db.execute(query.execution_options(yield_per=batch_size))
+    for row in result.mappings():
+        yield dict(row)
@@ -0,0 +1,236 @@
+"""
+Minimum-cost assignment for the weighted mode.
+
+Restrictions stay hard constraints while past pairings become penalties
+(``costs[i][j]`` for giver i and receiver j). Every giver that can be matched
+along a pairing without a penalty is matched first with Hopcroft-Karp, which
+settles most of a large group, and the shortest-augmenting-path Hungarian
+method then places the givers left over at the least total penalty.
+
+The Hungarian step has two implementations: a heap-based Dijkstra over each
+giver's options, which wins on the sparse graphs restricted groups produce,
+and one on dense NumPy rows, which wins once most pairings are allowed and
+many carry penalties. NumPy is optional.
+"""
+import heapq
+import random
+import time
+from typing import Dict, List, Optional, Sequence
+
+from .solver import (
+    InfeasibleError,
+    SolverResult,
+    SolverStats,
+    check_feasibility,
+    hopcroft_karp,
+    iter_bits,
+    popcount,
+)
+
+INFINITY = float("inf")
+# Use the NumPy rows once this fraction of all pairings is allowed
+DENSE_FRACTION = 0.25
+
+
+def find_weighted(
+    adjacency: Sequence[int],
+    rng: Optional[random.Random] = None,
+    costs: Optional[Sequence[Dict[int, float]]] = None,
+) -> SolverResult:
+    """
+    Find the assignment with the least total penalty where everyone gives and
+    receives exactly once. Pairings outside ``adjacency`` are never chosen;
+    a missing ``costs`` entry means the pairing is free.
+    """
+    started = time.perf_counter()
+    rng = rng or random.Random()
+    n = len(adjacency)
+    stats = SolverStats(nodes=n)
+
+    free = list(adjacency)
+    for giver, penalties in enumerate(costs or ()):
+        for receiver, cost in penalties.items():
+            if cost > 0:
+                free[giver] &= ~(1 << receiver)
+    match = hopcroft_karp(free, rng) if n >= 2 else [-1] * n
+    unmatched = [giver for giver in range(n) if match[giver] == -1]
+    if unmatched:
+        # Raises with a Hall witness when the hard constraints are infeasible
+        check_feasibility(adjacency, rng=rng)
+        stats.nodes += len(unmatched)
+        match = _hungarian(adjacency, costs, match, unmatched)
+
+    stats.elapsed = time.perf_counter() - started
+    return SolverResult(successors=match, stats=stats)
+
+
+def _hungarian(
+    adjacency: Sequence[int],
+    costs: Sequence[Dict[int, float]],
+    match: List[int],
+    unmatched: List[int],
+) -> List[int]:
+    n = len(adjacency)
+    if sum(popcount(mask) for mask in adjacency) >= DENSE_FRACTION * n * n:
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            pass
+        else:
+            return _hungarian_numpy(adjacency, costs, match, unmatched)
+    return _hungarian_python(adjacency, costs, match, unmatched)
+
+
+def assignment_cost(
+    successors: Sequence[int], costs: Optional[Sequence[Dict[int, float]]]
+) -> float:
+    """Total penalty of an assignment"""
+    if not costs:
+        return 0.0
+    return sum(
+        costs[giver].get(receiver, 0.0) for giver, receiver in enumerate(successors)
+    )
+
+
+def _hungarian_numpy(
+    adjacency: Sequence[int],
+    costs: Sequence[Dict[int, float]],
+    match: List[int],
+    unmatched: List[int],
+) -> List[int]:
+    import numpy as np
+
+    n = len(adjacency)
+    width = (n + 7) // 8
+    packed = np.frombuffer(
+        b"".join(mask.to_bytes(width, "little") for mask in adjacency), dtype=np.uint8
+    ).reshape(n, width)
+    allowed = np.unpackbits(packed, axis=1, bitorder="little")[:, :n].astype(bool)
+    cost = np.where(allowed, 0.0, np.inf)
+    for giver, penalties in enumerate(costs):
+        for receiver, penalty in penalties.items():
+            if allowed[giver, receiver]:
+                cost[giver, receiver] = penalty
+
+    # Dual potentials start at zero, which the penalty-free matching satisfies
+    u = np.zeros(n)
+    v = np.zeros(n)
+    receiver_of = np.array(match, dtype=np.int64)
+    giver_of = np.full(n, -1, dtype=np.int64)
+    for giver, receiver in enumerate(match):
+        if receiver != -1:
+            giver_of[receiver] = giver
+
+    for row in unmatched:
+        # Dijkstra over reduced costs from ``row`` to the nearest free receiver
+        shortest = np.full(n, np.inf)
+        path = np.full(n, -1, dtype=np.int64)
+        done = np.zeros(n, dtype=bool)
+        rows = [row]
+        distance = 0.0
+        giver = row
+        while True:
+            reduced = distance + cost[giver] - u[giver] - v
+            better = ~done & (reduced < shortest)
+            shortest[better] = reduced[better]
+            path[better] = giver
+            candidates = np.where(done, np.inf, shortest)
+            distance = candidates.min()
+            if distance == np.inf:
+                raise InfeasibleError("No valid assignment exists", givers=[row])
+            # On ties prefer a free receiver, which ends the search
+            ties = np.flatnonzero(candidates == distance)
+            free = ties[giver_of[ties] == -1]
+            column = int(free[0] if len(free) else ties[0])
+            done[column] = True
+            if giver_of[column] == -1:
+                break
+            giver = int(giver_of[column])
+            rows.append(giver)
+
+        u[row] += distance
+        if len(rows) > 1:
+            others = np.array(rows[1:])
+            u[others] += distance - shortest[receiver_of[others]]
+        reached = np.flatnonzero(done)
+        v[reached] -= distance - shortest[reached]
+
+        while True:
+            giver = int(path[column])
+            giver_of[column] = giver
+            receiver_of[giver], column = column, receiver_of[giver]
+            if giver == row:
+                break
+
+    return [int(receiver) for receiver in receiver_of]
+
+
+def _hungarian_python(
+    adjacency: Sequence[int],
+    costs: Sequence[Dict[int, float]],
+    match: List[int],
+    unmatched: List[int],
+) -> List[int]:
+    n = len(adjacency)
+    options = [
+        [(receiver, costs[giver].get(receiver, 0.0)) for receiver in iter_bits(mask)]
+        for giver, mask in enumerate(adjacency)
+    ]
+
+    u = [0.0] * n
+    v = [0.0] * n
+    receiver_of = list(match)
+    giver_of = [-1] * n
+    for giver, receiver in enumerate(match):
+        if receiver != -1:
+            giver_of[receiver] = giver
+
+    for row in unmatched:
+        # Dijkstra over reduced costs from ``row`` to the nearest free receiver;
+        # on ties the heap yields free receivers first, which ends the search
+        shortest = [INFINITY] * n
+        path = [-1] * n
+        done = [False] * n
+        reached = []
+        rows = [row]
+        heap = []
+        distance = 0.0
+        giver = row
+        while True:
+            for receiver, cost in options[giver]:
+                if done[receiver]:
+                    continue
+                reduced = distance + cost - u[giver] - v[receiver]
+                if reduced < shortest[receiver]:
+                    shortest[receiver] = reduced
+                    path[receiver] = giver
+                    heapq.heappush(
+                        heap, (reduced, giver_of[receiver] != -1, receiver)
+                    )
+            while heap:
+                distance, _, column = heapq.heappop(heap)
+                if not done[column] and distance == shortest[column]:
+                    break
+            else:
+                raise InfeasibleError("No valid assignment exists", givers=[row])
+            done[column] = True
+            reached.append(column)
+            if giver_of[column] == -1:
+                break
+            giver = giver_of[column]
+            rows.append(giver)
+
+        u[row] += distance
+        for other in rows[1:]:
+            u[other] += distance - shortest[receiver_of[other]]
+        for receiver in reached:
+            v[receiver] -= distance - shortest[receiver]
+
+        while True:
+            giver = path[column]
+            giver_of[column] = giver
+            receiver_of[giver], column = column, receiver_of[giver]
+            if giver == row:
+                break
+
+    return receiver_of
@@ -0,0 +1,255 @@
+"""
+Streaming participant import from CSV or NDJSON.
+
+Rows are parsed one at a time from a text stream and validated as they
+arrive; valid participants are written with multi-row ``INSERT ... RETURNING``
+statements every ``IMPORT_CHUNK`` rows, so memory stays flat however large
+the upload is. Restrictions may name participants further down the file, so
+each giver's receiver emails are kept until every participant is in and then
+written as multi-row inserts into ``participant_restrictions``.
+
+CSV needs a header row with ``name`` and ``email`` columns and may have an
+``allowed_receivers`` column of ``;``-separated emails. NDJSON has one object
+per line with the same keys (``allowed_receivers`` may also be a list).
+Problem rows are skipped and reported with their line number; they never
+abort the rest of the import.
+
+Parsing is kept apart from the database (_RosterParser), so the async
+import reads and validates the upload in a worker thread and only runs the
+inserts on the event loop.
+"""
+import asyncio
+import csv
+import json
+from typing import TYPE_CHECKING, Dict, IO, Iterator, List, Optional, Tuple
+
+from pydantic import EmailStr, TypeAdapter, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+from .group_events import mark_group_changed
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+# Participants per INSERT statement (3 bound parameters each)
+IMPORT_CHUNK = 1000
+# Restriction pairs per INSERT statement (2 bound parameters each)
+RESTRICTION_CHUNK = 5000
+# Stop collecting row errors after this many; the count keeps going
+IMPORT_MAX_ERRORS = 1000
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+_email = TypeAdapter(EmailStr)
+
+
+def import_format(filename: Optional[str], content_type: Optional[str]) -> str:
+    """Guess the upload format from its file name or content type"""
+    filename = (filename or "").lower()
+    if filename.endswith((".ndjson", ".jsonl")) or "ndjson" in (content_type or ""):
+        return "ndjson"
+    return "csv"
+
+
+def _receiver_emails(value) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.split(";")
+    return [email.strip() for email in value if email and email.strip()]
+
+
+def _iter_csv(stream: IO[str]) -> Iterator[Tuple[int, Dict]]:
+    reader = csv.DictReader(stream)
+    columns = {(name or "").strip().lower() for name in reader.fieldnames or ()}
+    missing = {"name", "email"} - columns
+    if missing:
+        raise ValueError(f"CSV header is missing: {', '.join(sorted(missing))}")
+    for row in reader:
+        yield reader.line_num, {
+            (key or "").strip().lower(): value for key, value in row.items()
+        }
+
+
+def _iter_ndjson(stream: IO[str]) -> Iterator[Tuple[int, object]]:
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, ValueError(f"Invalid JSON: {e.msg}")
+
+
+def _insert_participants(
+    db: Session, group_id: int, rows: List[Dict]
+) -> List[Tuple[int, str]]:
+    """Insert one chunk and return the new ``(id, email)`` pairs"""
+    if db.get_bind().dialect.insert_executemany_returning:
+        stmt = insert(models.Participant).returning(
+            models.Participant.id, models.Participant.email
+        )
+        return [tuple(row) for row in db.execute(stmt, rows)]
+    db.execute(insert(models.Participant), rows)
+    return [
+        tuple(row)
+        for row in db.execute(
+            select(models.Participant.id, models.Participant.email).where(
+                models.Participant.group_id == group_id,
+                models.Participant.email.in_([row["email"] for row in rows]),
+            )
+        )
+    ]
+
+
+class _RosterParser:
+    """
+    Parsing and validation state of one import. It never touches the
+    database, so the async import can run it in a worker thread.
+    """
+
+    def __init__(self, existing: Dict[str, int]):
+        # Email -> id of every participant in the group, new ones included
+        self.ids = existing
+        self.report = {"created": 0, "restrictions": 0, "errors": [], "error_count": 0}
+        self.seen: Dict[str, int] = {}
+        # (line, giver email, receiver emails) until every participant is in
+        self.restrictions: List[Tuple[int, str, List[str]]] = []
+
+    def error(self, line: int, detail: str, email: Optional[str] = None) -> None:
+        self.report["error_count"] += 1
+        if len(self.report["errors"]) < IMPORT_MAX_ERRORS:
+            self.report["errors"].append({"row": line, "email": email, "detail": detail})
+
+    def participant_chunks(
+        self, group_id: int, stream: IO[str], format: str
+    ) -> Iterator[List[Dict]]:
+        """Valid new participants, ``IMPORT_CHUNK`` rows at a time"""
+        pending: List[Dict] = []
+        rows = _iter_csv(stream) if format == "csv" else _iter_ndjson(stream)
+        for line, raw in rows:
+            if isinstance(raw, Exception):
+                self.error(line, str(raw))
+                continue
+            if not isinstance(raw, dict):
+                self.error(line, "Expected an object with name and email")
+                continue
+            try:
+                row = schemas.ParticipantCreate.model_validate(
+                    {"name": raw.get("name"), "email": raw.get("email")}
+                )
+            except ValidationError as e:
+                first = e.errors()[0]
+                field = ".".join(str(part) for part in first["loc"])
+                self.error(line, f"{field}: {first['msg']}", raw.get("email"))
+                continue
+            if row.email in self.seen:
+                duplicate = f"Duplicate of row {self.seen[row.email]}"
+                self.error(line, duplicate, row.email)
+                continue
+            if row.email in self.ids:
+                self.error(line, "Already a participant in this group", row.email)
+                continue
+            self.seen[row.email] = line
+
+            receivers = _receiver_emails(raw.get("allowed_receivers"))
+            if receivers:
+                self.restrictions.append((line, row.email, receivers))
+            pending.append({"name": row.name, "email": row.email, "group_id": group_id})
+            if len(pending) >= IMPORT_CHUNK:
+                yield pending
+                pending = []
+        if pending:
+            yield pending
+
+    def inserted(self, rows: List[Tuple[int, str]]) -> None:
+        """Record the ``(id, email)`` pairs of an inserted chunk"""
+        self.ids.update((email, id) for id, email in rows)
+        self.report["created"] += len(rows)
+
+    def edge_chunks(self) -> Iterator[List[Dict]]:
+        """Restriction rows, ``RESTRICTION_CHUNK`` at a time, once all are inserted"""
+        edges: List[Dict] = []
+        for line, giver, receivers in self.restrictions:
+            giver_id = self.ids[giver]
+            chosen = set()
+            for receiver in receivers:
+                try:
+                    receiver_id = self.ids.get(receiver) or self.ids.get(
+                        _email.validate_python(receiver)
+                    )
+                except ValidationError:
+                    receiver_id = None
+                if receiver_id is None:
+                    self.error(line, f"Unknown receiver: {receiver}", giver)
+                elif receiver_id == giver_id:
+                    self.error(
+                        line, "A participant cannot be assigned to themselves", giver
+                    )
+                elif receiver_id not in chosen:
+                    chosen.add(receiver_id)
+                    edges.append({"giver_id": giver_id, "receiver_id": receiver_id})
+                if len(edges) >= RESTRICTION_CHUNK:
+                    yield edges
+                    edges = []
+        if edges:
+            yield edges
+
+
+def _existing_emails(group_id: int):
+    return select(models.Participant.email, models.Participant.id).where(
+        models.Participant.group_id == group_id
+    )
+
+
+def import_participants(
+    db: Session, group_id: int, stream: IO[str], format: str = "csv"
+) -> Dict:
+    """
+    Add the participants (and their allowed receivers) in ``stream`` to a
+    group. Emails already in the group or repeated in the upload are
+    reported as row errors. The caller commits.
+
+    Returns the number of participants and restrictions created and the row
+    errors, each with its line number.
+    """
+    if format not in IMPORT_FORMATS:
+        raise ValueError(f"Unknown import format: {format}")
+
+    parser = _RosterParser(dict(db.execute(_existing_emails(group_id)).all()))
+    for chunk in parser.participant_chunks(group_id, stream, format):
+        parser.inserted(_insert_participants(db, group_id, chunk))
+    for edges in parser.edge_chunks():
+        db.execute(insert(models.participant_restrictions), edges)
+        parser.report["restrictions"] += len(edges)
+
+    if parser.report["created"]:
+        mark_group_changed(db, group_id)
+    return parser.report
+
+
+async def import_participants_async(
+    db: "AsyncSession", group_id: int, stream: IO[str], format: str = "csv"
+) -> Dict:
+    """
+    import_participants() for an AsyncSession. Reading and validating the
+    upload runs in a worker thread, one chunk at a time, so only the
+    inserts themselves happen on the event loop.
+    """
+    if format not in IMPORT_FORMATS:
+        raise ValueError(f"Unknown import format: {format}")
+
+    parser = _RosterParser(dict((await db.execute(_existing_emails(group_id))).all()))
+    chunks = parser.participant_chunks(group_id, stream, format)
+    while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+        parser.inserted(await db.run_sync(_insert_participants, group_id, chunk))
+    edge_chunks = parser.edge_chunks()
+    while (edges := await asyncio.to_thread(next, edge_chunks, None)) is not None:
+        await db.execute(insert(models.participant_restrictions), edges)
+        parser.report["restrictions"] += len(edges)
+
+    if parser.report["created"]:
+        mark_group_changed(db.sync_session, group_id)
+    return parser.report
@@ -0,0 +1,105 @@
+"""
+Conditional and cached responses for the dashboard's read endpoints.
+
+Every group carries a version that the commit bumps whenever the group, its
+participants, restrictions or history change (see group_events), so a
+response is identified by the versions it was built from. The ETag is derived
+from them: a poll with a matching ``If-None-Match`` gets a 304 after a single
+indexed version lookup, and any other poll for an unchanged group is served
+from an in-process LRU of serialized bodies instead of being rebuilt. Keys
+of per-group entries start with the group id, so they can be dropped as soon
+as the group changes.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from .group_events import on_group_change
+
+RESPONSE_CACHE_SIZE = 512
+# Clients may keep responses but must revalidate them with the ETag
+CACHE_CONTROL = "private, no-cache"
+
+_cache: "OrderedDict[Hashable, Tuple[str, bytes]]" = OrderedDict()
+_cache_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "not_modified": 0}
+
+
+def make_etag(*versions: Any) -> str:
+    """Strong ETag for a response built from ``versions``"""
+    digest = hashlib.sha256(repr(versions).encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def _matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+def cached_response(request: Request, key: Hashable, etag: str) -> Optional[Response]:
+    """
+    A 304 when the client already has ``etag``, the cached body when the
+    server has it, otherwise None and the caller builds it with store().
+    """
+    if _matches(request, etag):
+        with _cache_lock:
+            _stats["not_modified"] += 1
+        return Response(
+            status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        )
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] == etag:
+            _cache.move_to_end(key)
+            _stats["hits"] += 1
+            return _json(entry[1], etag)
+        _stats["misses"] += 1
+    return None
+
+
+@lru_cache(maxsize=None)
+def _adapter(model: Any) -> TypeAdapter:
+    return TypeAdapter(model)
+
+
+def store(key: Hashable, etag: str, model: Any, data: Any) -> Response:
+    """Serialize ``data`` as ``model`` (e.g. a response_model), cache and return it"""
+    adapter = _adapter(model)
+    body = adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+    with _cache_lock:
+        _cache[key] = (etag, body)
+        _cache.move_to_end(key)
+        while len(_cache) > RESPONSE_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return _json(body, etag)
+
+
+def _json(body: bytes, etag: str) -> Response:
+    return Response(
+        body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL},
+    )
+
+
+def response_cache_stats() -> Dict:
+    with _cache_lock:
+        return {**_stats, "size": len(_cache)}
+
+
+@on_group_change
+def invalidate_responses(group_id: int) -> None:
+    # Stale entries would only be replaced on the next poll; free them now
+    with _cache_lock:
+        for key in [key for key in _cache if key[0] == group_id]:
+            del _cache[key]
@@ -0,0 +1,271 @@
+"""
+Set-based editing of ``participant_restrictions``.
+
+Restrictions are changed with a handful of Core statements instead of
+through the ``allowed_receivers`` collection, which loads every edge and
+deletes them one by one: ids are checked against the group in a single
+SELECT, edges go away in one DELETE and arrive in multi-row INSERTs. Core
+statements bypass the ORM events, so every change marks the group itself.
+
+The compact exchange format lists the participant ids once and then encodes
+each giver's allowed receivers as positions in that list, in base64: a tag
+byte followed by either a little-endian bitset (tag 0) or, when shorter,
+alternating lengths of not-allowed / allowed runs as LEB128 varints (tag 1).
+A 1,000-person matrix is then at most ~170 bytes per row instead of up to a
+thousand names.
+"""
+import base64
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from .. import models
+from .group_events import mark_group_changed
+from .solver import iter_bits
+
+# Restriction pairs per INSERT statement (2 bound parameters each)
+RESTRICTION_INSERT_CHUNK = 5000
+
+_restrictions = models.participant_restrictions
+
+_BITSET = 0
+_RUNS = 1
+
+
+def _check_members(db: Session, group_id: int, ids: Set[int]) -> None:
+    """Raise ValueError unless every id is a participant of the group"""
+    if not ids:
+        return
+    found = db.scalar(
+        select(func.count())
+        .select_from(models.Participant)
+        .where(models.Participant.group_id == group_id, models.Participant.id.in_(ids))
+    )
+    if found != len(ids):
+        raise ValueError("Some participant IDs do not belong to this group")
+
+
+def _insert_edges(db: Session, edges: Iterable[Dict]) -> int:
+    count = 0
+    chunk: List[Dict] = []
+    for edge in edges:
+        chunk.append(edge)
+        if len(chunk) >= RESTRICTION_INSERT_CHUNK:
+            db.execute(insert(_restrictions), chunk)
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        db.execute(insert(_restrictions), chunk)
+        count += len(chunk)
+    return count
+
+
+def update_restrictions(
+    db: Session,
+    group_id: int,
+    giver_id: int,
+    add: Iterable[int] = (),
+    remove: Iterable[int] = (),
+    replace: bool = False,
+) -> None:
+    """
+    Change who ``giver_id`` may be assigned to: allow the ``add`` receivers
+    and stop allowing the ``remove`` ones. With ``replace`` the giver's
+    current receivers are all dropped first, so ``add`` becomes the full
+    list. Raises ValueError for ids outside the group or a self-pairing.
+    The caller commits.
+    """
+    add, remove = set(add), set(remove)
+    if giver_id in add:
+        raise ValueError("A participant cannot be assigned to themselves")
+    if add & remove:
+        raise ValueError("The same receiver cannot be both added and removed")
+    _check_members(db, group_id, add | remove | {giver_id})
+
+    if replace or remove:
+        stmt = delete(_restrictions).where(_restrictions.c.giver_id == giver_id)
+        if not replace:
+            stmt = stmt.where(_restrictions.c.receiver_id.in_(remove))
+        db.execute(stmt)
+    if add and not replace:
+        add -= set(
+            db.scalars(
+                select(_restrictions.c.receiver_id).where(
+                    _restrictions.c.giver_id == giver_id,
+                    _restrictions.c.receiver_id.in_(add),
+                )
+            )
+        )
+    _insert_edges(db, ({"giver_id": giver_id, "receiver_id": r} for r in add))
+    mark_group_changed(db, group_id)
+
+
+def get_restriction_matrix(db: Session, group_id: int) -> Dict[int, List[int]]:
+    """Allowed receiver ids per restricted giver of the group"""
+    matrix: Dict[int, List[int]] = {}
+    rows = db.execute(
+        select(_restrictions.c.giver_id, _restrictions.c.receiver_id)
+        .join(models.Participant, models.Participant.id == _restrictions.c.giver_id)
+        .where(models.Participant.group_id == group_id)
+        .order_by(_restrictions.c.giver_id, _restrictions.c.receiver_id)
+    )
+    for giver_id, receiver_id in rows:
+        matrix.setdefault(giver_id, []).append(receiver_id)
+    return matrix
+
+
+def replace_restriction_matrix(
+    db: Session, group_id: int, matrix: Dict[int, Iterable[int]]
+) -> int:
+    """
+    Replace every restriction in the group with ``matrix`` (giver id to
+    allowed receiver ids; givers left out may give to anyone). Raises
+    ValueError for ids outside the group or a self-pairing. The caller
+    commits. Returns the number of restrictions written.
+    """
+    matrix = {giver_id: set(receivers) for giver_id, receivers in matrix.items()}
+    ids = set(matrix)
+    for giver_id, receivers in matrix.items():
+        if giver_id in receivers:
+            raise ValueError("A participant cannot be assigned to themselves")
+        ids |= receivers
+    _check_members(db, group_id, ids)
+
+    db.execute(
+        delete(_restrictions).where(
+            _restrictions.c.giver_id.in_(
+                select(models.Participant.id).where(
+                    models.Participant.group_id == group_id
+                )
+            )
+        )
+    )
+    count = _insert_edges(
+        db,
+        (
+            {"giver_id": giver_id, "receiver_id": receiver_id}
+            for giver_id, receivers in matrix.items()
+            for receiver_id in receivers
+        ),
+    )
+    mark_group_changed(db, group_id)
+    return count
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def encode_row(positions: Sequence[int], size: int) -> str:
+    """Encode sorted receiver positions (out of ``size``) as base64"""
+    mask = 0
+    for position in positions:
+        mask |= 1 << position
+    bitset = bytes([_BITSET]) + mask.to_bytes((size + 7) // 8, "little")
+
+    runs = bytearray([_RUNS])
+    end = 0  # One past the last allowed position written so far
+    i = 0
+    while i < len(positions):
+        start = positions[i]
+        while i + 1 < len(positions) and positions[i + 1] == positions[i] + 1:
+            i += 1
+        runs += _varint(start - end) + _varint(positions[i] + 1 - start)
+        end = positions[i] + 1
+        i += 1
+
+    return base64.b64encode(min(bitset, bytes(runs), key=len)).decode("ascii")
+
+
+def decode_row(text: str, size: int) -> List[int]:
+    """Receiver positions encoded by encode_row(); raises ValueError"""
+    data = base64.b64decode(text, validate=True)
+    if not data:
+        raise ValueError("Empty restriction row")
+    if data[0] == _BITSET:
+        positions = iter_bits(int.from_bytes(data[1:], "little"))
+    elif data[0] == _RUNS:
+        values, value, shift = [], 0, 0
+        for byte in data[1:]:
+            value |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                values.append(value)
+                value, shift = 0, 0
+        if shift or len(values) % 2:
+            raise ValueError("Truncated restriction row")
+        positions, end = [], 0
+        for gap, length in zip(values[::2], values[1::2]):
+            start = end + gap
+            end = start + length
+            if end > size:
+                raise ValueError("Restriction row refers past the participant list")
+            positions.extend(range(start, end))
+    else:
+        raise ValueError(f"Unknown restriction row encoding: {data[0]}")
+    if positions and positions[-1] >= size:
+        raise ValueError("Restriction row refers past the participant list")
+    return positions
+
+
+def encode_restriction_graph(
+    participant_ids: Sequence[int], matrix: Dict[int, Sequence[int]]
+) -> Dict:
+    """The compact form of ``matrix`` over ``participant_ids``"""
+    position = {participant_id: i for i, participant_id in enumerate(participant_ids)}
+    size = len(participant_ids)
+    return {
+        "participant_ids": list(participant_ids),
+        "rows": [
+            encode_row(sorted(position[r] for r in matrix[giver_id]), size)
+            if giver_id in matrix
+            else None
+            for giver_id in participant_ids
+        ],
+    }
+
+
+def decode_restriction_graph(
+    participant_ids: Sequence[int], rows: Sequence[Optional[str]]
+) -> Dict[int, List[int]]:
+    """The restriction matrix behind a compact graph; raises ValueError"""
+    if len(rows) != len(participant_ids):
+        raise ValueError("Need exactly one restriction row per participant")
+    if len(set(participant_ids)) != len(participant_ids):
+        raise ValueError("Participant IDs must be unique")
+    size = len(participant_ids)
+    return {
+        giver_id: [participant_ids[p] for p in decode_row(row, size)]
+        for giver_id, row in zip(participant_ids, rows)
+        if row is not None
+    }
+
+
+def get_compact_roster(db: Session, group_id: int) -> Dict:
+    """The group's participants plus their restrictions in the compact form"""
+    participants = [
+        dict(row)
+        for row in db.execute(
+            select(
+                models.Participant.id,
+                models.Participant.name,
+                models.Participant.email,
+                models.Participant.group_id,
+                models.Participant.created_at,
+            )
+            .where(models.Participant.group_id == group_id)
+            .order_by(models.Participant.id)
+        ).mappings()
+    ]
+    return {
+        "participants": participants,
+        "restrictions": encode_restriction_graph(
+            [p["id"] for p in participants], get_restriction_matrix(db, group_id)
+        ),
+    }
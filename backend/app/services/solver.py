@@ -0,0 +1,888 @@
+"""
+Graph engine behind Secret Santa assignments.
+
+Participants are numbered 0..n-1 and the constraint graph is passed around as a
+list of integer bitsets: bit j of ``adjacency[i]`` is set when participant i may
+give a gift to participant j. Everything in this module is pure Python and
+database-free so it can be reused by previews, benchmarks and feasibility checks.
+"""
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple
+
+# Fresh random matchings tried before falling back to an exact search
+PATCH_ATTEMPTS = 8
+# Budget for the fallback searches
+DEFAULT_MAX_NODES = 500_000
+DEFAULT_TIME_LIMIT = 10.0
+# Shortest gift circle allowed by the min_cycle mode unless told otherwise
+DEFAULT_MIN_CYCLE_LENGTH = 3
+# Random sets of pairings released per window size when repairing
+REPAIR_ATTEMPTS = 16
+
+
+class InfeasibleError(ValueError):
+    """Raised when the constraint graph provably has no valid assignment.
+
+    ``givers`` and ``receivers`` hold the participant indices that witness the
+    problem (e.g. a Hall-violating set and its neighbourhood).
+    """
+
+    def __init__(
+        self, message: str, givers: Sequence[int] = (), receivers: Sequence[int] = ()
+    ):
+        super().__init__(message)
+        self.givers = list(givers)
+        self.receivers = list(receivers)
+
+
+class SearchBudgetExceeded(ValueError):
+    """Raised when a fallback search runs out of its node or time budget"""
+
+
+@dataclass
+class SolverStats:
+    nodes: int = 0
+    backtracks: int = 0
+    elapsed: float = 0.0
+
+
+@dataclass
+class SolverResult:
+    # successors[i] is the index of the participant i gives to
+    successors: List[int]
+    stats: SolverStats = field(default_factory=SolverStats)
+
+
+def iter_bits(mask: int) -> List[int]:
+    """Return the indices of the set bits of ``mask`` in ascending order"""
+    # Scanning the binary string is far cheaper than repeated big-int
+    # arithmetic once groups reach a few hundred participants
+    digits = bin(mask)[:1:-1]
+    if digits.count("1") * 8 > len(digits):
+        return [index for index, digit in enumerate(digits) if digit == "1"]
+    indices = []
+    index = digits.find("1")
+    while index != -1:
+        indices.append(index)
+        index = digits.find("1", index + 1)
+    return indices
+
+
+def popcount(mask: int) -> int:
+    return bin(mask).count("1")
+
+
+def to_lists(adjacency: Sequence[int]) -> List[List[int]]:
+    return [iter_bits(mask) for mask in adjacency]
+
+
+def reverse_adjacency(adjacency: Sequence[int]) -> List[int]:
+    """Return the transposed graph (receiver -> possible givers) as bitsets"""
+    reverse = [0] * len(adjacency)
+    for giver, mask in enumerate(adjacency):
+        bit = 1 << giver
+        for receiver in iter_bits(mask):
+            reverse[receiver] |= bit
+    return reverse
+
+
+def hopcroft_karp(
+    adjacency: Sequence[int], rng: Optional[random.Random] = None
+) -> List[int]:
+    """
+    Maximum bipartite matching between givers and receivers.
+
+    Returns ``match`` where ``match[giver]`` is the matched receiver or -1.
+    When ``rng`` is given, vertex and edge order are randomised so repeated
+    calls produce different (but still maximum) matchings.
+    """
+    n = len(adjacency)
+    adj = to_lists(adjacency)
+    order = list(range(n))
+    if rng is not None:
+        rng.shuffle(order)
+        for giver, neighbours in enumerate(adj):
+            if neighbours:
+                # Rotating is enough to vary the greedy pass and stays O(1)
+                # Python work per giver, unlike a full shuffle
+                cut = rng.randrange(len(neighbours))
+                adj[giver] = neighbours[cut:] + neighbours[:cut]
+
+    match_left = [-1] * n
+    match_right = [-1] * n
+
+    # Greedy pass: on realistic groups this leaves only a handful of givers
+    # for the phased augmentation below
+    for u in order:
+        for v in adj[u]:
+            if match_right[v] == -1:
+                match_left[u] = v
+                match_right[v] = u
+                break
+
+    infinity = n + 1
+    dist = [infinity] * n
+
+    def bfs() -> bool:
+        """Layer the givers by alternating distance, using bitsets per layer"""
+        for u in range(n):
+            dist[u] = infinity
+        layer = [u for u in order if match_left[u] == -1]
+        for u in layer:
+            dist[u] = 0
+        free_right = 0
+        for v in range(n):
+            if match_right[v] == -1:
+                free_right |= 1 << v
+        seen_right = 0
+        depth = 0
+        while layer:
+            reach = 0
+            for u in layer:
+                reach |= adjacency[u]
+            reach &= ~seen_right
+            if reach & free_right:
+                return True
+            seen_right |= reach
+            depth += 1
+            layer = []
+            for v in iter_bits(reach):
+                w = match_right[v]
+                if dist[w] == infinity:
+                    dist[w] = depth
+                    layer.append(w)
+        return False
+
+    def augment(root: int) -> bool:
+        # Iterative DFS along the BFS layers (recursion would overflow on big groups)
+        stack = [(root, iter(adj[root]))]
+        path = []
+        while stack:
+            u, neighbours = stack[-1]
+            advanced = False
+            for v in neighbours:
+                w = match_right[v]
+                if w == -1:
+                    path.append((u, v))
+                    for left, right in path:
+                        match_left[left] = right
+                        match_right[right] = left
+                    return True
+                if dist[w] == dist[u] + 1:
+                    path.append((u, v))
+                    stack.append((w, iter(adj[w])))
+                    advanced = True
+                    break
+            if not advanced:
+                dist[u] = infinity
+                stack.pop()
+                if path:
+                    path.pop()
+        return False
+
+    while bfs():
+        for u in order:
+            if match_left[u] == -1:
+                augment(u)
+
+    return match_left
+
+
+def hall_violation(
+    adjacency: Sequence[int], match: Sequence[int], start: Optional[int] = None
+) -> Tuple[List[int], List[int]]:
+    """
+    Given a maximum matching that is not perfect, return a Hall-violating pair
+    ``(givers, receivers)``: every receiver any of ``givers`` may give to is in
+    ``receivers``, and there are fewer receivers than givers. The witness grows
+    from the unmatched giver ``start`` (by default the first one).
+    """
+    match_right = [-1] * len(adjacency)
+    for giver, receiver in enumerate(match):
+        if receiver != -1:
+            match_right[receiver] = giver
+
+    # Alternating BFS from the unmatched givers (Konig's construction)
+    seen_givers = 0
+    seen_receivers = 0
+    queue = deque()
+    if start is None:
+        start = match.index(-1)
+    seen_givers |= 1 << start
+    queue.append(start)
+    while queue:
+        giver = queue.popleft()
+        for receiver in iter_bits(adjacency[giver] & ~seen_receivers):
+            seen_receivers |= 1 << receiver
+            partner = match_right[receiver]
+            if partner != -1 and not seen_givers >> partner & 1:
+                seen_givers |= 1 << partner
+                queue.append(partner)
+    return iter_bits(seen_givers), iter_bits(seen_receivers)
+
+
+def _reachable(adjacency: Sequence[int], source: int) -> int:
+    """Bitset of all vertices reachable from ``source``"""
+    seen = 1 << source
+    frontier = seen
+    while frontier:
+        expanded = 0
+        for vertex in iter_bits(frontier):
+            expanded |= adjacency[vertex]
+        frontier = expanded & ~seen
+        seen |= frontier
+    return seen
+
+
+def _coreachable(adjacency: Sequence[int], target: int) -> int:
+    """Bitset of all vertices that can reach ``target``, without transposing"""
+    seen = 1 << target
+    pending = [vertex for vertex in range(len(adjacency)) if vertex != target]
+    grew = True
+    while grew and pending:
+        grew = False
+        remaining = []
+        for vertex in pending:
+            if adjacency[vertex] & seen:
+                seen |= 1 << vertex
+                grew = True
+            else:
+                remaining.append(vertex)
+        pending = remaining
+    return seen
+
+
+def strongly_connected_components(adjacency: Sequence[int]) -> List[List[int]]:
+    """
+    Tarjan's algorithm, iteratively. Components are returned in topological
+    order of the condensation: edges between components only point forward.
+    """
+    n = len(adjacency)
+    index = [-1] * n
+    lowlink = [0] * n
+    on_stack = [False] * n
+    stack: List[int] = []
+    components: List[List[int]] = []
+    counter = 0
+
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        work = [(root, iter(iter_bits(adjacency[root])))]
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        while work:
+            vertex, successors = work[-1]
+            for nxt in successors:
+                if index[nxt] == -1:
+                    index[nxt] = lowlink[nxt] = counter
+                    counter += 1
+                    stack.append(nxt)
+                    on_stack[nxt] = True
+                    work.append((nxt, iter(iter_bits(adjacency[nxt]))))
+                    break
+                if on_stack[nxt]:
+                    lowlink[vertex] = min(lowlink[vertex], index[nxt])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[vertex])
+                if lowlink[vertex] == index[vertex]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == vertex:
+                            break
+                    components.append(sorted(component))
+
+    # Tarjan emits sink components first
+    components.reverse()
+    return components
+
+
+def check_feasibility(
+    adjacency: Sequence[int],
+    require_cycle: bool = False,
+    rng: Optional[random.Random] = None,
+) -> List[int]:
+    """
+    Run the cheap necessary conditions for a valid assignment and return a
+    perfect matching (a derangement) when they hold.
+
+    Raises InfeasibleError on the first violated condition: a giver without
+    options, a receiver nobody can give to, a Hall-violating set, or (when
+    ``require_cycle`` is set) a graph that is not strongly connected.
+    """
+    n = len(adjacency)
+    if n < 2:
+        raise InfeasibleError("Need at least 2 participants for Secret Santa")
+
+    full = (1 << n) - 1
+    for giver, mask in enumerate(adjacency):
+        if not mask:
+            raise InfeasibleError("Giver has no valid options", givers=[giver])
+
+    covered = 0
+    for mask in adjacency:
+        covered |= mask
+    if covered != full:
+        receiver = iter_bits(full & ~covered)[0]
+        raise InfeasibleError("Nobody can give to receiver", receivers=[receiver])
+
+    match = hopcroft_karp(adjacency, rng)
+    if -1 in match:
+        givers, receivers = hall_violation(adjacency, match)
+        raise InfeasibleError(
+            "Hall's condition is violated", givers=givers, receivers=receivers
+        )
+
+    if require_cycle:
+        forward = _reachable(adjacency, 0)
+        if forward != full:
+            raise InfeasibleError(
+                "Constraint graph is not strongly connected",
+                givers=iter_bits(full & ~forward),
+            )
+        backward = _coreachable(adjacency, 0)
+        if backward != full:
+            raise InfeasibleError(
+                "Constraint graph is not strongly connected",
+                givers=iter_bits(full & ~backward),
+            )
+
+    return match
+
+
+def cycles_of(successors: Sequence[int]) -> List[List[int]]:
+    """Decompose a permutation into its cycles"""
+    seen = [False] * len(successors)
+    cycles = []
+    for start in range(len(successors)):
+        if seen[start]:
+            continue
+        cycle = []
+        vertex = start
+        while not seen[vertex]:
+            seen[vertex] = True
+            cycle.append(vertex)
+            vertex = successors[vertex]
+        cycles.append(cycle)
+    return cycles
+
+
+def patch_cycles(
+    adjacency: Sequence[int],
+    successors: List[int],
+    min_length: Optional[int] = None,
+    rng: Optional[random.Random] = None,
+) -> List[int]:
+    """
+    Merge the cycles of ``successors`` in place by 2-exchanges.
+
+    Two cycles containing ``a`` and ``b`` merge into one when ``a`` may give to
+    ``b``'s receiver and ``b`` may give to ``a``'s receiver. Merging stops once
+    every cycle is at least ``min_length`` long (a single cycle when omitted)
+    or no further exchange is allowed.
+    """
+    rng = rng or random
+    cycle_id = [0] * len(successors)
+    cycles = cycles_of(successors)
+    for index, cycle in enumerate(cycles):
+        for vertex in cycle:
+            cycle_id[vertex] = index
+
+    def short(cycle: List[int]) -> bool:
+        if min_length is None:
+            return len(live) > 1
+        return len(cycle) < min_length
+
+    def merge(index: int) -> bool:
+        members = cycles[index]
+        others = [
+            vertex for vertex in range(len(successors)) if cycle_id[vertex] != index
+        ]
+        rng.shuffle(others)
+        for a in members:
+            a_next = successors[a]
+            for b in others:
+                b_next = successors[b]
+                if adjacency[a] >> b_next & 1 and adjacency[b] >> a_next & 1:
+                    successors[a], successors[b] = b_next, a_next
+                    absorbed = cycle_id[b]
+                    for vertex in cycles[absorbed]:
+                        cycle_id[vertex] = index
+                    cycles[index] = members + cycles[absorbed]
+                    cycles[absorbed] = []
+                    live.discard(absorbed)
+                    return True
+        return False
+
+    live = set(range(len(cycles)))
+    while True:
+        pending = sorted(
+            (index for index in live if short(cycles[index])),
+            key=lambda index: len(cycles[index]),
+        )
+        if not any(merge(index) for index in pending):
+            return successors
+
+
+def find_derangement(
+    adjacency: Sequence[int], rng: Optional[random.Random] = None
+) -> SolverResult:
+    """Find any assignment where everyone gives and receives exactly once"""
+    started = time.perf_counter()
+    rng = rng or random.Random()
+    successors = check_feasibility(adjacency, rng=rng)
+    stats = SolverStats(nodes=len(adjacency), elapsed=time.perf_counter() - started)
+    return SolverResult(successors=successors, stats=stats)
+
+
+def find_cycle(
+    adjacency: Sequence[int],
+    rng: Optional[random.Random] = None,
+    max_nodes: int = DEFAULT_MAX_NODES,
+    time_limit: Optional[float] = DEFAULT_TIME_LIMIT,
+) -> SolverResult:
+    """
+    Find a single gift-giving circle through every participant.
+
+    Random perfect matchings are patched into one cycle first, which settles
+    almost every real group in polynomial time. Only when patching keeps
+    getting stuck do we fall back to a pruned depth-first search bounded by
+    ``max_nodes`` expanded states and ``time_limit`` seconds.
+    """
+    started = time.perf_counter()
+    rng = rng or random.Random()
+    stats = SolverStats()
+
+    successors = check_feasibility(adjacency, require_cycle=True, rng=rng)
+    for attempt in range(PATCH_ATTEMPTS):
+        if attempt:
+            successors = hopcroft_karp(adjacency, rng)
+        stats.nodes += len(successors)
+        patch_cycles(adjacency, successors, rng=rng)
+        if len(cycles_of(successors)) == 1:
+            break
+    else:
+        deadline = started + time_limit if time_limit is not None else None
+        successors = _search_cycle(adjacency, rng, stats, max_nodes, deadline)
+
+    stats.elapsed = time.perf_counter() - started
+    return SolverResult(successors=successors, stats=stats)
+
+
+def find_min_cycle(
+    adjacency: Sequence[int],
+    rng: Optional[random.Random] = None,
+    min_length: int = DEFAULT_MIN_CYCLE_LENGTH,
+    max_nodes: int = DEFAULT_MAX_NODES,
+    time_limit: Optional[float] = DEFAULT_TIME_LIMIT,
+) -> SolverResult:
+    """
+    Find an assignment made of gift circles of at least ``min_length`` people
+    each, e.g. no two participants simply swapping gifts. Random matchings are
+    patched until every circle is long enough; when patching keeps getting
+    stuck, an exact search over sets of circles (bounded like find_cycle's)
+    settles it.
+    """
+    n = len(adjacency)
+    if min_length >= n:
+        return find_cycle(adjacency, rng, max_nodes, time_limit)
+
+    started = time.perf_counter()
+    rng = rng or random.Random()
+    stats = SolverStats()
+
+    successors = check_feasibility(adjacency, rng=rng)
+    for attempt in range(PATCH_ATTEMPTS):
+        if attempt:
+            successors = hopcroft_karp(adjacency, rng)
+        stats.nodes += n
+        patch_cycles(adjacency, successors, min_length=min_length, rng=rng)
+        if min(len(cycle) for cycle in cycles_of(successors)) >= min_length:
+            break
+    else:
+        deadline = started + time_limit if time_limit is not None else None
+        successors = _search_cycle_cover(
+            adjacency, min_length, stats, max_nodes, deadline
+        )
+
+    stats.elapsed = time.perf_counter() - started
+    return SolverResult(successors=successors, stats=stats)
+
+
+def _search_cycle(
+    adjacency: Sequence[int],
+    rng: random.Random,
+    stats: SolverStats,
+    max_nodes: int,
+    deadline: Optional[float],
+) -> List[int]:
+    """
+    Depth-first Hamiltonian cycle search with Warnsdorff ordering.
+
+    ``out_open[u]`` counts the successors still usable by an unvisited ``u`` and
+    ``in_open[u]`` the predecessors still usable by ``u``; a branch is cut as
+    soon as either drops to zero, and a vertex whose only remaining predecessor
+    is the path endpoint is taken next (a forced move).
+    """
+    n = len(adjacency)
+    out_lists = to_lists(adjacency)
+    in_lists = to_lists(reverse_adjacency(adjacency))
+
+    # Most constrained vertex first; on a cycle the start does not matter
+    start = min(range(n), key=lambda v: (len(in_lists[v]), rng.random()))
+    visited = [False] * n
+    visited[start] = True
+    out_open = [len(out) for out in out_lists]
+    in_open = [len(into) for into in in_lists]
+
+    def advance(current: int, nxt: int) -> bool:
+        """Move the endpoint from ``current`` to ``nxt``; False on a dead end"""
+        ok = True
+        visited[nxt] = True
+        for u in out_lists[current]:
+            if u != nxt and (not visited[u] or u == start):
+                in_open[u] -= 1
+                if in_open[u] == 0:
+                    ok = False
+        for p in in_lists[nxt]:
+            if not visited[p]:
+                out_open[p] -= 1
+                if out_open[p] == 0:
+                    ok = False
+        return ok
+
+    def retreat(current: int, nxt: int) -> None:
+        for p in in_lists[nxt]:
+            if not visited[p]:
+                out_open[p] += 1
+        for u in out_lists[current]:
+            if u != nxt and (not visited[u] or u == start):
+                in_open[u] += 1
+        visited[nxt] = False
+
+    def candidates(current: int) -> List[int]:
+        options = [v for v in out_lists[current] if not visited[v]]
+        forced = [v for v in options if in_open[v] == 1]
+        if len(forced) > 1:
+            return []
+        if forced:
+            return forced
+        rng.shuffle(options)
+        options.sort(key=lambda v: out_open[v])
+        return options
+
+    path = [start]
+    stack = [iter(candidates(start))]
+    while stack:
+        if stats.nodes >= max_nodes or (
+            deadline is not None and stats.nodes & 1023 == 0
+            and time.perf_counter() > deadline
+        ):
+            raise SearchBudgetExceeded(
+                f"Gave up after exploring {stats.nodes} search states"
+            )
+        current = path[-1]
+        nxt = next(stack[-1], None)
+        if nxt is None:
+            stack.pop()
+            path.pop()
+            if path:
+                retreat(path[-1], current)
+                stats.backtracks += 1
+            continue
+
+        stats.nodes += 1
+        if not advance(current, nxt):
+            retreat(current, nxt)
+            stats.backtracks += 1
+            continue
+        path.append(nxt)
+        if len(path) == n:
+            if adjacency[nxt] >> start & 1:
+                successors = [0] * n
+                for index, vertex in enumerate(path):
+                    successors[vertex] = path[(index + 1) % n]
+                return successors
+            path.pop()
+            retreat(current, nxt)
+            stats.backtracks += 1
+            continue
+        stack.append(iter(candidates(nxt)))
+
+    raise InfeasibleError("No single gift-giving circle exists")
+
+
+def _search_cycle_cover(
+    adjacency: Sequence[int],
+    min_length: int,
+    stats: SolverStats,
+    max_nodes: int,
+    deadline: Optional[float],
+) -> List[int]:
+    """
+    Exact depth-first search for circles of at least ``min_length`` people
+    that together cover everyone.
+
+    Circles are built one at a time, each from the most constrained unplaced
+    participant, so every cover is reached once. A branch is cut as soon as an
+    unplaced participant has no possible giver or receiver left, or the open
+    circle can no longer reach ``min_length``; a circle is only closed when
+    nobody or at least ``min_length`` people remain for the next ones.
+    """
+    n = len(adjacency)
+    reverse = reverse_adjacency(adjacency)
+    close = -1
+
+    def next_start(free: int) -> int:
+        return min(iter_bits(free), key=lambda v: (popcount(reverse[v] & free), v))
+
+    start = next_start((1 << n) - 1)
+    free = ((1 << n) - 1) & ~(1 << start)  # Not in a circle or the open path
+    path = [start]
+    closed: List[List[int]] = []
+
+    def options() -> List[int]:
+        end = path[-1]
+        # Fewest onward options first, as in the single-cycle search
+        moves = sorted(
+            iter_bits(adjacency[end] & free),
+            key=lambda v: (popcount(adjacency[v] & free), v),
+        )
+        rest = popcount(free)
+        if (
+            len(path) >= min_length
+            and adjacency[end] >> path[0] & 1
+            and (rest == 0 or rest >= min_length)
+        ):
+            moves.insert(0, close)
+        return moves
+
+    def viable() -> bool:
+        first, end = path[0], path[-1]
+        if len(path) + popcount(free) < min_length:
+            return False
+        # Receivers come from the unplaced or close the open circle, givers
+        # from the unplaced or the open path's end
+        outs = free | 1 << first
+        ins = free | 1 << end
+        if not adjacency[end] & outs or not reverse[first] & ins:
+            return False
+        return all(
+            adjacency[u] & outs and reverse[u] & ins for u in iter_bits(free)
+        )
+
+    def undo(move: int) -> None:
+        nonlocal free, path
+        if move == close:
+            free |= 1 << path[0]
+            path = closed.pop()
+        else:
+            path.pop()
+            free |= 1 << move
+
+    stack = [iter(options())]
+    made: List[int] = []
+    while stack:
+        if stats.nodes >= max_nodes or (
+            deadline is not None and stats.nodes & 1023 == 0
+            and time.perf_counter() > deadline
+        ):
+            raise SearchBudgetExceeded(
+                f"Gave up after exploring {stats.nodes} search states"
+            )
+        move = next(stack[-1], None)
+        if move is None:
+            stack.pop()
+            if made:
+                undo(made.pop())
+                stats.backtracks += 1
+            continue
+
+        stats.nodes += 1
+        if move == close:
+            closed.append(path)
+            if not free:
+                successors = [0] * n
+                for circle in closed:
+                    for index, vertex in enumerate(circle):
+                        successors[vertex] = circle[(index + 1) % len(circle)]
+                return successors
+            path = [next_start(free)]
+            free &= ~(1 << path[0])
+        else:
+            path.append(move)
+            free &= ~(1 << move)
+
+        if not viable():
+            undo(move)
+            stats.backtracks += 1
+            continue
+        made.append(move)
+        stack.append(iter(options()))
+
+    raise InfeasibleError(
+        f"No set of gift circles of at least {min_length} people exists"
+    )
+
+
+def _link_fragments(
+    adjacency: Sequence[int],
+    successors: Sequence[int],
+    require_cycle: bool,
+    rng: random.Random,
+) -> Optional[List[int]]:
+    """
+    Complete a partial assignment by only adding pairings from the end of one
+    chain (a giver without a receiver) to the start of another (a receiver
+    without a giver). Returns None when the chains cannot be linked that way.
+    """
+    n = len(successors)
+    has_giver = [False] * n
+    for receiver in successors:
+        if receiver != -1:
+            has_giver[receiver] = True
+
+    heads = [vertex for vertex in range(n) if not has_giver[vertex]]
+    tails = []
+    lengths = []
+    on_chain = [False] * n
+    for head in heads:
+        vertex, length = head, 1
+        on_chain[vertex] = True
+        while successors[vertex] != -1:
+            vertex = successors[vertex]
+            on_chain[vertex] = True
+            length += 1
+        tails.append(vertex)
+        lengths.append(length)
+
+    # Whatever is not on a chain already sits on a closed circle
+    closed = 0
+    for start in range(n):
+        if on_chain[start]:
+            continue
+        closed += 1
+        vertex = start
+        while not on_chain[vertex]:
+            on_chain[vertex] = True
+            vertex = successors[vertex]
+
+    k = len(heads)
+    if require_cycle and closed and (k or closed > 1):
+        return None
+    if k == 0:
+        return list(successors)
+
+    # Chain i may be followed by chain j when tail i may give to head j; a
+    # chain may close on itself only in a derangement and when it has two or
+    # more members
+    chains = []
+    for i in range(k):
+        mask = 0
+        for j in range(k):
+            if adjacency[tails[i]] >> heads[j] & 1:
+                mask |= 1 << j
+        if require_cycle or lengths[i] < 2:
+            mask &= ~(1 << i)
+        chains.append(mask)
+
+    if require_cycle and k == 1:
+        if not adjacency[tails[0]] >> heads[0] & 1 or lengths[0] < 2:
+            return None
+        order = [0]
+    elif require_cycle:
+        try:
+            order = find_cycle(chains, rng).successors
+        except (InfeasibleError, SearchBudgetExceeded):
+            return None
+    else:
+        order = hopcroft_karp(chains, rng)
+        if -1 in order:
+            return None
+
+    repaired = list(successors)
+    for i, j in enumerate(order):
+        repaired[tails[i]] = heads[j]
+    return repaired
+
+
+def repair_successors(
+    adjacency: Sequence[int],
+    previous: Sequence[int],
+    require_cycle: bool = True,
+    rng: Optional[random.Random] = None,
+) -> List[int]:
+    """
+    Repair an earlier assignment after participants joined, left or had their
+    restrictions changed, keeping as many of its pairings as possible.
+
+    ``previous[i]`` is giver i's earlier receiver, or -1 for a newcomer or a
+    giver whose receiver left. Pairings that are no longer allowed are dropped
+    and the remaining chains are relinked end to start: one new pairing when
+    someone left, two when someone joined. When that fails, a growing window
+    of further pairings is released (1, 2, 4, ... at a time) before falling
+    back to solving the whole group again.
+    """
+    rng = rng or random.Random()
+    n = len(adjacency)
+    successors = [-1] * n
+    taken = 0
+    for giver, receiver in enumerate(previous):
+        if (
+            receiver != -1
+            and adjacency[giver] >> receiver & 1
+            and not taken >> receiver & 1
+        ):
+            successors[giver] = receiver
+            taken |= 1 << receiver
+
+    repaired = _link_fragments(adjacency, successors, require_cycle, rng)
+    if repaired is not None:
+        return repaired
+
+    # Worth releasing: a pairing g -> r whose giver could link to a chain head
+    # and whose receiver could be reached from a chain tail (for a newcomer y
+    # that is exactly g -> y -> r), or any pairing when only circles are left
+    kept = [giver for giver in range(n) if successors[giver] != -1]
+    heads = ((1 << n) - 1) & ~taken
+    tails_reach = 0
+    for giver in range(n):
+        if successors[giver] == -1:
+            tails_reach |= adjacency[giver]
+    useful = [
+        giver
+        for giver in kept
+        if not heads
+        or adjacency[giver] & heads and tails_reach >> successors[giver] & 1
+    ]
+    rng.shuffle(useful)
+
+    window = 1
+    while window < len(kept):
+        if window == 1:
+            releases = [[giver] for giver in useful[:REPAIR_ATTEMPTS]]
+        else:
+            pool = useful if len(useful) >= window else kept
+            releases = [rng.sample(pool, window) for _ in range(REPAIR_ATTEMPTS)]
+        for release in releases:
+            partial = list(successors)
+            for giver in release:
+                partial[giver] = -1
+            repaired = _link_fragments(adjacency, partial, require_cycle, rng)
+            if repaired is not None:
+                return repaired
+        window *= 2
+
+    solve = find_cycle if require_cycle else find_derangement
+    return solve(adjacency, rng).successors
@@ -0,0 +1,183 @@
+"""
+Pluggable mail transports.
+
+The transport is chosen with the EMAIL_TRANSPORT environment variable:
+
+- ``gmail`` (default): the Gmail API, authorised via token.json/credentials.json
+- ``smtp``: plain SMTP to SMTP_HOST:SMTP_PORT (defaults to localhost:1025, which
+  is where ``python -m aiosmtpd -n`` runs a local debugging server)
+- ``fake``: keeps messages in memory; handy for offline development and tests
+"""
+import os
+import smtplib
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from email.mime.text import MIMEText
+from typing import Dict, List, Optional, Sequence
+
+
+@dataclass
+class OutgoingEmail:
+    to: str
+    subject: str
+    body: str
+    sender: str = "me"
+
+    def to_mime(self, sender: Optional[str] = None) -> MIMEText:
+        mime_message = MIMEText(self.body)
+        mime_message["to"] = self.to
+        mime_message["from"] = sender or self.sender
+        mime_message["subject"] = self.subject
+        return mime_message
+
+
+class MailTransport(ABC):
+    """
+    Delivers messages; implementations must be thread-safe. Transports that can
+    submit several messages per round trip raise ``batch_size`` and override
+    ``send_batch``.
+    """
+
+    name = "base"
+    batch_size = 1
+
+    @abstractmethod
+    def send(self, message: OutgoingEmail) -> None:
+        """Send one message, raising on failure"""
+
+    def send_batch(
+        self, messages: Sequence[OutgoingEmail]
+    ) -> List[Optional[Exception]]:
+        """Send each message; returns None or the exception, per message"""
+        errors: List[Optional[Exception]] = []
+        for message in messages:
+            try:
+                self.send(message)
+                errors.append(None)
+            except Exception as e:
+                errors.append(e)
+        return errors
+
+
+class GmailTransport(MailTransport):
+    """Gmail API via the shared client, using the batch endpoint for bulk sends"""
+
+    name = "gmail"
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            from .gmail import get_gmail_client
+
+            self._client = get_gmail_client()
+        return self._client
+
+    @property
+    def batch_size(self) -> int:
+        from .gmail import GMAIL_BATCH_SIZE
+
+        return GMAIL_BATCH_SIZE
+
+    @staticmethod
+    def _raw(message: OutgoingEmail) -> Dict:
+        from .email import create_message
+
+        return create_message(
+            message.sender, message.to, message.subject, message.body
+        )
+
+    def send(self, message: OutgoingEmail) -> None:
+        self.client.send(self._raw(message))
+
+    def send_batch(
+        self, messages: Sequence[OutgoingEmail]
+    ) -> List[Optional[Exception]]:
+        return self.client.send_batch([self._raw(message) for message in messages])
+
+
+class SMTPTransport(MailTransport):
+    name = "smtp"
+
+    def __init__(
+        self,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_tls: Optional[bool] = None,
+    ):
+        self.host = host or os.getenv("SMTP_HOST", "localhost")
+        self.port = port or int(os.getenv("SMTP_PORT", "1025"))
+        self.username = username or os.getenv("SMTP_USERNAME")
+        self.password = password or os.getenv("SMTP_PASSWORD")
+        if use_tls is None:
+            use_tls = os.getenv("SMTP_STARTTLS", "false").lower() == "true"
+        self.use_tls = use_tls
+
+    def send(self, message: OutgoingEmail) -> None:
+        sender = message.sender
+        if sender == "me":
+            # "me" only means something to the Gmail API
+            sender = self.username or "secret-santa@localhost"
+        mime_message = message.to_mime(sender)
+        with smtplib.SMTP(self.host, self.port, timeout=30) as smtp:
+            if self.use_tls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password or "")
+            smtp.send_message(mime_message)
+
+
+class FakeTransport(MailTransport):
+    """
+    Records messages instead of sending them. ``failures`` maps a recipient to
+    the number of times sending to them should fail before succeeding.
+    """
+
+    name = "fake"
+
+    def __init__(self, failures: Optional[Dict[str, int]] = None):
+        self.sent: List[OutgoingEmail] = []
+        self.failures = dict(failures or {})
+        self._lock = threading.Lock()
+
+    def send(self, message: OutgoingEmail) -> None:
+        with self._lock:
+            remaining = self.failures.get(message.to, 0)
+            if remaining:
+                self.failures[message.to] = remaining - 1
+                raise ConnectionError(f"Simulated failure sending to {message.to}")
+            self.sent.append(message)
+
+
+TRANSPORTS = {
+    "gmail": GmailTransport,
+    "smtp": SMTPTransport,
+    "fake": FakeTransport,
+}
+
+_transport: Optional[MailTransport] = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> MailTransport:
+    """Return the process-wide transport selected by EMAIL_TRANSPORT"""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            name = os.getenv("EMAIL_TRANSPORT", "gmail").lower()
+            if name not in TRANSPORTS:
+                raise ValueError(f"Unknown EMAIL_TRANSPORT: {name}")
+            _transport = TRANSPORTS[name]()
+        return _transport
+
+
+def set_transport(transport: Optional[MailTransport]) -> None:
+    """Override the process-wide transport (None re-reads EMAIL_TRANSPORT)"""
+    global _transport
+    with _transport_lock:
+        _transport = transport
@@ -0,0 +1,49 @@
+"""
+pytest-benchmark suite for the assignment solver.
+
+    pip install -r benchmarks/requirements.txt
+    pytest benchmarks --benchmark-autosave      # then --benchmark-compare
+"""
+import random
+
+import pytest
+
+from app.services.assignment import SOLVER_MODES
+from .generate import make_group
+from .run import run_sqlite
+
+pytest.importorskip("pytest_benchmark")
+
+GRAPH_CASES = [
+    (size, density, depth)
+    for size in (5, 50, 500, 2000)
+    for density in (1.0, 0.2, 0.02)
+    for depth in (0, 3)
+    if size * density >= 2
+]
+
+
+@pytest.mark.benchmark(group="solver-memory")
+@pytest.mark.parametrize("mode", sorted(SOLVER_MODES))
+@pytest.mark.parametrize("size,density,history_depth", GRAPH_CASES)
+def bench_solver_memory(benchmark, mode, size, density, history_depth):
+    group = make_group(size, density, history_depth, seed=size)
+    adjacency = group.adjacency
+    solve = SOLVER_MODES[mode]
+
+    result = benchmark(lambda: solve(adjacency, random.Random(size)))
+    benchmark.extra_info["nodes"] = result.stats.nodes
+    benchmark.extra_info["backtracks"] = result.stats.backtracks
+
+
+@pytest.mark.benchmark(group="solver-sqlite")
+@pytest.mark.parametrize("mode", sorted(SOLVER_MODES))
+@pytest.mark.parametrize("size,density", [(5, 1.0), (50, 0.2), (500, 0.02)])
+def bench_solver_sqlite(benchmark, mode, size, density):
+    group = make_group(size, density, 2, seed=size)
+
+    row = benchmark.pedantic(
+        run_sqlite, args=(group, mode, size, False), rounds=3, iterations=1
+    )
+    assert row["success"], row["error"]
+    benchmark.extra_info["nodes"] = row["nodes"]
@@ -0,0 +1,96 @@
+"""
+Import-time budget for API workers.
+
+``import app.main`` is run in a fresh interpreter under ``python -X importtime``
+with AUTO_MIGRATE=false (the deployment mode where migrations are a separate
+step). The checks fail when modules that should load lazily show up at import,
+or when the app's own modules or the whole import exceed their budget:
+
+    pytest benchmarks/bench_startup.py
+    IMPORT_TIME_BUDGET_MS=600 pytest benchmarks/bench_startup.py
+"""
+import os
+import re
+import subprocess
+import sys
+from typing import Dict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Whole `import app.main`, FastAPI/SQLAlchemy/pydantic included
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "1000"))
+# Self time of the app.* modules themselves
+APP_IMPORT_BUDGET_MS = float(os.getenv("APP_IMPORT_BUDGET_MS", "250"))
+# Best of this many runs, to keep a cold disk cache from failing the check
+RUNS = 3
+
+# Only needed when sending mail, signing tokens or migrating
+LAZY_MODULES = (
+    "googleapiclient",
+    "google_auth_oauthlib",
+    "google.oauth2",
+    "google_auth_httplib2",
+    "jose",
+    "alembic",
+    "sqlalchemy.ext.asyncio",
+)
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def _import_profile() -> Dict[str, tuple]:
+    """Module -> (self us, cumulative us) for one fresh `import app.main`"""
+    env = dict(
+        os.environ,
+        AUTO_MIGRATE="false",
+        DATABASE_ASYNC="false",
+        DATABASE_URL=os.getenv("DATABASE_URL", "sqlite://"),
+    )
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    profile = {}
+    for line in completed.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            profile[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return profile
+
+
+def _best_profile() -> Dict[str, tuple]:
+    profiles = [_import_profile() for _ in range(RUNS)]
+    return min(profiles, key=lambda profile: profile["app.main"][1])
+
+
+def bench_lazy_modules_not_imported():
+    loaded = [
+        module
+        for module in _import_profile()
+        if any(module == lazy or module.startswith(lazy + ".") for lazy in LAZY_MODULES)
+    ]
+    assert not loaded, f"imported eagerly by app.main: {', '.join(sorted(loaded))}"
+
+
+def bench_import_time_budget():
+    profile = _best_profile()
+    total_ms = profile["app.main"][1] / 1000
+    app_ms = (
+        sum(
+            self_us
+            for module, (self_us, _) in profile.items()
+            if module == "app" or module.startswith("app.")
+        )
+        / 1000
+    )
+    print(f"import app.main: {total_ms:.0f} ms total, {app_ms:.0f} ms in app.*")
+    assert app_ms <= APP_IMPORT_BUDGET_MS, (
+        f"app.* modules take {app_ms:.0f} ms to import "
+        f"(budget {APP_IMPORT_BUDGET_MS:.0f} ms)"
+    )
+    assert total_ms <= IMPORT_TIME_BUDGET_MS, (
+        f"import app.main takes {total_ms:.0f} ms (budget {IMPORT_TIME_BUDGET_MS:.0f} ms)"
+    )
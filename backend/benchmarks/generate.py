@@ -0,0 +1,129 @@
+"""
+Synthetic Secret Santa groups for benchmarking.
+
+``density`` is the fraction of the other participants each giver is allowed to
+be assigned to (1.0 means no restrictions) and ``history_depth`` the number of
+previous years whose pairings are excluded, mirroring ``allowed_receivers`` and
+``past_assignments`` in the real schema.
+"""
+import random
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+from app.services.solver import (
+    InfeasibleError,
+    check_feasibility,
+    find_derangement,
+    iter_bits,
+)
+
+
+@dataclass
+class SyntheticGroup:
+    size: int
+    density: float
+    history_depth: int
+    seed: int
+    # allowed[i] is a bitset of receivers giver i may be assigned to (None = anyone)
+    allowed: List[int] = field(default_factory=list)
+    # (years_ago, successors) for every past year that could be generated
+    history: List[Tuple[int, List[int]]] = field(default_factory=list)
+
+    @property
+    def adjacency(self) -> List[int]:
+        """Options per giver after restrictions and past years"""
+        adjacency = list(self.allowed)
+        for _, successors in self.history:
+            for giver, receiver in enumerate(successors):
+                adjacency[giver] &= ~(1 << receiver)
+        return adjacency
+
+    @property
+    def restricted(self) -> bool:
+        return self.density < 1.0
+
+
+def make_group(size: int, density: float, history_depth: int, seed: int) -> SyntheticGroup:
+    """Generate a group with a random restriction graph and past years"""
+    rng = random.Random(seed)
+    group = SyntheticGroup(size, density, history_depth, seed)
+    everyone = (1 << size) - 1
+    degree = max(1, round(density * (size - 1)))
+
+    for giver in range(size):
+        others = [receiver for receiver in range(size) if receiver != giver]
+        if degree >= len(others):
+            group.allowed.append(everyone & ~(1 << giver))
+            continue
+        mask = 0
+        for receiver in rng.sample(others, degree):
+            mask |= 1 << receiver
+        group.allowed.append(mask)
+
+    # Each past year is a valid assignment of the constraints left at the time,
+    # and is only kept if the benchmarked year can still be assigned after it
+    for years_ago in range(1, history_depth + 1):
+        try:
+            result = find_derangement(group.adjacency, rng)
+        except InfeasibleError:
+            break
+        group.history.append((years_ago, result.successors))
+        try:
+            check_feasibility(group.adjacency)
+        except InfeasibleError:
+            group.history.pop()
+            break
+
+    return group
+
+
+def populate_database(db, group: SyntheticGroup, year: int) -> int:
+    """Write ``group`` into the database behind ``db`` and return its group id"""
+    from app import models
+
+    owner = models.User(
+        email=f"bench-{group.seed}@example.com", hashed_password="not-a-hash"
+    )
+    db.add(owner)
+    db.flush()
+    db_group = models.Group(name=f"bench-{group.size}", owner_id=owner.id)
+    db.add(db_group)
+    db.flush()
+
+    participants = [
+        models.Participant(
+            name=f"Participant {i}",
+            email=f"participant{i}@example.com",
+            group_id=db_group.id,
+        )
+        for i in range(group.size)
+    ]
+    db.add_all(participants)
+    db.flush()
+    ids = [p.id for p in participants]
+
+    if group.restricted:
+        rows = [
+            {"giver_id": ids[giver], "receiver_id": ids[receiver]}
+            for giver, mask in enumerate(group.allowed)
+            for receiver in iter_bits(mask)
+        ]
+        if rows:
+            db.execute(models.participant_restrictions.insert(), rows)
+
+    rows = [
+        {
+            "giver_id": ids[giver],
+            "receiver_id": ids[receiver],
+            "group_id": db_group.id,
+            "year": year - years_ago,
+        }
+        for years_ago, successors in group.history
+        for giver, receiver in enumerate(successors)
+    ]
+    if rows:
+        db.execute(models.assignment_history.insert(), rows)
+
+    db.commit()
+    return db_group.id
+
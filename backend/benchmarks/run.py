@@ -0,0 +1,294 @@
+"""
+Benchmark runner for the assignment solver.
+
+Run from the backend directory:
+
+    python -m benchmarks.run --sizes 5,50,500,2000 --densities 1,0.2,0.05 \
+        --history 0,3 --backends memory,sqlite --output report.json
+
+Every configuration is solved ``--repeat`` times against a pure in-memory graph
+and/or a fresh in-memory SQLite database. The report (JSON, or CSV when the
+output file ends in ``.csv``) records wall time, nodes explored, peak memory
+and success rate, and ``--compare old.json`` prints the change against a
+previous report so runs can be diffed between commits.
+"""
+import argparse
+import csv
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models
+from app.services import assignment
+from app.services.solver import SolverResult
+from .generate import SyntheticGroup, make_group, populate_database
+
+BENCH_YEAR = 2025
+SUMMARY_KEYS = ("backend", "mode", "size", "density", "history_depth")
+
+
+def _measure(
+    setup: Callable[[], Any],
+    run: Callable[[Any], Optional[SolverResult]],
+    trace_memory: bool,
+) -> Dict:
+    """
+    Time ``run(setup())`` and, optionally, replay it under tracemalloc for
+    peak memory. Only ``run`` is measured.
+    """
+    measurement = {"success": False, "error": None, "nodes": None, "backtracks": None}
+    state = setup()
+    started = time.perf_counter()
+    try:
+        result = run(state)
+        measurement["success"] = True
+        if result is not None:
+            measurement["nodes"] = result.stats.nodes
+            measurement["backtracks"] = result.stats.backtracks
+    except ValueError as e:
+        measurement["error"] = str(e)
+    measurement["wall_time"] = time.perf_counter() - started
+
+    measurement["peak_memory"] = None
+    if trace_memory:
+        # A separate run, so tracing overhead does not skew the timing
+        state = setup()
+        tracemalloc.start()
+        try:
+            run(state)
+        except ValueError:
+            pass
+        measurement["peak_memory"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return measurement
+
+
+def run_memory(group: SyntheticGroup, mode: str, seed: int, trace_memory: bool) -> Dict:
+    """Solve the synthetic graph directly, without any database"""
+    solve = assignment.SOLVER_MODES[mode]
+    return _measure(
+        lambda: group.adjacency,
+        lambda adjacency: solve(adjacency, random.Random(seed)),
+        trace_memory,
+    )
+
+
+def run_sqlite(group: SyntheticGroup, mode: str, seed: int, trace_memory: bool) -> Dict:
+    """Run assign_secret_santas end to end against a fresh in-memory SQLite DB"""
+    sessions = []
+
+    def setup() -> Tuple[Session, int]:
+        engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        models.Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        sessions.append(db)
+        # Every fresh database has the same ids, so a seeded run would
+        # otherwise be answered from the solution cache
+        assignment.clear_solution_cache()
+        return db, populate_database(db, group, BENCH_YEAR)
+
+    def run(state: Tuple[Session, int]) -> Optional[SolverResult]:
+        db, group_id = state
+        captured = []
+        assignment.assign_secret_santas(
+            db, group_id, BENCH_YEAR, mode, seed=seed, on_result=captured.append
+        )
+        return captured[-1] if captured else None
+
+    try:
+        return _measure(setup, run, trace_memory)
+    finally:
+        for db in sessions:
+            engine = db.get_bind()
+            db.close()
+            engine.dispose()
+
+
+BACKENDS = {"memory": run_memory, "sqlite": run_sqlite}
+
+
+def run_benchmarks(
+    sizes: List[int],
+    densities: List[float],
+    history_depths: List[int],
+    modes: List[str],
+    backends: List[str],
+    repeat: int,
+    trace_memory: bool = True,
+) -> List[Dict]:
+    measurements = []
+    for size in sizes:
+        for density in densities:
+            for depth in history_depths:
+                for attempt in range(repeat):
+                    seed = hash((size, density, depth, attempt)) & 0xFFFFFFFF
+                    group = make_group(size, density, depth, seed)
+                    for mode in modes:
+                        for backend in backends:
+                            row = BACKENDS[backend](group, mode, seed, trace_memory)
+                            row.update(
+                                backend=backend,
+                                mode=mode,
+                                size=size,
+                                density=density,
+                                history_depth=depth,
+                                generated_history=len(group.history),
+                                repeat=attempt,
+                            )
+                            measurements.append(row)
+                            _progress(row)
+    return measurements
+
+
+def _progress(row: Dict) -> None:
+    status = "ok" if row["success"] else "fail"
+    print(
+        f"{row['backend']:>6} {row['mode']:>11} n={row['size']:<5} "
+        f"density={row['density']:<5} history={row['history_depth']} "
+        f"{status:>4} {row['wall_time'] * 1000:9.1f} ms",
+        file=sys.stderr,
+    )
+
+
+def summarize(measurements: List[Dict]) -> List[Dict]:
+    """Aggregate repeats into one row per configuration"""
+    grouped: Dict[tuple, List[Dict]] = {}
+    for row in measurements:
+        grouped.setdefault(tuple(row[key] for key in SUMMARY_KEYS), []).append(row)
+
+    summary = []
+    for key, rows in grouped.items():
+        nodes = [row["nodes"] for row in rows if row["nodes"] is not None]
+        memory = [row["peak_memory"] for row in rows if row["peak_memory"] is not None]
+        summary.append(
+            {
+                **dict(zip(SUMMARY_KEYS, key)),
+                "runs": len(rows),
+                "success_rate": sum(row["success"] for row in rows) / len(rows),
+                "median_wall_time": statistics.median(row["wall_time"] for row in rows),
+                "max_wall_time": max(row["wall_time"] for row in rows),
+                "median_nodes": statistics.median(nodes) if nodes else None,
+                "max_peak_memory": max(memory) if memory else None,
+            }
+        )
+    return summary
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_report(path: str, measurements: List[Dict]) -> None:
+    if path.endswith(".csv"):
+        fields = sorted({key for row in measurements for key in row})
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(measurements)
+        return
+
+    report = {
+        "commit": _git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "summary": summarize(measurements),
+        "measurements": measurements,
+    }
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def compare(previous_path: str, measurements: List[Dict]) -> None:
+    """Print median time and success rate changes against an older JSON report"""
+    with open(previous_path) as f:
+        previous = {
+            tuple(row[key] for key in SUMMARY_KEYS): row
+            for row in json.load(f)["summary"]
+        }
+    for row in summarize(measurements):
+        key = tuple(row[k] for k in SUMMARY_KEYS)
+        old = previous.get(key)
+        label = " ".join(f"{k}={v}" for k, v in zip(SUMMARY_KEYS, key))
+        if old is None:
+            print(f"{label}: new configuration")
+            continue
+        ratio = (
+            row["median_wall_time"] / old["median_wall_time"]
+            if old["median_wall_time"]
+            else float("inf")
+        )
+        print(
+            f"{label}: {old['median_wall_time'] * 1000:.1f} ms -> "
+            f"{row['median_wall_time'] * 1000:.1f} ms ({ratio:.2f}x), "
+            f"success {old['success_rate']:.0%} -> {row['success_rate']:.0%}"
+        )
+
+
+def _numbers(kind):
+    return lambda value: [kind(part) for part in value.split(",") if part]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=_numbers(int), default=[5, 50, 200, 1000, 2000])
+    parser.add_argument("--densities", type=_numbers(float), default=[1.0, 0.2, 0.02])
+    parser.add_argument("--history", type=_numbers(int), default=[0, 3])
+    parser.add_argument(
+        "--modes", type=lambda v: v.split(","), default=list(assignment.SOLVER_MODES)
+    )
+    parser.add_argument(
+        "--backends", type=lambda v: v.split(","), default=["memory", "sqlite"]
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--no-memory", action="store_true", help="skip the tracemalloc replay"
+    )
+    parser.add_argument("--output", default="benchmark-report.json")
+    parser.add_argument("--compare", help="previous JSON report to diff against")
+    args = parser.parse_args(argv)
+
+    for backend in args.backends:
+        if backend not in BACKENDS:
+            parser.error(f"unknown backend {backend!r}")
+    for mode in args.modes:
+        if mode not in assignment.SOLVER_MODES:
+            parser.error(f"unknown mode {mode!r}")
+
+    measurements = run_benchmarks(
+        args.sizes,
+        args.densities,
+        args.history,
+        args.modes,
+        args.backends,
+        args.repeat,
+        trace_memory=not args.no_memory,
+    )
+    write_report(args.output, measurements)
+    print(f"Wrote {len(measurements)} measurements to {args.output}", file=sys.stderr)
+    if args.compare:
+        compare(args.compare, measurements)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Initial schema, as created by Base.metadata.create_all before migrations
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=True,
+        ),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "groups",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=True,
+        ),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_groups_id", "groups", ["id"])
+
+    op.create_table(
+        "participants",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("group_id", sa.Integer(), sa.ForeignKey("groups.id"), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=True,
+        ),
+    )
+    op.create_index("ix_participants_id", "participants", ["id"])
+
+    op.create_table(
+        "participant_restrictions",
+        sa.Column(
+            "giver_id",
+            sa.Integer(),
+            sa.ForeignKey("participants.id"),
+            primary_key=True,
+        ),
+        sa.Column(
+            "receiver_id",
+            sa.Integer(),
+            sa.ForeignKey("participants.id"),
+            primary_key=True,
+        ),
+    )
+
+    op.create_table(
+        "assignment_history",
+        sa.Column(
+            "giver_id",
+            sa.Integer(),
+            sa.ForeignKey("participants.id"),
+            primary_key=True,
+        ),
+        sa.Column(
+            "receiver_id",
+            sa.Integer(),
+            sa.ForeignKey("participants.id"),
+            primary_key=True,
+        ),
+        sa.Column("group_id", sa.Integer(), sa.ForeignKey("groups.id"), primary_key=True),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=True,
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("assignment_history")
+    op.drop_table("participant_restrictions")
+    op.drop_index("ix_participants_id", table_name="participants")
+    op.drop_table("participants")
+    op.drop_index("ix_groups_id", table_name="groups")
+    op.drop_table("groups")
+    op.drop_index("ix_users_email", table_name="users")
+    op.drop_index("ix_users_id", table_name="users")
+    op.drop_table("users")
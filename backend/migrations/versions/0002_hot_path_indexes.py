@@ -0,0 +1,57 @@
+"""Indexes for the group, participant and history lookups
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def _create_index(name, table, columns, unique=False) -> None:
+    # Databases stamped at 0001 may have been created from the newer models
+    existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+    if name not in existing:
+        op.create_index(name, table, columns, unique=unique)
+
+
+def upgrade() -> None:
+    # The unique index would fail on duplicates; name them instead of a bare
+    # IntegrityError so they can be merged by hand first
+    duplicates = op.get_bind().execute(
+        sa.text(
+            "SELECT group_id, email, COUNT(*) FROM participants "
+            "GROUP BY group_id, email HAVING COUNT(*) > 1"
+        )
+    ).all()
+    if duplicates:
+        listed = ", ".join(f"group {g}: {email} ({n}x)" for g, email, n in duplicates)
+        raise RuntimeError(
+            "Cannot add the unique (group_id, email) index, these participants "
+            f"are duplicated: {listed}"
+        )
+
+    _create_index("ix_groups_owner_id", "groups", ["owner_id"])
+    _create_index(
+        "uq_participants_group_email",
+        "participants",
+        ["group_id", "email"],
+        unique=True,
+    )
+    _create_index(
+        "ix_assignment_history_group_year",
+        "assignment_history",
+        ["group_id", "year", "giver_id", "receiver_id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_assignment_history_group_year", table_name="assignment_history")
+    op.drop_index("uq_participants_group_email", table_name="participants")
+    op.drop_index("ix_groups_owner_id", table_name="groups")
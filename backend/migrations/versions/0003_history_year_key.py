@@ -0,0 +1,68 @@
+"""Key assignment history by year so a pairing can repeat in later years
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+OLD_KEY = ["giver_id", "receiver_id", "group_id"]
+NEW_KEY = ["giver_id", "receiver_id", "group_id", "year"]
+
+
+def _history_table(key) -> sa.Table:
+    """assignment_history as it looks with ``key`` as its primary key"""
+    metadata = sa.MetaData()
+    sa.Table("participants", metadata, sa.Column("id", sa.Integer(), primary_key=True))
+    sa.Table("groups", metadata, sa.Column("id", sa.Integer(), primary_key=True))
+    return sa.Table(
+        "assignment_history",
+        metadata,
+        sa.Column("giver_id", sa.Integer(), sa.ForeignKey("participants.id")),
+        sa.Column("receiver_id", sa.Integer(), sa.ForeignKey("participants.id")),
+        sa.Column("group_id", sa.Integer(), sa.ForeignKey("groups.id")),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at", sa.DateTime(timezone=True), server_default=sa.func.now()
+        ),
+        sa.PrimaryKeyConstraint(*key, name="pk_assignment_history"),
+        sa.Index(
+            "ix_assignment_history_group_year",
+            "group_id",
+            "year",
+            "giver_id",
+            "receiver_id",
+        ),
+    )
+
+
+def _set_primary_key(key) -> None:
+    bind = op.get_bind()
+    current = sa.inspect(bind).get_pk_constraint("assignment_history")
+    if current["constrained_columns"] == key:
+        return
+    if bind.dialect.name == "sqlite":
+        # SQLite cannot alter a primary key, so the table is copied over
+        with op.batch_alter_table(
+            "assignment_history", copy_from=_history_table(key), recreate="always"
+        ):
+            pass
+        return
+    op.drop_constraint(current["name"], "assignment_history", type_="primary")
+    op.create_primary_key("pk_assignment_history", "assignment_history", key)
+
+
+def upgrade() -> None:
+    _set_primary_key(NEW_KEY)
+
+
+def downgrade() -> None:
+    # Fails while a pairing is recorded in more than one year
+    _set_primary_key(OLD_KEY)
@@ -0,0 +1,42 @@
+"""Record the mode and seed of every assignment run
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "assignment_runs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("group_id", sa.Integer(), sa.ForeignKey("groups.id"), nullable=False),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column("mode", sa.String(), nullable=False),
+        sa.Column("seed", sa.Integer(), nullable=False),
+        sa.Column("min_cycle_length", sa.Integer(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=True,
+        ),
+    )
+    op.create_index("ix_assignment_runs_id", "assignment_runs", ["id"])
+    op.create_index(
+        "ix_assignment_runs_group_year", "assignment_runs", ["group_id", "year"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_assignment_runs_group_year", table_name="assignment_runs")
+    op.drop_index("ix_assignment_runs_id", table_name="assignment_runs")
+    op.drop_table("assignment_runs")
@@ -0,0 +1,47 @@
+"""Store email dispatch progress so any worker can answer a poll
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "email_dispatches",
+        sa.Column("id", sa.String(length=32), primary_key=True),
+        sa.Column("group_id", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index(
+        "ix_email_dispatches_group_id", "email_dispatches", ["group_id"]
+    )
+    op.create_table(
+        "email_dispatch_jobs",
+        sa.Column(
+            "dispatch_id",
+            sa.String(length=32),
+            sa.ForeignKey("email_dispatches.id"),
+            primary_key=True,
+        ),
+        sa.Column("position", sa.Integer(), primary_key=True),
+        sa.Column("recipient", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("error", sa.Text(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("email_dispatch_jobs")
+    op.drop_index("ix_email_dispatches_group_id", table_name="email_dispatches")
+    op.drop_table("email_dispatches")
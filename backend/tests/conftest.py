@@ -0,0 +1,121 @@
+"""
+Behavioural tests for the API and the services behind it.
+
+They run the sync app (DATABASE_ASYNC=false) with TestClient against a
+throwaway SQLite database, migrated once per session. Every test signs up
+its own user, so tests never share groups:
+
+    pip install -r tests/requirements.txt
+    pytest tests
+"""
+import os
+import tempfile
+import uuid
+
+_database_dir = tempfile.mkdtemp(prefix="secretsanta-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_database_dir}/test.db"
+os.environ["DATABASE_ASYNC"] = "false"
+os.environ["AUTO_MIGRATE"] = "true"
+os.environ["EMAIL_TRANSPORT"] = "fake"
+os.environ["EMAIL_RETRY_BASE_DELAY"] = "0"
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ.pop("DATABASE_READ_URL", None)
+
+import pytest  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.database import SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+PASSWORD = "correct-horse"
+
+
+@pytest.fixture(scope="session")
+def client():
+    # Entering the client runs the lifespan, which applies the migrations
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def async_client(client):
+    """The async routers (DATABASE_ASYNC=true) on the same database"""
+    from app.async_routers import assignments, auth, groups, participants
+
+    async_app = FastAPI()
+    for module in (auth, groups, participants, assignments):
+        async_app.include_router(module.router)
+    with TestClient(async_app) as async_client:
+        yield async_client
+
+
+def signup(client, password: str = PASSWORD) -> dict:
+    """Register a fresh user and return their Authorization header"""
+    email = f"user-{uuid.uuid4().hex[:12]}@example.com"
+    response = client.post(
+        "/api/auth/register", json={"email": email, "password": password}
+    )
+    assert response.status_code == 201, response.text
+    response = client.post(
+        "/api/auth/login", data={"username": email, "password": password}
+    )
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def headers(client):
+    return signup(client)
+
+
+@pytest.fixture
+def make_group(client, headers):
+    """
+    Create a group with ``size`` participants P0, P1, ... (p0@example.com,
+    ...) and return ``(group_id, participants)``, ordered by id.
+    """
+
+    def make(size: int = 5, name: str = "Family"):
+        group = client.post("/api/groups", json={"name": name}, headers=headers)
+        assert group.status_code == 201, group.text
+        group_id = group.json()["id"]
+        participants = client.post(
+            f"/api/groups/{group_id}/participants/bulk",
+            json={
+                "participants": [
+                    {"name": f"P{i}", "email": f"p{i}@example.com"}
+                    for i in range(size)
+                ]
+            },
+            headers=headers,
+        )
+        assert participants.status_code == 201, participants.text
+        return group_id, sorted(participants.json(), key=lambda p: p["id"])
+
+    return make
+
+
+@pytest.fixture
+def db(client):
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def statements(client):
+    """SQL statements run on the app's engine while the test runs"""
+    issued = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        issued.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield issued
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
@@ -0,0 +1,38 @@
+def assign(client, headers, group_id, **settings):
+    response = client.post(
+        f"/api/groups/{group_id}/assignments",
+        json={"group_id": group_id, "year": 2024, **settings},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_records_carry_names_and_emails(client, headers, make_group):
+    group_id, participants = make_group(6)
+    by_id = {p["id"]: p for p in participants}
+    result = assign(client, headers, group_id, mode="derangement")
+    assert result["success"]
+    for record in result["assignments"]:
+        giver, receiver = by_id[record["giver_id"]], by_id[record["receiver_id"]]
+        assert (record["giver_name"], record["giver_email"]) == (
+            giver["name"],
+            giver["email"],
+        )
+        assert (record["receiver_name"], record["receiver_email"]) == (
+            receiver["name"],
+            receiver["email"],
+        )
+
+
+def test_query_count_does_not_grow_with_the_group(
+    client, headers, make_group, statements
+):
+    counts = []
+    for size in (4, 40):
+        group_id, _ = make_group(size)
+        client.get(f"/api/groups/{group_id}", headers=headers)
+        statements.clear()
+        assign(client, headers, group_id, mode="cycle", seed=5)
+        counts.append(len(statements))
+    assert counts[0] == counts[1]
@@ -0,0 +1,56 @@
+"""The async routers (DATABASE_ASYNC=true) against the same database"""
+from .conftest import signup
+
+
+def test_assignment_flow(async_client):
+    headers = signup(async_client)
+    group = async_client.post("/api/groups", json={"name": "Async"}, headers=headers)
+    assert group.status_code == 201, group.text
+    group_id = group.json()["id"]
+    base = f"/api/groups/{group_id}"
+
+    created = async_client.post(
+        f"{base}/participants/bulk",
+        json={
+            "participants": [
+                {"name": f"A{i}", "email": f"a{i}@example.com"} for i in range(5)
+            ]
+        },
+        headers=headers,
+    )
+    assert created.status_code == 201, created.text
+    ids = sorted(p["id"] for p in created.json())
+
+    restricted = async_client.put(
+        f"{base}/participants/{ids[0]}/restrictions",
+        json={"giver_id": ids[0], "allowed_receiver_ids": [ids[1]]},
+        headers=headers,
+    )
+    assert restricted.status_code == 200, restricted.text
+
+    assigned = async_client.post(
+        f"{base}/assignments",
+        json={"group_id": group_id, "year": 2024, "mode": "cycle", "seed": 3},
+        headers=headers,
+    )
+    assert assigned.status_code == 200, assigned.text
+    pairs = {a["giver_id"]: a["receiver_id"] for a in assigned.json()["assignments"]}
+    assert pairs[ids[0]] == ids[1]
+    assert sorted(pairs.values()) == ids
+
+    history = async_client.get(f"{base}/assignments/history", headers=headers)
+    assert history.status_code == 200
+    assert {(row["giver_id"], row["receiver_id"]) for row in history.json()} == set(
+        pairs.items()
+    )
+
+
+def test_sync_and_async_routers_share_the_data(client, async_client, headers):
+    group = client.post("/api/groups", json={"name": "Shared"}, headers=headers)
+    group_id = group.json()["id"]
+    response = async_client.get(f"/api/groups/{group_id}", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["name"] == "Shared"
+
+    other = signup(async_client)
+    assert async_client.get(f"/api/groups/{group_id}", headers=other).status_code == 404
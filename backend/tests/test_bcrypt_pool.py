@@ -0,0 +1,73 @@
+import inspect
+import threading
+import uuid
+
+import bcrypt
+
+from app import auth, models
+from app.routers import auth as auth_routes
+
+from .conftest import PASSWORD, signup
+
+
+def new_email():
+    return f"user-{uuid.uuid4().hex[:12]}@example.com"
+
+
+def test_auth_routes_are_sync():
+    # FastAPI runs sync routes on its thread pool, so their queries never
+    # block the event loop
+    for route in (auth_routes.register, auth_routes.login, auth_routes.reset_password):
+        assert not inspect.iscoroutinefunction(route)
+
+
+def test_hashing_runs_on_the_bcrypt_pool(client, monkeypatch):
+    threads = []
+    hash_password = auth.get_password_hash
+
+    def recording(password):
+        threads.append(threading.current_thread().name)
+        return hash_password(password)
+
+    monkeypatch.setattr(auth, "get_password_hash", recording)
+    signup(client)
+    assert threads and all(name.startswith("bcrypt") for name in threads)
+
+
+def test_full_pool_rejects_with_429(client, monkeypatch):
+    slots = threading.BoundedSemaphore(1)
+    slots.acquire()
+    monkeypatch.setattr(auth, "_bcrypt_slots", slots)
+    response = client.post(
+        "/api/auth/register", json={"email": new_email(), "password": PASSWORD}
+    )
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_login_rehashes_at_the_configured_cost(client, db):
+    email = new_email()
+    old_hash = bcrypt.hashpw(
+        PASSWORD.encode(), bcrypt.gensalt(rounds=auth.BCRYPT_ROUNDS + 1)
+    ).decode()
+    db.add(models.User(email=email, hashed_password=old_hash))
+    db.commit()
+    assert auth.needs_rehash(old_hash)
+
+    response = client.post(
+        "/api/auth/login", data={"username": email, "password": PASSWORD}
+    )
+    assert response.status_code == 200, response.text
+    db.expire_all()
+    stored = db.query(models.User).filter(models.User.email == email).one()
+    assert stored.hashed_password != old_hash
+    assert not auth.needs_rehash(stored.hashed_password)
+    assert auth.verify_password(PASSWORD, stored.hashed_password)
+
+
+def test_wrong_password_is_rejected(client, headers):
+    email = client.get("/api/auth/me", headers=headers).json()["email"]
+    response = client.post(
+        "/api/auth/login", data={"username": email, "password": "wrong-password"}
+    )
+    assert response.status_code == 401
@@ -0,0 +1,100 @@
+import base64
+import random
+
+import pytest
+
+from app.services.restrictions import (
+    _BITSET,
+    _RUNS,
+    decode_restriction_graph,
+    decode_row,
+    encode_restriction_graph,
+    encode_row,
+)
+
+
+def b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_rows_round_trip(seed):
+    rng = random.Random(seed)
+    size = rng.choice([1, 7, 8, 9, 64, 200])
+    density = rng.choice([0.0, 0.02, 0.5, 0.98, 1.0])
+    positions = [p for p in range(size) if rng.random() < density]
+    assert decode_row(encode_row(positions, size), size) == positions
+
+
+def test_the_shorter_encoding_wins():
+    size = 1000
+    contiguous = encode_row(list(range(100, 900)), size)
+    scattered = encode_row(list(range(0, size, 2)), size)
+    assert base64.b64decode(contiguous)[0] == _RUNS
+    assert base64.b64decode(scattered)[0] == _BITSET
+    assert len(contiguous) < len(scattered)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "",
+        b64(bytes([_RUNS, 0x80])),  # varint never ends
+        b64(bytes([_RUNS, 1])),  # gap without a length
+        b64(bytes([_RUNS, 0, 9])),  # run past the end
+        b64(bytes([_BITSET, 0, 2])),  # bit 9 of 8
+        b64(bytes([99, 0])),
+        "not base64!",
+    ],
+)
+def test_malformed_rows_are_rejected(text):
+    with pytest.raises(ValueError):
+        decode_row(text, 8)
+
+
+def test_graph_round_trip_and_guards():
+    ids = [10, 20, 30, 40]
+    matrix = {10: [20, 30], 40: [10]}
+    graph = encode_restriction_graph(ids, matrix)
+    assert graph["rows"][1] is None and graph["rows"][2] is None
+    assert decode_restriction_graph(graph["participant_ids"], graph["rows"]) == matrix
+
+    with pytest.raises(ValueError):
+        decode_restriction_graph(ids, graph["rows"][:3])
+    with pytest.raises(ValueError):
+        decode_restriction_graph([10, 10, 30, 40], graph["rows"])
+
+
+def test_compact_endpoints(client, headers, make_group):
+    group_id, participants = make_group(4)
+    p0, p1, p2, p3 = ids = [p["id"] for p in participants]
+    base = f"/api/groups/{group_id}/participants"
+    client.put(
+        f"{base}/restrictions",
+        json={"restrictions": {str(p0): [p1, p2]}},
+        headers=headers,
+    )
+
+    roster = client.get(f"{base}/compact", headers=headers).json()
+    assert [p["id"] for p in roster["participants"]] == ids
+    graph = roster["restrictions"]
+    assert decode_restriction_graph(graph["participant_ids"], graph["rows"]) == {
+        p0: [p1, p2]
+    }
+
+    replaced = client.put(
+        f"{base}/restrictions/compact",
+        json={"participant_ids": ids, "rows": [None, None, None, encode_row([0], 4)]},
+        headers=headers,
+    )
+    assert replaced.status_code == 200, replaced.text
+    matrix = client.get(f"{base}/restrictions", headers=headers).json()
+    assert matrix["restrictions"] == {str(p3): [p0]}
+
+    bad = client.put(
+        f"{base}/restrictions/compact",
+        json={"participant_ids": ids, "rows": ["!!", None, None, None]},
+        headers=headers,
+    )
+    assert bad.status_code == 400
+    assert client.get(f"{base}/restrictions", headers=headers).json() == matrix
@@ -0,0 +1,44 @@
+
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool
+
+from app import database
+
+
+def test_memory_sqlite_gets_no_pool_sizing():
+    for url in ("sqlite://", "sqlite:///:memory:"):
+        assert database.is_memory_sqlite(url)
+        assert "pool_size" not in database.pool_options(url)
+    assert not database.is_memory_sqlite("sqlite:///santa.db")
+
+
+def test_file_and_server_databases_are_pooled():
+    for url in ("sqlite:///santa.db", "postgresql://santa@localhost/santa"):
+        options = database.pool_options(url)
+        assert options["pool_size"] == database.DB_POOL_SIZE
+        assert options["max_overflow"] == database.DB_MAX_OVERFLOW
+        assert options["pool_recycle"] == database.DB_POOL_RECYCLE
+
+
+def test_file_sqlite_uses_wal(tmp_path):
+    engine = database.create_db_engine(f"sqlite:///{tmp_path}/wal.db")
+    try:
+        assert isinstance(engine.pool, QueuePool)
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA foreign_keys")).scalar() == 1
+    finally:
+        engine.dispose()
+
+
+def test_read_sessions_fall_back_to_the_primary():
+    assert database.read_engine is None
+    assert database.ReadSessionLocal is database.SessionLocal
+    assert set(database.pool_status()) == {"primary"}
+
+
+def test_health_reports_the_pools(client):
+    response = client.get("/health")
+    assert response.status_code == 200
+    pools = response.json()["database_pools"]
+    assert any(stats["class"] == "QueuePool" for stats in pools.values())
@@ -0,0 +1,141 @@
+import time
+from datetime import timedelta
+
+import pytest
+
+from app import models
+from app.services import dispatch as dispatch_service
+from app.services.dispatch import get_dispatch_status, start_dispatch
+from app.services.transport import (
+    FakeTransport,
+    MailTransport,
+    OutgoingEmail,
+    set_transport,
+)
+
+
+def wait_for(dispatch, timeout=5.0):
+    """Wait until the dispatch is done and its last progress write has landed"""
+    deadline = time.monotonic() + timeout
+    while not dispatch.done or not stored_as_finished(dispatch.id):
+        assert time.monotonic() < deadline, "dispatch did not finish"
+        time.sleep(0.01)
+    return dispatch.summary()
+
+
+def stored_as_finished(dispatch_id):
+    stored = get_dispatch_status(dispatch_id)
+    return stored["status"] != "running" and stored["finished_at"] is not None
+
+
+def poll(client, headers, group_id, dispatch_id, timeout=5.0):
+    """Poll the status endpoint, as a client on any worker would"""
+    url = f"/api/groups/{group_id}/assignments/dispatches/{dispatch_id}"
+    deadline = time.monotonic() + timeout
+    while True:
+        response = client.get(url, headers=headers)
+        if response.status_code != 200 or response.json()["finished_at"]:
+            return response
+        assert time.monotonic() < deadline, "dispatch did not finish"
+        time.sleep(0.01)
+
+
+def messages(*recipients):
+    return [OutgoingEmail(to=to, subject="Hi", body="Hello") for to in recipients]
+
+
+@pytest.fixture
+def transport(client):
+    # client: the app's startup migrates the dispatch tables
+    transport = FakeTransport()
+    set_transport(transport)
+    yield transport
+    set_transport(None)
+
+
+def test_failed_sends_are_retried(transport):
+    transport.failures = {"b@example.com": 2}
+    summary = wait_for(start_dispatch(messages("a@example.com", "b@example.com")))
+    assert summary["status"] == "completed"
+    assert summary["sent"] == 2
+    attempts = {job["recipient"]: job["attempts"] for job in summary["jobs"]}
+    assert attempts == {"a@example.com": 1, "b@example.com": 3}
+    assert sorted(m.to for m in transport.sent) == ["a@example.com", "b@example.com"]
+
+
+def test_jobs_fail_after_the_last_attempt(transport):
+    transport.failures = {"b@example.com": 100}
+    summary = wait_for(start_dispatch(messages("a@example.com", "b@example.com")))
+    assert summary["status"] == "partial"
+    failed = [job for job in summary["jobs"] if job["status"] == "failed"]
+    assert [job["recipient"] for job in failed] == ["b@example.com"]
+    assert failed[0]["attempts"] == dispatch_service.EMAIL_MAX_ATTEMPTS
+    assert "Simulated failure" in failed[0]["error"]
+
+
+def test_empty_dispatch_is_finished_right_away(transport):
+    dispatch = start_dispatch([])
+    assert dispatch.done
+    assert dispatch.summary()["status"] == "completed"
+
+
+def test_transports_must_implement_send():
+    class Incomplete(MailTransport):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_assign_with_emails_returns_a_dispatch_to_poll(
+    client, headers, make_group, transport
+):
+    group_id, participants = make_group(5)
+    response = client.post(
+        f"/api/groups/{group_id}/assignments",
+        params={"send_emails": True},
+        json={"group_id": group_id, "year": 2024, "mode": "derangement"},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    dispatch_id = response.json()["dispatch_id"]
+    assert dispatch_id
+
+    status = poll(client, headers, group_id, dispatch_id)
+    assert status.status_code == 200
+    assert status.json()["sent"] == 5
+    assert sorted(m.to for m in transport.sent) == sorted(
+        p["email"] for p in participants
+    )
+
+    other_group, _ = make_group(2)
+    elsewhere = client.get(
+        f"/api/groups/{other_group}/assignments/dispatches/{dispatch_id}",
+        headers=headers,
+    )
+    assert elsewhere.status_code == 404
+
+
+def test_status_is_read_back_from_the_database(transport):
+    transport.failures = {"b@example.com": 100}
+    dispatch = start_dispatch(messages("a@example.com", "b@example.com"), group_id=7)
+    summary = wait_for(dispatch)
+    stored = get_dispatch_status(dispatch.id)
+    assert stored.pop("group_id") == 7
+    for key in ("id", "status", "total", "sent", "failed", "pending", "jobs"):
+        assert stored[key] == summary[key]
+    assert get_dispatch_status("0" * 32) is None
+
+
+def test_expired_dispatches_are_dropped(transport, db):
+    old = start_dispatch([])
+    db.query(models.EmailDispatch).filter_by(id=old.id).update(
+        {
+            "finished_at": old.created_at
+            - timedelta(days=dispatch_service.DISPATCH_RETENTION_DAYS + 1)
+        }
+    )
+    db.commit()
+    new = start_dispatch([])
+    assert get_dispatch_status(old.id) is None
+    assert get_dispatch_status(new.id)["status"] == "completed"
@@ -0,0 +1,73 @@
+import pytest
+
+from app.services.response_cache import response_cache_stats
+
+
+def get(client, headers, url, etag=None):
+    if etag is not None:
+        headers = {**headers, "If-None-Match": etag}
+    return client.get(url, headers=headers)
+
+
+@pytest.fixture
+def group(client, headers, make_group):
+    group_id, participants = make_group(3)
+    return group_id, participants
+
+
+@pytest.mark.parametrize("path", ["", "/participants"])
+def test_matching_etag_gets_304(client, headers, group, path):
+    url = f"/api/groups/{group[0]}{path}"
+    first = get(client, headers, url)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    again = get(client, headers, url, etag)
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+    assert again.content == b""
+    assert get(client, headers, url, f'W/{etag}, "other"').status_code == 304
+    assert get(client, headers, url, '"other"').status_code == 200
+
+
+def test_writes_invalidate_the_etag(client, headers, group):
+    group_id, participants = group
+    url = f"/api/groups/{group_id}/participants"
+    etag = get(client, headers, url).headers["ETag"]
+
+    client.post(url, json={"name": "New", "email": "new@example.com"}, headers=headers)
+    after_add = get(client, headers, url, etag)
+    assert after_add.status_code == 200
+    assert "New" in {p["name"] for p in after_add.json()}
+    etag = after_add.headers["ETag"]
+
+    client.patch(
+        f"{url}/{participants[0]['id']}/restrictions",
+        json={"add": [participants[1]["id"]]},
+        headers=headers,
+    )
+    after_edit = get(client, headers, url, etag)
+    assert after_edit.status_code == 200
+    restricted = next(p for p in after_edit.json() if p["id"] == participants[0]["id"])
+    assert restricted["allowed_receivers"] == ["P1"]
+
+
+def test_group_etag_follows_renames(client, headers, group):
+    url = f"/api/groups/{group[0]}"
+    etag = get(client, headers, url).headers["ETag"]
+    client.put(url, json={"name": "Renamed"}, headers=headers)
+    response = get(client, headers, url, etag)
+    assert response.status_code == 200
+    assert response.json()["name"] == "Renamed"
+
+    listing = get(client, headers, "/api/groups").headers["ETag"]
+    assert get(client, headers, "/api/groups", listing).status_code == 304
+
+
+def test_unchanged_group_is_served_from_the_cache(client, headers, group):
+    url = f"/api/groups/{group[0]}/participants"
+    get(client, headers, url)
+    hits = response_cache_stats()["hits"]
+    assert get(client, headers, url).status_code == 200
+    assert response_cache_stats()["hits"] == hits + 1
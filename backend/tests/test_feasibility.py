@@ -0,0 +1,110 @@
+from collections import namedtuple
+
+import pytest
+
+from app.services.feasibility import analyze_feasibility
+from app.services.graph import ParticipantGraph
+from app.services.history import save_assignment_history
+
+from .test_ownership import raw
+from .test_solver import random_graphs, valid_assignments
+
+Row = namedtuple("Row", "id name email")
+
+
+def graph_of(adjacency):
+    n = len(adjacency)
+    return ParticipantGraph(
+        group_id=1,
+        participants=[Row(i + 1, f"P{i}", f"p{i}@example.com") for i in range(n)],
+        index={i + 1: i for i in range(n)},
+        allowed=list(adjacency),
+    )
+
+
+@pytest.mark.parametrize("adjacency", list(random_graphs(60, density=0.4, seed=3)))
+def test_report_agrees_with_brute_force(adjacency):
+    report = analyze_feasibility(graph_of(adjacency), 2024)
+    feasible = bool(valid_assignments(adjacency))
+    assert report["derangement_feasible"] == feasible
+    assert bool(report["hall_violations"]) == (not feasible)
+
+    # Lifting the blocking constraints is enough for both modes
+    relaxed = list(adjacency)
+    for pair in report["blocking_constraints"]:
+        relaxed[pair["giver_id"] - 1] |= 1 << (pair["receiver_id"] - 1)
+        assert pair["restricted"]
+    relaxed_report = analyze_feasibility(graph_of(relaxed), 2024)
+    assert relaxed_report["derangement_feasible"]
+    assert relaxed_report["strongly_connected"]
+
+
+def test_endpoint_explains_and_tracks_changes(client, headers, make_group, db):
+    group_id, participants = make_group(4)
+    p0, p1, p2, p3 = [p["id"] for p in participants]
+    base = f"/api/groups/{group_id}"
+    for giver in (p0, p1):
+        client.put(
+            f"{base}/participants/{giver}/restrictions",
+            json={"giver_id": giver, "allowed_receiver_ids": [p2]},
+            headers=headers,
+        )
+
+    url = f"{base}/assignments/feasibility"
+    report = client.get(url, params={"year": 2024}, headers=headers).json()
+    assert not report["derangement_feasible"]
+    violation = report["hall_violations"][0]
+    assert violation["side"] == "givers"
+    assert {g["id"] for g in violation["givers"]} == {p0, p1}
+    assert [r["id"] for r in violation["receivers"]] == [p2]
+    assert all(pair["restricted"] for pair in report["blocking_constraints"])
+
+    client.patch(
+        f"{base}/participants/{p0}/restrictions",
+        json={"add": [p3]},
+        headers=headers,
+    )
+    report = client.get(url, params={"year": 2024}, headers=headers).json()
+    assert report["derangement_feasible"]
+
+
+
+def test_blocking_history_is_reported_with_its_year(client, headers, make_group, db):
+    group_id, participants = make_group(2)
+    p0, p1 = [p["id"] for p in participants]
+    url = f"/api/groups/{group_id}/assignments/feasibility"
+    assert client.get(url, params={"year": 2024}, headers=headers).json()[
+        "derangement_feasible"
+    ]
+
+    save_assignment_history(db, group_id, 2023, [(p0, p1)])
+    db.commit()
+    report = client.get(url, params={"year": 2024}, headers=headers).json()
+    assert not report["derangement_feasible"]
+    [pair] = report["blocking_constraints"]
+    assert (pair["giver_id"], pair["receiver_id"]) == (p0, p1)
+    assert pair["history_years"] == [2023]
+    assert not pair["restricted"]
+
+
+def test_changes_from_another_worker_are_picked_up(client, headers, make_group):
+    group_id, participants = make_group(3)
+    p0, p1, p2 = [p["id"] for p in participants]
+    url = f"/api/groups/{group_id}/assignments/feasibility"
+    assert client.get(url, params={"year": 2024}, headers=headers).json()[
+        "derangement_feasible"
+    ]
+
+    # Everyone else gave to p0 last year, committed without group events in
+    # this process; only the version bump tells the cache
+    for giver in (p1, p2):
+        raw(
+            "INSERT INTO assignment_history (giver_id, receiver_id, group_id, year)"
+            " VALUES (:giver, :p0, :group_id, 2023)",
+            giver=giver,
+            p0=p0,
+            group_id=group_id,
+        )
+    raw("UPDATE groups SET version = version + 1 WHERE id = :id", id=group_id)
+    report = client.get(url, params={"year": 2024}, headers=headers).json()
+    assert not report["derangement_feasible"]
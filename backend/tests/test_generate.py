@@ -0,0 +1,44 @@
+import pytest
+
+from app.services import assignment
+from app.services.solver import check_feasibility
+from benchmarks.generate import make_group
+from benchmarks.run import run_sqlite
+
+
+def test_same_seed_generates_the_same_group():
+    first = make_group(40, 0.3, 3, seed=7)
+    second = make_group(40, 0.3, 3, seed=7)
+    assert first.allowed == second.allowed
+    assert first.history == second.history
+    assert make_group(40, 0.3, 3, seed=8).allowed != first.allowed
+
+
+@pytest.mark.parametrize("density", [0.1, 0.5, 1.0])
+def test_restrictions_follow_the_density(density):
+    group = make_group(30, density, 0, seed=3)
+    degree = max(1, round(density * 29))
+    for giver, mask in enumerate(group.allowed):
+        assert not mask >> giver & 1
+        assert bin(mask).count("1") == degree
+    assert group.restricted == (density < 1.0)
+
+
+def test_history_is_valid_and_leaves_the_year_solvable():
+    group = make_group(25, 0.5, 4, seed=11)
+    assert group.history
+    for years_ago, successors in group.history:
+        assert sorted(successors) == list(range(25))
+        for giver, receiver in enumerate(successors):
+            assert group.allowed[giver] >> receiver & 1
+            assert not group.adjacency[giver] >> receiver & 1
+    check_feasibility(group.adjacency)
+
+
+def test_sqlite_runs_report_solver_stats_without_patching_the_modes():
+    modes = dict(assignment.SOLVER_MODES)
+    group = make_group(20, 0.5, 0, seed=3)
+    measurement = run_sqlite(group, "min_cycle", 5, trace_memory=False)
+    assert measurement["success"], measurement["error"]
+    assert measurement["nodes"] > 0
+    assert assignment.SOLVER_MODES == modes
@@ -0,0 +1,102 @@
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+from google.oauth2.credentials import Credentials
+
+from app.services import gmail
+from app.services.dispatch import start_dispatch
+from app.services.email import create_message
+from app.services.transport import GmailTransport, OutgoingEmail
+
+from .test_dispatch import wait_for
+
+
+class FakeGmail(BaseHTTPRequestHandler):
+    """Answers Gmail batch requests, failing messages addressed to fail@"""
+
+    batches = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"])).decode()
+        parts = re.split(r"--=+\d+==", body)[1:-1]
+        type(self).batches.append(self.path)
+        boundary = "batch_response"
+        chunks = []
+        for part in parts:
+            content_id = re.search(r"Content-ID: <(.+?)>", part).group(1)
+            failed = "ZmFpbE" in part  # base64 of "fail@"
+            status = "400 Bad Request" if failed else "200 OK"
+            chunks.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n\r\n"
+                '{"id": "sent"}\r\n'
+            )
+        payload = ("".join(chunks) + f"--{boundary}--\r\n").encode()
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/mixed; boundary={boundary}")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def gmail_client(monkeypatch):
+    server = HTTPServer(("127.0.0.1", 0), FakeGmail)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    FakeGmail.batches = []
+    monkeypatch.setattr(gmail, "GMAIL_BATCH_SIZE", 3)
+    yield gmail.GmailClient(
+        credentials=Credentials(token="token"),
+        api_endpoint=f"http://127.0.0.1:{server.server_port}",
+    )
+    server.shutdown()
+
+
+def raw(to):
+    return create_message("me", to, "Hi", "Hello")
+
+
+def test_batches_hold_up_to_the_batch_size(gmail_client):
+    recipients = [f"user{i}@example.com" for i in range(7)]
+    errors = gmail_client.send_batch([raw(to) for to in recipients])
+    assert errors == [None] * 7
+    assert FakeGmail.batches == ["/batch/gmail/v1"] * 3
+
+
+def test_batch_reports_errors_per_message(gmail_client):
+    errors = gmail_client.send_batch(
+        [raw("a@example.com"), raw("fail@example.com"), raw("b@example.com")]
+    )
+    assert errors[0] is None and errors[2] is None
+    assert errors[1] is not None
+
+
+def test_service_is_built_once(gmail_client):
+    assert gmail_client.service is gmail_client.service
+
+
+def test_dispatch_sends_one_batch_per_chunk(client):
+    class Client:
+        def __init__(self):
+            self.batches = []
+
+        def send_batch(self, messages):
+            self.batches.append(len(messages))
+            return [None] * len(messages)
+
+    client = Client()
+    transport = GmailTransport(client=client)
+    messages = [
+        OutgoingEmail(to=f"user{i}@example.com", subject="Hi", body="Hello")
+        for i in range(transport.batch_size + 5)
+    ]
+    summary = wait_for(start_dispatch(messages, transport=transport))
+    assert summary["sent"] == len(messages)
+    assert sorted(client.batches) == [5, transport.batch_size]
@@ -0,0 +1,50 @@
+import random
+
+from app import models
+from app.services.graph import load_participant_graph
+from benchmarks.generate import make_group, populate_database
+
+YEAR = 2030
+
+
+def populate(db, size, density, history_depth):
+    group = make_group(size, density, history_depth, seed=random.getrandbits(40))
+    return group, populate_database(db, group, YEAR)
+
+
+def test_loader_reads_the_generated_graph(db):
+    group, group_id = populate(db, 30, 0.3, 3)
+    graph = load_participant_graph(db, group_id)
+    assert len(graph) == 30
+    assert graph.allowed == group.allowed
+    assert graph.adjacency(YEAR) == group.adjacency
+
+
+def test_loader_runs_one_query_per_table(db, statements):
+    _, group_id = populate(db, 60, 0.2, 2)
+    statements.clear()
+    load_participant_graph(db, group_id)
+    assert len(statements) == 3
+
+
+def test_unrestricted_participants_can_give_to_anyone(db):
+    _, group_id = populate(db, 6, 1.0, 0)
+    graph = load_participant_graph(db, group_id)
+    assert graph.allowed == [None] * 6
+    assert graph.adjacency() == [0b111111 & ~(1 << i) for i in range(6)]
+
+
+def test_history_of_departed_participants_is_ignored(db):
+    group, group_id = populate(db, 8, 1.0, 1)
+    graph = load_participant_graph(db, group_id)
+    assert len(graph.history) == 8
+
+    leaving = db.get(models.Participant, graph.participants[0].id)
+    db.delete(leaving)
+    db.commit()
+    graph = load_participant_graph(db, group_id)
+    assert len(graph) == 7
+    assert all(
+        giver < 7 and receiver < 7 for giver, receiver, _ in graph.history
+    )
+    assert len(graph.history) <= 6
@@ -0,0 +1,148 @@
+from sqlalchemy import select
+
+from app import models
+from app.services import history
+
+
+def year_rows(db, group_id, year):
+    table = models.assignment_history
+    return sorted(
+        db.execute(
+            select(table.c.giver_id, table.c.receiver_id).where(
+                table.c.group_id == group_id, table.c.year == year
+            )
+        ).all()
+    )
+
+
+def ring(ids, shift=1):
+    return [(giver, ids[(i + shift) % len(ids)]) for i, giver in enumerate(ids)]
+
+
+def test_saving_the_same_year_twice_keeps_one_row_per_pair(db, make_group):
+    group_id, participants = make_group(5)
+    ids = [p["id"] for p in participants]
+    history.save_assignment_history(db, group_id, 2024, ring(ids))
+    db.commit()
+    history.save_assignment_history(db, group_id, 2024, ring(ids))
+    db.commit()
+    assert year_rows(db, group_id, 2024) == sorted(ring(ids))
+
+
+def test_replace_drops_the_year_before_inserting(db, make_group):
+    group_id, participants = make_group(5)
+    ids = [p["id"] for p in participants]
+    history.save_assignment_history(db, group_id, 2024, ring(ids))
+    history.save_assignment_history(db, group_id, 2023, ring(ids, 2))
+    db.commit()
+
+    history.save_assignment_history(db, group_id, 2024, ring(ids, 3), replace=True)
+    db.commit()
+    assert year_rows(db, group_id, 2024) == sorted(ring(ids, 3))
+    assert year_rows(db, group_id, 2023) == sorted(ring(ids, 2))
+
+
+def test_history_is_written_in_one_statement(db, make_group, statements):
+    group_id, participants = make_group(40)
+    ids = [p["id"] for p in participants]
+    statements.clear()
+    history.save_assignment_history(db, group_id, 2024, ring(ids))
+    db.flush()
+    writes = [s for s in statements if s.lstrip().upper().startswith("INSERT")]
+    assert len(writes) == 1
+    assert not any(s.lstrip().upper().startswith("SELECT") for s in statements)
+    db.rollback()
+
+
+def test_update_only_touches_the_given_givers(db, make_group):
+    group_id, participants = make_group(4)
+    a, b, c, d = [p["id"] for p in participants]
+    history.save_assignment_history(
+        db, group_id, 2024, [(a, b), (b, c), (c, d), (d, a)]
+    )
+    db.commit()
+    history.update_assignment_history(db, group_id, 2024, [(a, c), (b, a)])
+    db.commit()
+    assert year_rows(db, group_id, 2024) == sorted(
+        [(a, c), (b, a), (c, d), (d, a)]
+    )
+
+
+def test_replace_year_overwrites_the_assigned_year(client, headers, make_group, db):
+    group_id, participants = make_group(6)
+    ids = {p["email"]: p["id"] for p in participants}
+    body = {"group_id": group_id, "year": 2024, "mode": "derangement"}
+    url = f"/api/groups/{group_id}/assignments"
+    assert client.post(url, json=body, headers=headers).status_code == 200
+    first = year_rows(db, group_id, 2024)
+
+    replaced = client.post(url, json={**body, "replace_year": True}, headers=headers)
+    assert replaced.status_code == 200, replaced.text
+    pairs = sorted(
+        (ids[a["giver_email"]], ids[a["receiver_email"]])
+        for a in replaced.json()["assignments"]
+    )
+    assert year_rows(db, group_id, 2024) == pairs
+    assert len(first) == len(pairs) == 6
+
+
+def seed_years(db, group_id, ids, years):
+    for offset, year in enumerate(years):
+        history.save_assignment_history(db, group_id, year, ring(ids, offset + 1))
+    db.commit()
+
+
+def test_history_pages_follow_the_cursor(client, headers, make_group, db):
+    group_id, participants = make_group(5)
+    ids = [p["id"] for p in participants]
+    seed_years(db, group_id, ids, [2021, 2022, 2023])
+    url = f"/api/groups/{group_id}/assignments/history"
+
+    everything = client.get(url, headers=headers).json()
+    assert len(everything) == 15
+    names = {p["id"]: p["name"] for p in participants}
+    for row in everything:
+        assert row["giver_name"] == names[row["giver_id"]]
+        assert row["receiver_name"] == names[row["receiver_id"]]
+
+    pages, cursor = [], None
+    while True:
+        params = {"limit": 4, **({"cursor": cursor} if cursor else {})}
+        response = client.get(url, params=params, headers=headers)
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert [len(page) for page in pages] == [4, 4, 4, 3]
+    assert [row for page in pages for row in page] == everything
+
+
+def test_history_filters_by_year_range(client, headers, make_group, db):
+    group_id, participants = make_group(4)
+    seed_years(db, group_id, [p["id"] for p in participants], [2020, 2021, 2022])
+    response = client.get(
+        f"/api/groups/{group_id}/assignments/history",
+        params={"year_from": 2021, "year_to": 2021},
+        headers=headers,
+    )
+    assert {row["year"] for row in response.json()} == {2021}
+
+    exported = client.get(
+        f"/api/groups/{group_id}/assignments/history/export",
+        params={"year_from": 2022},
+        headers=headers,
+    )
+    assert exported.status_code == 200
+    assert {row["year"] for row in exported.json()} == {2022}
+    assert len(exported.json()) == 4
+
+
+def test_bad_cursor_is_rejected(client, headers, make_group):
+    group_id, _ = make_group(3)
+    response = client.get(
+        f"/api/groups/{group_id}/assignments/history",
+        params={"cursor": "not-a-cursor"},
+        headers=headers,
+    )
+    assert response.status_code == 400
@@ -0,0 +1,125 @@
+import json
+
+from app.services import participant_import
+
+from .conftest import signup
+
+
+def upload(client, headers, group_id, content, filename="roster.csv", **params):
+    return client.post(
+        f"/api/groups/{group_id}/participants/import",
+        files={"file": (filename, content.encode(), "text/plain")},
+        params=params,
+        headers=headers,
+    )
+
+
+def errors_by_row(report):
+    errors = {}
+    for error in report["errors"]:
+        errors.setdefault(error["row"], []).append(error["detail"])
+    return errors
+
+
+def test_csv_rows_are_validated_one_by_one(client, headers, make_group):
+    group_id, _ = make_group(1)  # p0@example.com is already in the group
+    csv = (
+        "name,email,allowed_receivers\n"
+        "Ann,ann@example.com,bob@example.com;cat@example.com\n"
+        "Bob,bob@example.com,ann@example.com\n"
+        "Bad,not-an-email,\n"
+        "Ann again,ann@example.com,\n"
+        "Old,p0@example.com,\n"
+        "Cat,cat@example.com,nobody@example.com;cat@example.com\n"
+    )
+    response = upload(client, headers, group_id, csv)
+    assert response.status_code == 201, response.text
+    report = response.json()
+    assert report["created"] == 3
+    assert report["restrictions"] == 3
+    assert report["error_count"] == 5
+    errors = errors_by_row(report)
+    assert errors[4][0].startswith("email")
+    assert errors[5] == ["Duplicate of row 2"]
+    assert errors[6] == ["Already a participant in this group"]
+    assert errors[7] == [
+        "Unknown receiver: nobody@example.com",
+        "A participant cannot be assigned to themselves",
+    ]
+
+    matrix = client.get(
+        f"/api/groups/{group_id}/participants/restrictions", headers=headers
+    ).json()["restrictions"]
+    participants = client.get(
+        f"/api/groups/{group_id}/participants", headers=headers
+    ).json()
+    ids = {p["email"]: p["id"] for p in participants}
+    assert sorted(matrix[str(ids["ann@example.com"])]) == sorted(
+        [ids["bob@example.com"], ids["cat@example.com"]]
+    )
+    assert matrix[str(ids["bob@example.com"])] == [ids["ann@example.com"]]
+
+
+def test_ndjson_import(client, headers, make_group):
+    group_id, _ = make_group(0)
+    lines = [
+        json.dumps({"name": "Ann", "email": "ann@example.com"}),
+        "{not json",
+        "",
+        json.dumps(["a", "list"]),
+        json.dumps(
+            {
+                "name": "Bob",
+                "email": "bob@example.com",
+                "allowed_receivers": ["ann@example.com"],
+            }
+        ),
+    ]
+    response = upload(
+        client, headers, group_id, "\n".join(lines), filename="roster.ndjson"
+    )
+    assert response.status_code == 201, response.text
+    report = response.json()
+    assert (report["created"], report["restrictions"]) == (2, 1)
+    errors = errors_by_row(report)
+    assert errors[2][0].startswith("Invalid JSON")
+    assert errors[4] == ["Expected an object with name and email"]
+
+
+def test_missing_header_is_a_400(client, headers, make_group):
+    group_id, _ = make_group(0)
+    response = upload(client, headers, group_id, "first,last\nAnn,Smith\n")
+    assert response.status_code == 400
+    assert "email" in response.json()["detail"]
+
+
+def test_rows_are_inserted_in_chunks(
+    client, headers, make_group, statements, monkeypatch
+):
+    monkeypatch.setattr(participant_import, "IMPORT_CHUNK", 2)
+    group_id, _ = make_group(0)
+    csv = "name,email\n" + "".join(f"P{i},p{i}@example.com\n" for i in range(5))
+    statements.clear()
+    assert upload(client, headers, group_id, csv).json()["created"] == 5
+    inserts = [
+        s for s in statements if s.lstrip().startswith("INSERT INTO participants")
+    ]
+    assert len(inserts) == 3
+
+
+def test_async_import(async_client):
+    headers = signup(async_client)
+    group_id = async_client.post(
+        "/api/groups", json={"name": "Async import"}, headers=headers
+    ).json()["id"]
+    csv = "name,email,allowed_receivers\n" + "".join(
+        f"P{i},p{i}@example.com,p{(i + 1) % 300}@example.com\n" for i in range(300)
+    )
+    response = upload(async_client, headers, group_id, csv)
+    assert response.status_code == 201, response.text
+    report = response.json()
+    assert (report["created"], report["restrictions"], report["error_count"]) == (
+        300,
+        300,
+        0,
+    )
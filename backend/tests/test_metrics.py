@@ -0,0 +1,117 @@
+import logging
+import re
+
+import pytest
+
+from app import metrics
+
+
+def scrape(client) -> str:
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    return response.text
+
+
+def sample(text, name, **labels):
+    """Value of one sample, or None when it is missing"""
+    for line in text.splitlines():
+        match = re.fullmatch(r"(\w+)(?:\{(.*)\})? (\S+)", line)
+        if not match or match.group(1) != name:
+            continue
+        found = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', match.group(2) or ""))
+        if all(found.get(key) == value for key, value in labels.items()):
+            return float(match.group(3))
+    return None
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Keep metrics made by a test out of /metrics"""
+    monkeypatch.setattr(metrics, "_registry", [])
+    return metrics._registry
+
+
+def test_counter_and_histogram_format(registry):
+    counter = metrics.Counter("jobs_total", "Jobs", ("kind",))
+    counter.inc("a")
+    counter.inc("a", amount=2)
+    histogram = metrics.Histogram("wait_seconds", "Wait", buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    text = metrics.render()
+    assert "# TYPE jobs_total counter" in text
+    assert sample(text, "jobs_total", kind="a") == 3
+    assert sample(text, "wait_seconds_bucket", le="0.1") == 1
+    assert sample(text, "wait_seconds_bucket", le="1.0") == 2
+    assert sample(text, "wait_seconds_bucket", le="+Inf") == 3
+    assert sample(text, "wait_seconds_count") == 3
+    assert sample(text, "wait_seconds_sum") == pytest.approx(5.55)
+
+
+def test_label_values_are_checked_and_escaped(registry):
+    counter = metrics.Counter("odd_total", "Odd labels", ("value",))
+    counter.inc('say "hi"\n')
+    assert 'odd_total{value="say \\"hi\\"\\n"} 1' in metrics.render()
+    counter.inc("a", "b")
+    with pytest.raises(ValueError):
+        counter.samples()
+
+
+def test_metric_types_must_provide_samples(registry):
+    class Gauge(metrics._Metric):
+        type = "gauge"
+
+    with pytest.raises(TypeError):
+        Gauge("g", "A gauge")
+
+
+def test_requests_are_labelled_by_route(client, headers, make_group):
+    group_id, _ = make_group(2)
+    before = scrape(client)
+    route = "/api/groups/{group_id}"
+    labels = {"method": "GET", "route": route, "status": "200"}
+    count = sample(before, "http_request_duration_seconds_count", **labels) or 0
+
+    client.get(f"/api/groups/{group_id}", headers=headers)
+    client.get("/no/such/page")
+    text = scrape(client)
+    assert sample(text, "http_request_duration_seconds_count", **labels) == count + 1
+    assert sample(
+        text, "http_request_duration_seconds_count", route="unmatched", status="404"
+    )
+    assert sample(text, "db_request_queries_count", route=route) >= 1
+    assert f"/api/groups/{group_id}" not in text
+
+
+def test_solver_and_cache_metrics(client, headers, make_group):
+    group_id, _ = make_group(4)
+    client.post(
+        f"/api/groups/{group_id}/assignments",
+        json={"group_id": group_id, "year": 2024, "mode": "derangement"},
+        headers=headers,
+    )
+    text = scrape(client)
+    assert sample(
+        text, "solver_duration_seconds_count", mode="derangement", outcome="solved"
+    )
+    assert sample(text, "bcrypt_duration_seconds_count", operation="hash")
+    assert sample(text, "cache_entries", cache="token") is not None
+    assert sample(text, "db_pool_connections", pool="primary") is not None
+
+
+def test_slow_requests_are_logged_with_their_sql(
+    client, headers, make_group, monkeypatch, caplog
+):
+    group_id, _ = make_group(2)
+    monkeypatch.setattr(metrics, "SLOW_REQUEST_MS", 0.001)
+    with caplog.at_level(logging.WARNING, logger="app.metrics"):
+        client.get(f"/api/groups/{group_id}/participants", headers=headers)
+    [record] = [r for r in caplog.records if r.name == "app.metrics"]
+    message = record.getMessage()
+    assert message.startswith(f"Slow request: GET /api/groups/{group_id}/participants")
+    assert "SELECT" in message
+    # Statement parameters never reach the log
+    assert "p0@example.com" not in message
@@ -0,0 +1,142 @@
+import random
+
+import pytest
+
+from app.services import min_cost, solver
+from app.services.min_cost import assignment_cost, find_weighted
+from app.services.solver import (
+    InfeasibleError,
+    SearchBudgetExceeded,
+    cycles_of,
+    find_min_cycle,
+)
+
+from .test_solver import random_graphs, valid_assignments
+
+
+def random_costs(adjacency, rng):
+    return [
+        {
+            receiver: rng.choice([0, 0, 0.25, 0.5, 1, 2])
+            for receiver in range(len(adjacency))
+            if mask >> receiver & 1
+        }
+        for mask in adjacency
+    ]
+
+
+@pytest.mark.parametrize("min_length", [2, 3, 4])
+@pytest.mark.parametrize(
+    "adjacency", list(random_graphs(25, sizes=range(4, 8), seed=4))
+)
+def test_min_cycle_respects_the_length(adjacency, min_length):
+    allowed = [
+        perm
+        for perm in valid_assignments(adjacency)
+        if min(len(cycle) for cycle in cycles_of(perm)) >= min_length
+    ]
+    if not allowed:
+        with pytest.raises(InfeasibleError):
+            find_min_cycle(adjacency, random.Random(0), min_length)
+        return
+    result = find_min_cycle(adjacency, random.Random(0), min_length)
+    assert tuple(result.successors) in valid_assignments(adjacency)
+    assert min(len(cycle) for cycle in cycles_of(result.successors)) >= min_length
+
+
+@pytest.mark.parametrize("min_length", [2, 3, 4])
+@pytest.mark.parametrize(
+    "adjacency", list(random_graphs(25, sizes=range(4, 8), density=0.4, seed=9))
+)
+def test_exact_min_cycle_search_matches_brute_force(monkeypatch, adjacency, min_length):
+    # No patching at all, so every answer comes from the exact search
+    monkeypatch.setattr(solver, "PATCH_ATTEMPTS", 0)
+    test_min_cycle_respects_the_length(adjacency, min_length)
+
+
+def test_min_cycle_does_not_fall_back_to_a_single_circle():
+    # Circles of 3 and 4 exist, e.g. (5, 0, 6, 1, 2, 3, 4), but no single
+    # circle through all 7 does; some seeds never patch their way there
+    adjacency = [42, 97, 80, 34, 109, 72, 27]
+    with pytest.raises(InfeasibleError):
+        solver.find_cycle(adjacency, random.Random(0))
+    for seed in range(50):
+        result = find_min_cycle(adjacency, random.Random(seed), 3)
+        assert tuple(result.successors) in valid_assignments(adjacency)
+        assert min(len(cycle) for cycle in cycles_of(result.successors)) >= 3
+
+
+def test_exact_min_cycle_search_reports_its_budget(monkeypatch):
+    monkeypatch.setattr(solver, "PATCH_ATTEMPTS", 0)
+    with pytest.raises(SearchBudgetExceeded):
+        find_min_cycle([42, 97, 80, 34, 109, 72, 27], random.Random(4), 3, max_nodes=1)
+
+
+@pytest.mark.parametrize("density", [0.3, 0.9])
+@pytest.mark.parametrize("seed", range(20))
+def test_weighted_finds_the_cheapest_assignment(density, seed):
+    rng = random.Random(seed)
+    (adjacency,) = random_graphs(1, sizes=range(3, 8), density=density, seed=seed)
+    solutions = valid_assignments(adjacency)
+    costs = random_costs(adjacency, rng)
+    if not solutions:
+        with pytest.raises(InfeasibleError):
+            find_weighted(adjacency, rng, costs)
+        return
+    result = find_weighted(adjacency, rng, costs)
+    assert tuple(result.successors) in solutions
+    best = min(assignment_cost(perm, costs) for perm in solutions)
+    assert assignment_cost(result.successors, costs) == pytest.approx(best)
+
+
+def test_both_hungarian_variants_agree(monkeypatch):
+    # Every pairing costs something, so the Hungarian step places everyone
+    rng = random.Random(5)
+    adjacency = [((1 << 12) - 1) & ~(1 << i) for i in range(12)]
+    costs = [
+        {other: rng.choice([0.5, 1, 2, 3]) for other in range(12) if other != giver}
+        for giver in range(12)
+    ]
+    dense = find_weighted(adjacency, random.Random(1), costs)
+    monkeypatch.setattr(min_cost, "DENSE_FRACTION", 2.0)
+    sparse = find_weighted(adjacency, random.Random(1), costs)
+    assert assignment_cost(dense.successors, costs) == pytest.approx(
+        assignment_cost(sparse.successors, costs)
+    )
+
+
+def assign(client, headers, group_id, year, **settings):
+    return client.post(
+        f"/api/groups/{group_id}/assignments",
+        json={"group_id": group_id, "year": year, **settings},
+        headers=headers,
+    )
+
+
+def test_min_cycle_mode_has_no_swaps(client, headers, make_group):
+    group_id, _ = make_group(9)
+    response = assign(
+        client, headers, group_id, 2024, mode="min_cycle", min_cycle_length=3
+    )
+    assert response.status_code == 200, response.text
+    pairs = {a["giver_id"]: a["receiver_id"] for a in response.json()["assignments"]}
+    assert all(pairs[receiver] != giver for giver, receiver in pairs.items())
+
+
+def test_weighted_mode_reuses_past_pairings_only_when_needed(
+    client, headers, make_group
+):
+    # With two people every year repeats, which the strict modes refuse
+    group_id, _ = make_group(2)
+    assert assign(client, headers, group_id, 2023, mode="cycle").status_code == 200
+    assert assign(client, headers, group_id, 2024, mode="cycle").status_code == 400
+    assert assign(client, headers, group_id, 2024, mode="weighted").status_code == 200
+
+    # With room to avoid them, weighted mode repeats nothing
+    group_id, _ = make_group(6)
+    first = assign(client, headers, group_id, 2023, mode="cycle").json()
+    past = {(a["giver_id"], a["receiver_id"]) for a in first["assignments"]}
+    second = assign(client, headers, group_id, 2024, mode="weighted").json()
+    assert not past & {
+        (a["giver_id"], a["receiver_id"]) for a in second["assignments"]
+    }
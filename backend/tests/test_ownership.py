@@ -0,0 +1,84 @@
+import pytest
+from sqlalchemy import text
+
+from app.database import engine
+from app.ownership import group_cache
+
+from .conftest import signup
+
+
+@pytest.mark.parametrize(
+    "method,path,body",
+    [
+        ("GET", "", None),
+        ("PUT", "", {"name": "Mine now"}),
+        ("DELETE", "", None),
+        ("GET", "/participants", None),
+        ("POST", "/participants", {"name": "X", "email": "x@example.com"}),
+        ("GET", "/assignments/history", None),
+        ("POST", "/assignments/preview", {"year": 2024}),
+    ],
+)
+def test_other_users_groups_are_not_found(client, make_group, method, path, body):
+    group_id, _ = make_group(3)
+    stranger = signup(client)
+    response = client.request(
+        method, f"/api/groups/{group_id}{path}", json=body, headers=stranger
+    )
+    assert response.status_code == 404
+
+
+def test_requests_need_a_token(client, make_group):
+    group_id, _ = make_group(2)
+    assert client.get(f"/api/groups/{group_id}").status_code == 401
+
+
+def test_repeat_reads_skip_the_ownership_query(
+    client, headers, make_group, statements
+):
+    group_id, _ = make_group(2)
+    url = f"/api/groups/{group_id}"
+    client.get(url, headers=headers)
+    hits = group_cache.stats()["hits"]
+    statements.clear()
+    assert client.get(url, headers=headers).status_code == 200
+    assert group_cache.stats()["hits"] == hits + 1
+    # Only the version lookup behind the ETag is left
+    assert len(statements) == 1
+
+
+def raw(sql, **params):
+    # Straight to the database, like another worker would, so no group
+    # events fire in this process
+    with engine.begin() as connection:
+        connection.execute(text(sql), params)
+
+
+def test_group_deleted_by_another_worker_is_not_found(client, headers, make_group):
+    group_id, _ = make_group(0)
+    url = f"/api/groups/{group_id}"
+    assert client.get(url, headers=headers).status_code == 200
+    user_id = client.get("/api/auth/me", headers=headers).json()["id"]
+    assert group_cache.get(user_id, group_id) is not None
+    raw("DELETE FROM groups WHERE id = :id", id=group_id)
+
+    assert client.get(url, headers=headers).status_code == 404
+    assert client.get(f"{url}/participants", headers=headers).status_code == 404
+    feasibility = client.get(f"{url}/assignments/feasibility", headers=headers)
+    assert feasibility.status_code == 404
+    assert client.put(url, json={"name": "Gone"}, headers=headers).status_code == 404
+    assert client.delete(url, headers=headers).status_code == 404
+    assert group_cache.get(user_id, group_id) is None
+
+
+def test_writes_recheck_ownership(client, headers, make_group):
+    group_id, _ = make_group(0)
+    url = f"/api/groups/{group_id}"
+    assert client.get(url, headers=headers).status_code == 200
+
+    other = signup(client)
+    other_id = client.get("/api/auth/me", headers=other).json()["id"]
+    raw("UPDATE groups SET owner_id = :to WHERE id = :id", to=other_id, id=group_id)
+    renamed = client.put(url, json={"name": "Still mine?"}, headers=headers)
+    assert renamed.status_code == 404
+    assert client.get(url, headers=other).json()["name"] == "Family"
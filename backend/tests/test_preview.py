@@ -0,0 +1,66 @@
+from .test_assignment_response import assign
+
+
+def preview(client, headers, group_id, **settings):
+    response = client.post(
+        f"/api/groups/{group_id}/assignments/preview",
+        json={"year": 2024, **settings},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def pairs(records):
+    return sorted((r["giver_id"], r["receiver_id"]) for r in records)
+
+
+def test_preview_writes_nothing(client, headers, make_group, statements):
+    group_id, _ = make_group(6)
+    statements.clear()
+    result = preview(client, headers, group_id, mode="cycle")
+    assert len(result["assignments"]) == 6
+    assert not any(
+        s.lstrip().upper().startswith(("INSERT", "UPDATE", "DELETE"))
+        for s in statements
+    )
+    history = client.get(
+        f"/api/groups/{group_id}/assignments/history", headers=headers
+    )
+    assert history.json() == []
+    runs = client.get(f"/api/groups/{group_id}/assignments/runs", headers=headers)
+    assert runs.json() == []
+
+
+def test_creating_with_the_preview_seed_saves_the_preview(
+    client, headers, make_group
+):
+    group_id, _ = make_group(7)
+    first = preview(client, headers, group_id, mode="derangement")
+    assert not first["stats"]["cached"]
+    assert first["stats"]["cost"] is None
+
+    again = preview(client, headers, group_id, mode="derangement", seed=first["seed"])
+    assert again["stats"]["cached"]
+    assert pairs(again["assignments"]) == pairs(first["assignments"])
+
+    created = assign(client, headers, group_id, mode="derangement", seed=first["seed"])
+    assert pairs(created["assignments"]) == pairs(first["assignments"])
+
+
+def test_weighted_preview_reports_the_cost(client, headers, make_group):
+    group_id, _ = make_group(2)
+    assign(client, headers, group_id, year=2023, mode="cycle")
+    result = preview(client, headers, group_id, mode="weighted")
+    # Both people repeat last year's pairing, one penalty each
+    assert result["stats"]["cost"] == 2.0
+
+
+def test_infeasible_preview_is_a_400(client, headers, make_group):
+    group_id, _ = make_group(1)
+    response = client.post(
+        f"/api/groups/{group_id}/assignments/preview",
+        json={"year": 2024},
+        headers=headers,
+    )
+    assert response.status_code == 400
@@ -0,0 +1,134 @@
+import random
+
+import pytest
+
+from app.services.solver import InfeasibleError, cycles_of, repair_successors
+
+
+def complete(n):
+    return [((1 << n) - 1) & ~(1 << i) for i in range(n)]
+
+
+def is_single_cycle(adjacency, successors):
+    assert sorted(successors) == list(range(len(adjacency)))
+    assert all(adjacency[g] >> r & 1 for g, r in enumerate(successors))
+    return len(cycles_of(successors)) == 1
+
+
+def kept(previous, successors):
+    return {
+        giver
+        for giver, receiver in enumerate(previous)
+        if receiver != -1 and successors[giver] == receiver
+    }
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_leaving_changes_one_pairing(seed):
+    rng = random.Random(seed)
+    order = list(range(12))
+    rng.shuffle(order)
+    before = [0] * 12
+    for i, giver in enumerate(order):
+        before[giver] = order[(i + 1) % 12]
+
+    # Participant 5 leaves; everyone after them shifts down one index
+    leaving = 5
+    reindex = {old: old - (old > leaving) for old in range(12) if old != leaving}
+    previous = [
+        -1 if before[old] == leaving else reindex[before[old]]
+        for old in range(12)
+        if old != leaving
+    ]
+    adjacency = complete(11)
+    successors = repair_successors(adjacency, previous, rng=rng)
+    assert is_single_cycle(adjacency, successors)
+    assert len(kept(previous, successors)) == 10
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_joining_changes_two_pairings(seed):
+    previous = [(i + 1) % 8 for i in range(8)] + [-1]
+    adjacency = complete(9)
+    successors = repair_successors(adjacency, previous, rng=random.Random(seed))
+    assert is_single_cycle(adjacency, successors)
+    assert len(kept(previous, successors)) == 7
+
+
+def test_pairings_no_longer_allowed_are_replaced():
+    previous = [(i + 1) % 6 for i in range(6)]
+    adjacency = complete(6)
+    adjacency[2] &= ~(1 << 3)
+    successors = repair_successors(adjacency, previous, rng=random.Random(1))
+    assert is_single_cycle(adjacency, successors)
+    assert successors[2] != 3
+    assert len(kept(previous, successors)) >= 3
+
+
+def test_derangement_repair_may_keep_small_circles():
+    previous = [1, 0, 3, 2, -1]
+    adjacency = complete(5)
+    successors = repair_successors(
+        adjacency, previous, require_cycle=False, rng=random.Random(0)
+    )
+    assert sorted(successors) == list(range(5))
+    assert len(kept(previous, successors)) == 3
+
+
+def test_impossible_repair_raises():
+    with pytest.raises(InfeasibleError):
+        repair_successors([0b10, 0b00], [1, -1])
+
+
+def assign(client, headers, group_id):
+    response = client.post(
+        f"/api/groups/{group_id}/assignments",
+        json={"group_id": group_id, "year": 2024, "mode": "cycle", "seed": 9},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    return {a["giver_id"]: a["receiver_id"] for a in response.json()["assignments"]}
+
+
+def repair(client, headers, group_id):
+    response = client.post(
+        f"/api/groups/{group_id}/assignments/repair",
+        json={"year": 2024, "mode": "cycle", "seed": 4},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    result = response.json()
+    pairs = {a["giver_id"]: a["receiver_id"] for a in result["assignments"]}
+    return pairs, {a["giver_id"] for a in result["changed"]}
+
+
+def test_repair_endpoint_only_changes_affected_givers(client, headers, make_group):
+    group_id, participants = make_group(7)
+    before = assign(client, headers, group_id)
+
+    leaving = participants[3]["id"]
+    giver_of_leaving = next(g for g, r in before.items() if r == leaving)
+    client.delete(f"/api/groups/{group_id}/participants/{leaving}", headers=headers)
+    after, changed = repair(client, headers, group_id)
+    assert changed == {giver_of_leaving}
+    assert len(after) == 6
+    for giver, receiver in after.items():
+        if giver != giver_of_leaving:
+            assert before[giver] == receiver
+
+    newcomer = client.post(
+        f"/api/groups/{group_id}/participants",
+        json={"name": "New", "email": "new@example.com"},
+        headers=headers,
+    ).json()["id"]
+    final, changed = repair(client, headers, group_id)
+    assert newcomer in changed and len(changed) == 2
+    assert sorted(final) == sorted(final.values())
+    history = client.get(
+        f"/api/groups/{group_id}/assignments/history",
+        params={"year": 2024},
+        headers=headers,
+    ).json()
+    assert {(row["giver_id"], row["receiver_id"]) for row in history} == set(
+        final.items()
+    )
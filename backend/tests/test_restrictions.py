@@ -0,0 +1,96 @@
+def matrix(client, headers, group_id):
+    response = client.get(
+        f"/api/groups/{group_id}/participants/restrictions", headers=headers
+    )
+    assert response.status_code == 200
+    restrictions = response.json()["restrictions"]
+    return {int(giver): receivers for giver, receivers in restrictions.items()}
+
+
+def test_put_replaces_and_patch_edits(client, headers, make_group):
+    group_id, participants = make_group(5)
+    p0, p1, p2, p3, p4 = [p["id"] for p in participants]
+    url = f"/api/groups/{group_id}/participants/{p0}/restrictions"
+
+    response = client.put(
+        url, json={"giver_id": p0, "allowed_receiver_ids": [p1, p2]}, headers=headers
+    )
+    assert response.status_code == 200
+    assert sorted(response.json()["allowed_receivers"]) == ["P1", "P2"]
+
+    response = client.patch(
+        url, json={"add": [p3, p1], "remove": [p2]}, headers=headers
+    )
+    assert response.status_code == 200
+    assert sorted(response.json()["allowed_receivers"]) == ["P1", "P3"]
+    assert matrix(client, headers, group_id) == {p0: [p1, p3]}
+
+    client.put(
+        url, json={"giver_id": p0, "allowed_receiver_ids": [p4]}, headers=headers
+    )
+    assert matrix(client, headers, group_id) == {p0: [p4]}
+
+
+def test_invalid_edits_change_nothing(client, headers, make_group):
+    group_id, participants = make_group(3)
+    p0, p1, p2 = [p["id"] for p in participants]
+    outsider = make_group(1)[1][0]["id"]
+    url = f"/api/groups/{group_id}/participants/{p0}/restrictions"
+    client.patch(url, json={"add": [p1]}, headers=headers)
+
+    for body in (
+        {"add": [p0]},
+        {"add": [p2], "remove": [p2]},
+        {"add": [p2, outsider]},
+        {"remove": [outsider]},
+    ):
+        response = client.patch(url, json=body, headers=headers)
+        assert response.status_code == 400, body
+    assert matrix(client, headers, group_id) == {p0: [p1]}
+
+    missing = client.patch(
+        f"/api/groups/{group_id}/participants/{outsider}/restrictions",
+        json={"add": [p1]},
+        headers=headers,
+    )
+    assert missing.status_code == 404
+
+
+def test_matrix_replace_is_all_or_nothing(client, headers, make_group):
+    group_id, participants = make_group(4)
+    p0, p1, p2, p3 = [p["id"] for p in participants]
+    url = f"/api/groups/{group_id}/participants/restrictions"
+
+    response = client.put(
+        url,
+        json={"restrictions": {str(p0): [p1], str(p2): [p3, p0]}},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert matrix(client, headers, group_id) == {p0: [p1], p2: [p0, p3]}
+
+    response = client.put(
+        url, json={"restrictions": {str(p1): [p2], str(p3): [p3]}}, headers=headers
+    )
+    assert response.status_code == 400
+    assert matrix(client, headers, group_id) == {p0: [p1], p2: [p0, p3]}
+
+    client.put(url, json={"restrictions": {str(p1): [p0]}}, headers=headers)
+    assert matrix(client, headers, group_id) == {p1: [p0]}
+
+
+def test_edits_are_set_based(client, headers, make_group, statements):
+    counts = []
+    for size in (4, 40):
+        group_id, participants = make_group(size)
+        giver, *others = [p["id"] for p in participants]
+        url = f"/api/groups/{group_id}/participants/{giver}/restrictions"
+        client.get(f"/api/groups/{group_id}", headers=headers)
+        statements.clear()
+        client.put(
+            url,
+            json={"giver_id": giver, "allowed_receiver_ids": others},
+            headers=headers,
+        )
+        counts.append(len(statements))
+    assert counts[0] == counts[1]
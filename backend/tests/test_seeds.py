@@ -0,0 +1,104 @@
+import pytest
+
+from app.services import assignment
+from app.services.assignment import (
+    clear_solution_cache,
+    plan_assignments,
+    solution_cache_stats,
+)
+from benchmarks.generate import make_group
+from benchmarks.run import run_sqlite
+
+from .test_feasibility import graph_of
+
+
+def successors(records):
+    return [(r["giver_id"], r["receiver_id"]) for r in records]
+
+
+@pytest.mark.parametrize("mode", ["cycle", "derangement", "min_cycle", "weighted"])
+def test_same_seed_same_assignment(mode):
+    graph = graph_of([((1 << 10) - 1) & ~(1 << i) for i in range(10)])
+    first = plan_assignments(graph, 2024, mode, seed=1234)
+    clear_solution_cache()
+    assert plan_assignments(graph, 2024, mode, seed=1234) == first
+    others = {
+        tuple(successors(plan_assignments(graph, 2024, mode, seed=seed)))
+        for seed in range(10)
+    }
+    assert len(others) > 1
+
+
+def test_repeat_solves_come_from_the_cache():
+    graph = graph_of([((1 << 6) - 1) & ~(1 << i) for i in range(6)])
+    clear_solution_cache()
+    plan_assignments(graph, 2024, "cycle", seed=7)
+    hits = solution_cache_stats()["hits"]
+    plan_assignments(graph, 2024, "cycle", seed=7)
+    assert solution_cache_stats()["hits"] == hits + 1
+    plan_assignments(graph, 2024, "cycle", seed=8)
+    assert solution_cache_stats()["hits"] == hits + 1
+
+
+def assign(client, headers, group_id, **settings):
+    response = client.post(
+        f"/api/groups/{group_id}/assignments",
+        json={"group_id": group_id, "year": 2024, **settings},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_seed_reproduces_across_groups(client, headers, make_group):
+    results = []
+    for _ in range(2):
+        group_id, participants = make_group(8)
+        position = {p["id"]: i for i, p in enumerate(participants)}
+        result = assign(client, headers, group_id, mode="cycle", seed=99)
+        assert result["seed"] == 99
+        results.append(
+            sorted(
+                (position[a["giver_id"]], position[a["receiver_id"]])
+                for a in result["assignments"]
+            )
+        )
+    assert results[0] == results[1]
+
+
+def test_runs_record_the_seed_and_settings(client, headers, make_group):
+    group_id, _ = make_group(6)
+    first = assign(client, headers, group_id, mode="min_cycle", min_cycle_length=3)
+    again = assign(
+        client,
+        headers,
+        group_id,
+        mode="min_cycle",
+        min_cycle_length=3,
+        seed=first["seed"],
+        replace_year=True,
+    )
+    assert successors(again["assignments"]) == successors(first["assignments"])
+
+    runs = client.get(
+        f"/api/groups/{group_id}/assignments/runs", headers=headers
+    ).json()
+    assert [(r["mode"], r["seed"], r["min_cycle_length"]) for r in runs] == [
+        ("min_cycle", first["seed"], 3)
+    ]
+
+
+def test_benchmark_runs_pass_the_seed_through(monkeypatch):
+    seeds = []
+    assign_secret_santas = assignment.assign_secret_santas
+
+    def recording(*args, seed=None, **kwargs):
+        seeds.append(seed)
+        return assign_secret_santas(*args, seed=seed, **kwargs)
+
+    monkeypatch.setattr(assignment, "assign_secret_santas", recording)
+    group = make_group(30, 0.3, 2, seed=1)
+    first = run_sqlite(group, "cycle", 77, trace_memory=False)
+    second = run_sqlite(group, "cycle", 77, trace_memory=False)
+    assert seeds == [77, 77]
+    assert first["success"] and first["nodes"] == second["nodes"]
@@ -0,0 +1,123 @@
+import itertools
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.assignment import _describe_infeasible
+from app.services.solver import (
+    InfeasibleError,
+    check_feasibility,
+    cycles_of,
+    find_cycle,
+    find_derangement,
+)
+
+
+def valid_assignments(adjacency):
+    """Every permutation that only uses allowed pairings, by brute force"""
+    n = len(adjacency)
+    return [
+        perm
+        for perm in itertools.permutations(range(n))
+        if all(adjacency[giver] >> receiver & 1 for giver, receiver in enumerate(perm))
+    ]
+
+
+def random_graphs(count, sizes=range(2, 7), density=0.6, seed=1):
+    rng = random.Random(seed)
+    for _ in range(count):
+        n = rng.choice(sizes)
+        yield [
+            sum(
+                1 << receiver
+                for receiver in range(n)
+                if receiver != giver and rng.random() < density
+            )
+            for giver in range(n)
+        ]
+
+
+def assert_valid(adjacency, successors):
+    assert sorted(successors) == list(range(len(adjacency)))
+    for giver, receiver in enumerate(successors):
+        assert adjacency[giver] >> receiver & 1
+
+
+@pytest.mark.parametrize("adjacency", list(random_graphs(60)))
+def test_derangement_matches_brute_force(adjacency):
+    solutions = valid_assignments(adjacency)
+    if not solutions:
+        with pytest.raises(InfeasibleError):
+            find_derangement(adjacency, random.Random(0))
+        return
+    result = find_derangement(adjacency, random.Random(0))
+    assert_valid(adjacency, result.successors)
+    assert tuple(result.successors) in solutions
+
+
+@pytest.mark.parametrize("adjacency", list(random_graphs(60, seed=2)))
+def test_cycle_matches_brute_force(adjacency):
+    cycles = [
+        perm for perm in valid_assignments(adjacency) if len(cycles_of(perm)) == 1
+    ]
+    if not cycles:
+        with pytest.raises(InfeasibleError):
+            find_cycle(adjacency, random.Random(0))
+        return
+    result = find_cycle(adjacency, random.Random(0))
+    assert_valid(adjacency, result.successors)
+    assert len(cycles_of(result.successors)) == 1
+
+
+def test_infeasible_graph_names_its_witnesses():
+    # Nobody but 0 may give to 1 or 2, and 0 can only give to one of them
+    adjacency = [0b0110, 0b1001, 0b1001, 0b0001]
+    with pytest.raises(InfeasibleError) as excinfo:
+        check_feasibility(adjacency)
+    assert excinfo.value.givers or excinfo.value.receivers
+
+
+def test_cycle_needs_strongly_connected_graph():
+    # Two swaps: a derangement exists but no single circle does
+    adjacency = [0b0010, 0b0001, 0b1000, 0b0100]
+    assert_valid(adjacency, find_derangement(adjacency).successors)
+    with pytest.raises(InfeasibleError):
+        find_cycle(adjacency)
+
+
+def test_exhausted_cycle_search_still_explains_itself():
+    # Strongly connected with a derangement, but no single circle: only the
+    # full search can tell, and it has no witness to name
+    adjacency = [0b0110, 0b1100, 0b1011, 0b0010]
+    assert_valid(adjacency, find_derangement(adjacency).successors)
+    with pytest.raises(InfeasibleError) as excinfo:
+        find_cycle(adjacency, random.Random(0))
+    assert not excinfo.value.givers and not excinfo.value.receivers
+
+    participants = [SimpleNamespace(name=name) for name in "ABCD"]
+    message = _describe_infeasible(excinfo.value, participants)
+    assert message.startswith("No valid Secret Santa assignment could be created.")
+    assert "gift circles" in message
+    assert "  " not in message and ". cannot" not in message
+
+
+def test_assign_endpoint_returns_one_circle(client, headers, make_group):
+    group_id, participants = make_group(8)
+    response = client.post(
+        f"/api/groups/{group_id}/assignments",
+        json={"group_id": group_id, "year": 2024, "mode": "cycle"},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    pairs = {
+        a["giver_email"]: a["receiver_email"] for a in response.json()["assignments"]
+    }
+    emails = sorted(p["email"] for p in participants)
+    assert sorted(pairs) == sorted(pairs.values()) == emails
+
+    seen, giver = [], emails[0]
+    while giver not in seen:
+        seen.append(giver)
+        giver = pairs[giver]
+    assert len(seen) == len(emails)
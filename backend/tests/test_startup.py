@@ -0,0 +1,41 @@
+import json
+import os
+import subprocess
+import sys
+
+from app.auth import decode_token, encode_token
+from benchmarks.bench_startup import BACKEND_DIR, LAZY_MODULES
+
+IMPORT_APP = """
+import json, sys
+import app.main
+print(json.dumps(sorted(sys.modules)))
+"""
+
+
+def test_app_import_is_light_and_touches_no_schema(tmp_path):
+    database = tmp_path / "fresh.db"
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{database}",
+        "AUTO_MIGRATE": "false",
+    }
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_APP],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    modules = json.loads(output.splitlines()[-1])
+    for lazy in LAZY_MODULES:
+        assert not any(m == lazy or m.startswith(lazy + ".") for m in modules), lazy
+    # No create_all at import time: the database is not even created
+    assert not database.exists() or database.stat().st_size == 0
+
+
+def test_tokens_round_trip():
+    token = encode_token({"sub": "santa@example.com"})
+    assert decode_token(token)["sub"] == "santa@example.com"
+    assert decode_token(token + "x") is None
@@ -0,0 +1,75 @@
+import time
+
+from app import models
+from app.auth import TokenCache, create_password_reset_token, token_cache
+
+
+def user(user_id, email):
+    return models.User(id=user_id, email=email, is_active=True)
+
+
+def test_entries_expire_with_the_token():
+    cache = TokenCache(max_size=10, ttl=300)
+    cache.put("a", user(1, "a@example.com"), token_exp=time.time() - 1)
+    cache.put("b", user(2, "b@example.com"), token_exp=None)
+    assert cache.get("a") is None
+    assert cache.get("b").email == "b@example.com"
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = TokenCache(max_size=2, ttl=300)
+    cache.put("a", user(1, "a@example.com"), None)
+    cache.put("b", user(2, "b@example.com"), None)
+    cache.get("a")
+    cache.put("c", user(3, "c@example.com"), None)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidate_user_drops_all_their_tokens():
+    cache = TokenCache(max_size=10, ttl=300)
+    cache.put("a1", user(1, "a@example.com"), None)
+    cache.put("a2", user(1, "a@example.com"), None)
+    cache.put("b", user(2, "b@example.com"), None)
+    cache.invalidate_user("a@example.com")
+    assert cache.get("a1") is None and cache.get("a2") is None
+    assert cache.get("b") is not None
+
+
+def test_repeat_requests_skip_the_user_lookup(client, headers, statements):
+    assert client.get("/api/auth/me", headers=headers).status_code == 200
+    hits = token_cache.stats()["hits"]
+    statements.clear()
+    assert client.get("/api/auth/me", headers=headers).status_code == 200
+    assert token_cache.stats()["hits"] == hits + 1
+    assert statements == []
+
+
+def test_deactivation_is_seen_on_the_next_request(client, headers, db):
+    email = client.get("/api/auth/me", headers=headers).json()["email"]
+    db_user = db.query(models.User).filter(models.User.email == email).one()
+    db_user.is_active = False
+    db.commit()
+    assert client.get("/api/auth/me", headers=headers).status_code == 400
+
+
+def test_password_reset_drops_cached_sessions(client, headers):
+    email = client.get("/api/auth/me", headers=headers).json()["email"]
+    token = headers["Authorization"].split()[1]
+    assert token_cache.get(token) is not None
+
+    response = client.post(
+        "/api/auth/reset-password",
+        json={
+            "token": create_password_reset_token(email),
+            "new_password": "another-password",
+        },
+    )
+    assert response.status_code == 200, response.text
+    assert token_cache.get(token) is None
+    login = client.post(
+        "/api/auth/login",
+        data={"username": email, "password": "another-password"},
+    )
+    assert login.status_code == 200